@@ -0,0 +1,276 @@
+"""Формат callback_data inline-кнопок и маршрутизация callback-запросов.
+
+Каждое действие (CallbackAction) имеет короткий код и типизированные поля.
+Данные кнопки упаковываются в строку "<версия><код>:<поле>:<поле>", целые
+числа - в base36, например "1n:c" - "следующий статус проекта 12". Версия
+формата - первый символ: кнопки в старых сообщениях (формат вида
+"next_status_12" без версии) по-прежнему распознаются по шаблонам legacy.
+
+Обработчики регистрируются декоратором callback_handler по действию, а не
+фильтрами F.data.startswith(...) в роутерах: один фильтр в диспетчере
+распаковывает callback_data и находит обработчик в таблице (routing.HandlerTable)
+по действию, а поля передаются обработчику именованными аргументами.
+"""
+import logging
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery
+
+from routing import HandlerTable, dispatch
+
+logger = logging.getLogger(__name__)
+
+# Версия формата callback_data - первый символ упакованных данных
+CALLBACK_VERSION = "1"
+SEPARATOR = ":"
+# Ограничение Telegram на длину callback_data
+MAX_CALLBACK_DATA_BYTES = 64
+
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Код -> действие и шаблоны старого формата -> действие
+_actions_by_code: Dict[str, "CallbackAction"] = {}
+_legacy_patterns: List[Tuple["re.Pattern", "CallbackAction"]] = []
+
+
+def _to_base36(value: int) -> str:
+    if value < 0:
+        return "-" + _to_base36(-value)
+    digits = ""
+    while True:
+        value, rest = divmod(value, 36)
+        digits = _DIGITS[rest] + digits
+        if not value:
+            return digits
+
+
+class CallbackAction:
+    """Действие inline-кнопки: код в callback_data и поля с типами (int или str).
+
+    Строковым может быть только последнее поле или поле без разделителя ":".
+    legacy - шаблон старого формата с {} на месте полей (по умолчанию
+    "<name>_{}_{}..."), чтобы кнопки в уже отправленных сообщениях работали.
+    """
+    __slots__ = ("name", "code", "fields")
+
+    def __init__(self, name: str, code: str, legacy: Optional[str] = None, **fields: type):
+        if code in _actions_by_code:
+            raise ValueError(f"Код callback-действия '{code}' уже занят действием {_actions_by_code[code].name}")
+        if not code or SEPARATOR in code:
+            raise ValueError(f"Недопустимый код callback-действия '{code}'")
+        self.name = name
+        self.code = code
+        self.fields: Dict[str, type] = fields
+        _actions_by_code[code] = self
+
+        if legacy is None:
+            legacy = "_".join([name] + ["{}"] * len(fields))
+        groups = []
+        for index, field_type in enumerate(fields.values()):
+            if field_type is int:
+                groups.append(r"(-?\d+)")
+            else:
+                groups.append(r"(.+)" if index == len(fields) - 1 else r"([^_]+)")
+        pattern = re.escape(legacy).replace(r"\{\}", "{}").format(*groups)
+        _legacy_patterns.append((re.compile(pattern), self))
+
+    def __repr__(self) -> str:
+        return f"CallbackAction({self.name!r})"
+
+    def pack(self, *args: Union[int, str]) -> str:
+        """Упаковывает поля в callback_data"""
+        if len(args) != len(self.fields):
+            raise ValueError(f"{self.name}: ожидается полей {len(self.fields)}, передано {len(args)}")
+        parts = [CALLBACK_VERSION + self.code]
+        for index, (value, field_type) in enumerate(zip(args, self.fields.values())):
+            if field_type is int:
+                parts.append(_to_base36(int(value)))
+            else:
+                value = str(value)
+                if SEPARATOR in value and index != len(self.fields) - 1:
+                    raise ValueError(f"{self.name}: поле не может содержать '{SEPARATOR}': {value!r}")
+                parts.append(value)
+        data = SEPARATOR.join(parts)
+        if len(data.encode("utf-8")) > MAX_CALLBACK_DATA_BYTES:
+            raise ValueError(f"{self.name}: callback_data длиннее {MAX_CALLBACK_DATA_BYTES} байт: {data!r}")
+        return data
+
+    def partial(self, *args: Union[int, str]) -> "PartialAction":
+        """Действие с заранее заданными первыми полями (для клавиатур списков)"""
+        return PartialAction(self, args)
+
+    def _convert(self, values: List[str], base: int) -> Optional[Dict[str, Any]]:
+        try:
+            return {
+                name: int(value, base) if field_type is int else value
+                for (name, field_type), value in zip(self.fields.items(), values)
+            }
+        except ValueError:
+            return None
+
+
+class PartialAction(NamedTuple):
+    """Действие с частью полей: pack() дописывает остальные"""
+    action: CallbackAction
+    args: tuple
+
+    def pack(self, *args: Union[int, str]) -> str:
+        return self.action.pack(*self.args, *args)
+
+
+def unpack_callback(data: Optional[str]) -> Optional[Tuple[CallbackAction, Dict[str, Any]]]:
+    """Распаковывает callback_data: (действие, поля) или None, если данные не распознаны"""
+    if not data:
+        return None
+    if data[0] == CALLBACK_VERSION:
+        code, separator, rest = data[1:].partition(SEPARATOR)
+        action = _actions_by_code.get(code)
+        if action is None:
+            return None
+        if not action.fields:
+            # Лишние поля у действия без полей - данные не этого действия
+            return (action, {}) if not separator else None
+        values = rest.split(SEPARATOR, len(action.fields) - 1)
+        if len(values) != len(action.fields):
+            return None
+        fields = action._convert(values, 36)
+        return (action, fields) if fields is not None else None
+    if data[0].isdigit():
+        # Другая (более новая) версия формата
+        return None
+    # Старый формат: кнопки в сообщениях, отправленных до перехода на коды действий
+    for pattern, action in _legacy_patterns:
+        match = pattern.fullmatch(data)
+        if match:
+            fields = action._convert(list(match.groups()), 10)
+            if fields is not None:
+                return action, fields
+    return None
+
+
+# ========== Действия ==========
+
+# Проекты: фильтры и массовые действия
+FILTER_BY_STATUS = CallbackAction("filter_by_status", "Fs")
+FILTER_STATUS = CallbackAction("filter_status", "fs", status_id=int)
+FILTER_BY_CHARACTER = CallbackAction("filter_by_character", "Fc")
+FILTER_CHARACTER = CallbackAction("filter_character", "fc", character_id=int)
+FILTER_BY_DEVELOPER = CallbackAction("filter_by_developer", "Fd")
+FILTER_DEVELOPER = CallbackAction("filter_developer", "fd", developer_id=int)
+RESET_FILTERS = CallbackAction("reset_filters", "fr")
+BACK_TO_PROJECTS = CallbackAction("back_to_projects", "pb")
+BATCH_ACTIONS = CallbackAction("batch_actions", "ba")
+BATCH_MOVE = CallbackAction("batch_move", "bm")
+BATCH_STATUS = CallbackAction("batch_status", "bs", status_id=int)
+BATCH_REASSIGN = CallbackAction("batch_reassign", "br")
+BATCH_DEVELOPER = CallbackAction("batch_developer", "bd", developer_id=int)
+BATCH_DELETE = CallbackAction("batch_delete", "bx")
+BATCH_DELETE_CONFIRM = CallbackAction("batch_delete_confirm", "by")
+BATCH_CANCEL = CallbackAction("batch_cancel", "bc")
+
+# Проекты: создание и редактирование
+SELECT_CHARACTER = CallbackAction("select_character", "sc", character_id=int)
+SELECT_DEVELOPER = CallbackAction("select_developer", "sd", developer_id=int)
+EDIT_PROJECT = CallbackAction("edit_project", "e", project_id=int)
+EDIT_FIELD_NAME = CallbackAction("edit_field_name", "en", project_id=int)
+EDIT_FIELD_CHARACTER = CallbackAction("edit_field_character", "ec", project_id=int)
+EDIT_FIELD_DEVELOPER = CallbackAction("edit_field_developer", "ed", project_id=int)
+EDIT_FIELD_STATUS = CallbackAction("edit_field_status", "es", project_id=int)
+CANCEL_EDIT = CallbackAction("cancel_edit", "eq", project_id=int)
+EDIT_CHARACTER = CallbackAction("edit_character", "Ec", character_id=int)
+EDIT_DEVELOPER = CallbackAction("edit_developer", "Ed", developer_id=int)
+EDIT_STATUS = CallbackAction("edit_status", "Es", status_id=int)
+
+# Проекты: статусы, чек-листы, удаление
+PREV_STATUS = CallbackAction("prev_status", "p", project_id=int)
+NEXT_STATUS = CallbackAction("next_status", "n", project_id=int)
+CONFIRM_NEXT_STATUS = CallbackAction("confirm_next_status", "N", project_id=int)
+MOVE_STATUS = CallbackAction("move_status", "m", project_id=int, new_status_id=int)
+TOGGLE_CHECKLIST = CallbackAction("toggle_checklist", "t", status_id=int, project_id=int, item_id=int)
+BACK_TO_PROJECT = CallbackAction("back_to_project", "b", project_id=int)
+DELETE_PROJECT = CallbackAction("delete_project", "x", project_id=int)
+CONFIRM_DELETE = CallbackAction("confirm_delete", "X", project_id=int)
+CANCEL_DELETE = CallbackAction("cancel_delete", "xq", project_id=int)
+
+# Архив
+FILTER_ARCHIVE_PUBLISHED = CallbackAction("filter_archive_published", "ap")
+FILTER_ARCHIVE_BANNED = CallbackAction("filter_archive_banned", "ab")
+FILTER_ARCHIVE_ALL = CallbackAction("filter_archive_all", "aa")
+BACK_TO_MAIN_FROM_ARCHIVE = CallbackAction("back_to_main_from_archive", "am")
+RESTORE_PROJECT = CallbackAction("restore_project", "r", project_id=int)
+
+# Статусы
+RESPONSIBLE = CallbackAction("responsible", "R", responsible=str)
+DELETE_STATUS = CallbackAction("delete_status", "ds", status_id=int)
+
+# Персонажи
+DELETE_CHARACTER = CallbackAction("delete_character", "dc", character_id=int)
+REASSIGN_CHARACTER = CallbackAction("reassign_character", "rc", character_id=int)
+MOVE_CHARACTER_PROJECTS = CallbackAction(
+    "move_character_projects", "mc", legacy="moveto_{}_character_{}", character_id=int, target_id=int
+)
+CASCADE_CHARACTER = CallbackAction("cascade_character", "kc", character_id=int)
+CANCEL_REMOVE_CHARACTER = CallbackAction("cancel_remove_character", "qc")
+
+# Разработчики
+DELETE_DEVELOPER = CallbackAction("delete_developer", "dd", developer_id=int)
+REASSIGN_DEVELOPER = CallbackAction("reassign_developer", "rd", developer_id=int)
+MOVE_DEVELOPER_PROJECTS = CallbackAction(
+    "move_developer_projects", "md", legacy="moveto_{}_developer_{}", developer_id=int, target_id=int
+)
+CASCADE_DEVELOPER = CallbackAction("cascade_developer", "kd", developer_id=int)
+CANCEL_REMOVE_DEVELOPER = CallbackAction("cancel_remove_developer", "qd")
+
+# Настройки бота
+SELECT_ROLE = CallbackAction("select_role", "ur", target_user_id=int)
+SET_ROLE = CallbackAction("set_role", "uR", target_user_id=int, role=str)
+SELECT_CHECKLIST_STATUS = CallbackAction("select_checklist_status", "cs", status_id=int)
+EDIT_CHECKLIST = CallbackAction("edit_checklist", "ce", status_id=int)
+DELETE_CHECKLIST_ITEM = CallbackAction("delete_checklist_item", "cx", status_id=int, item_id=int)
+BACK_TO_CHECKLIST_MENU = CallbackAction("back_to_checklist_menu", "cb")
+EXPORT = CallbackAction("export", "ex", kind=str, fmt=str)
+
+# Уведомления
+SET_INTERVAL = CallbackAction("set_interval", "i", interval=int)
+
+
+# ========== Маршрутизация ==========
+
+# Обработчики callback-запросов: действие -> обработчик
+callback_handler = HandlerTable("Callback-действия")
+
+
+async def _resolve_callback(callback: CallbackQuery, **kwargs) -> Union[bool, Dict[str, Any]]:
+    """Фильтр диспетчера: находит обработчик по callback_data, поля действия
+    передаются ему именованными аргументами.
+
+    Забирает только данные этого формата (с версией CALLBACK_VERSION или по шаблону
+    legacy): остальные callback_data достаются обработчикам роутеров.
+    """
+    decoded = unpack_callback(callback.data)
+    if decoded is None:
+        if callback.data and callback.data[0] == CALLBACK_VERSION:
+            # Наш формат, но действия или его полей уже нет - кнопка из старого сообщения
+            logger.warning(f"Нераспознанные callback_data: {callback.data!r}")
+            return {"handler": _stale_handler}
+        return False
+    handler = callback_handler.get(decoded[0])
+    if handler is None:
+        logger.warning(f"Нет обработчика callback-действия {decoded[0].name}: {callback.data!r}")
+        return {"handler": _stale_handler}
+    return await callback_handler.match(handler, callback, kwargs, decoded[1])
+
+
+async def _answer_stale(callback: CallbackQuery):
+    """Кнопка из старого сообщения, которую бот уже не поддерживает"""
+    await callback.answer("⚠️ Кнопка устарела, откройте меню заново", show_alert=True)
+
+
+_stale_handler = HandlerObject(callback=_answer_stale)
+
+
+def setup_callbacks(dp):
+    """Подключает таблицу обработчиков callback-запросов к диспетчеру"""
+    dp.callback_query.register(dispatch, _resolve_callback)
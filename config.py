@@ -6,3 +6,43 @@ load_dotenv()
 BOT_TOKEN = os.getenv('BOT_TOKEN', '')
 ADMIN_ID = int(os.getenv('ADMIN_ID', '0'))  # ID администратора бота
 
+# Папка с файлами данных. В Docker/Render/Railway сюда монтируется том (например, /data),
+# чтобы данные не терялись при пересборке образа
+DATA_DIR = os.getenv('DATA_DIR', '.')
+# Разбивка проектов на файлы projects/<номер>.json по диапазонам ID (по столько проектов в файле),
+# смена статуса переписывает только один такой файл. 0 - все проекты в одном projects.json
+PROJECTS_SHARD_SIZE = int(os.getenv('PROJECTS_SHARD_SIZE', '0'))
+
+
+# Метрики обработчиков
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # порт эндпоинта /metrics, 0 - выключен
+METRICS_LOG_INTERVAL = int(os.getenv('METRICS_LOG_INTERVAL', '900'))  # секунды между сводками в логе, 0 - выключено
+
+# Операции с файлами данных дольше этого порога (мс) пишутся в лог, 0 - выключено
+STORAGE_SLOW_MS = float(os.getenv('STORAGE_SLOW_MS', '200'))
+# Сколько секунд ждать блокировку файла данных, занятую другим процессом
+STORAGE_LOCK_TIMEOUT = float(os.getenv('STORAGE_LOCK_TIMEOUT', '10'))
+# То же для кода в потоке цикла событий: пока он ждет, стоят апдейты всех пользователей
+STORAGE_LOOP_LOCK_TIMEOUT = float(os.getenv('STORAGE_LOOP_LOCK_TIMEOUT', '0.5'))
+
+# Inline-режим (@bot запрос)
+INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '30'))  # секунды, сколько Telegram кэширует ответ
+
+# Рабочие пространства: сколько пространств держать в кэше памяти одновременно
+WORKSPACE_CACHE_SIZE = int(os.getenv('WORKSPACE_CACHE_SIZE', '8'))
+
+# Выбор ведущего процесса: сколько секунд действует аренда (уведомления рассылает только ведущий)
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL', '15'))
+
+# Сколько процессов-обработчиков апдейтов запускать (апдейты распределяются по ID пользователя),
+# 0 или 1 - все обрабатывается в одном процессе
+WORKERS = int(os.getenv('WORKERS', '0'))
+
+# Сколько апдейтов обрабатывать одновременно; апдейты одного пользователя всегда идут по очереди.
+# 1 - все апдейты строго по одному
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '8'))
+
+# Повторное нажатие той же кнопки тем же пользователем в течение стольких секунд игнорируется, 0 - выключено
+CALLBACK_DUPLICATE_WINDOW = float(os.getenv('CALLBACK_DUPLICATE_WINDOW', '1'))
+# Тяжелые обработчики (смена статуса, массовые действия) - не чаще раза в столько секунд на пользователя, 0 - выключено
+RATE_LIMIT_INTERVAL = float(os.getenv('RATE_LIMIT_INTERVAL', '1'))
@@ -1,6 +1,15 @@
+import asyncio
+import os
+import tempfile
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery, FSInputFile
 from aiogram.fsm.context import FSMContext
+from callbacks import (
+    callback_handler, SELECT_ROLE, SET_ROLE, SELECT_CHECKLIST_STATUS, EDIT_CHECKLIST,
+    DELETE_CHECKLIST_ITEM, BACK_TO_CHECKLIST_MENU, EXPORT
+)
+from routing import text_handler
 from keyboards import (
     get_main_menu_keyboard,
     get_bot_settings_keyboard,
@@ -8,7 +17,8 @@ from keyboards import (
     get_role_selection_keyboard,
     get_checklist_management_keyboard,
     get_statuses_for_checklist_keyboard,
-    get_checklist_creation_keyboard
+    get_checklist_creation_keyboard,
+    get_export_keyboard
 )
 from storage import (
     get_all_users,
@@ -22,9 +32,28 @@ from storage import (
     add_checklist_item,
     delete_checklist_item,
     get_all_checklists,
-    get_status_by_id
+    get_status_by_id,
+    get_developer_by_id,
+    get_status_history_report,
+    import_projects,
+    check_integrity,
+    repair_integrity,
+    get_workflow,
+    get_all_roles,
+    add_role,
+    delete_role,
+    get_role_users,
+    get_role_status_ids,
+    get_all_workspaces,
+    load_workspaces,
+    add_workspace_member,
+    get_user_workspace,
+    DEFAULT_WORKSPACE
 )
 from aiogram.fsm.state import State, StatesGroup
+from services.export import EXPORTS, EXPORT_FORMATS, prepare_export, write_export
+from services.importer import IMPORT_FIELDS, MAX_IMPORT_FILE_SIZE, parse_import_file
+import config
 
 router = Router()
 
@@ -34,7 +63,11 @@ class ChecklistCreation(StatesGroup):
     waiting_for_item_text = State()
 
 
-@router.message(F.text == "⚙️ Настройка бота")
+class ProjectImport(StatesGroup):
+    waiting_for_file = State()
+
+
+@text_handler("⚙️ Настройка бота")
 async def bot_settings_handler(message: Message):
     """Обработчик для кнопки 'Настройка бота'"""
     user_id = message.from_user.id
@@ -53,7 +86,7 @@ async def bot_settings_handler(message: Message):
     )
 
 
-@router.message(F.text == "👥 Выбор роли")
+@text_handler("👥 Выбор роли")
 async def role_selection_handler(message: Message):
     """Обработчик для кнопки 'Выбор роли'"""
     user_id = message.from_user.id
@@ -78,18 +111,17 @@ async def role_selection_handler(message: Message):
     await message.answer(
         "👥 Выбор роли\n\n"
         "Выберите пользователя для назначения роли:",
-        reply_markup=get_users_list_keyboard(users, "select_role")
+        reply_markup=get_users_list_keyboard(users, SELECT_ROLE)
     )
 
 
-@router.callback_query(F.data.startswith("select_role_"))
-async def select_user_for_role(callback: CallbackQuery):
+@callback_handler(SELECT_ROLE)
+async def select_user_for_role(callback: CallbackQuery, target_user_id: int):
     """Обработчик выбора пользователя для назначения роли"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ У вас нет прав доступа", show_alert=True)
         return
     
-    target_user_id = int(callback.data.split("_")[-1])
     target_user = get_user_by_id(target_user_id)
     
     if not target_user:
@@ -106,21 +138,18 @@ async def select_user_for_role(callback: CallbackQuery):
     
     await callback.message.answer(
         "Выберите роль:",
-        reply_markup=get_role_selection_keyboard(target_user_id)
+        reply_markup=get_role_selection_keyboard(target_user_id, get_all_roles())
     )
 
 
-@router.callback_query(F.data.startswith("set_role_"))
-async def set_user_role_callback(callback: CallbackQuery):
+@callback_handler(SET_ROLE)
+async def set_user_role_callback(callback: CallbackQuery, target_user_id: int, role: str):
     """Обработчик установки роли пользователю"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ У вас нет прав доступа", show_alert=True)
         return
     
-    # Парсим callback_data: set_role_{user_id}_{role}
-    parts = callback.data.split("_")
-    target_user_id = int(parts[2])
-    role = parts[3]  # admin, Игнат, Лёша, user
+    # role: admin, user или роль команды
     
     target_user = get_user_by_id(target_user_id)
     
@@ -132,8 +161,6 @@ async def set_user_role_callback(callback: CallbackQuery):
     if set_user_role(target_user_id, role):
         role_names = {
             "admin": "Админ",
-            "Игнат": "Игнат",
-            "Лёша": "Лёша",
             "user": "Пользователь"
         }
         role_name = role_names.get(role, role)
@@ -149,13 +176,13 @@ async def set_user_role_callback(callback: CallbackQuery):
         users = get_all_users()
         await callback.message.answer(
             "Выберите пользователя для назначения роли:",
-            reply_markup=get_users_list_keyboard(users, "select_role")
+            reply_markup=get_users_list_keyboard(users, SELECT_ROLE)
         )
     else:
         await callback.answer("❌ Ошибка при изменении роли", show_alert=True)
 
 
-@router.message(F.text == "📋 Управление чек-листами")
+@text_handler("📋 Управление чек-листами")
 async def checklist_management_handler(message: Message):
     """Обработчик для кнопки 'Управление чек-листами'"""
     user_id = message.from_user.id
@@ -174,7 +201,7 @@ async def checklist_management_handler(message: Message):
     )
 
 
-@router.message(F.text == "➕ Добавить чек-лист")
+@text_handler("➕ Добавить чек-лист")
 async def add_checklist_start(message: Message, state: FSMContext):
     """Начинает процесс добавления чек-листа"""
     user_id = message.from_user.id
@@ -197,18 +224,17 @@ async def add_checklist_start(message: Message, state: FSMContext):
     await message.answer(
         "➕ Добавление чек-листа\n\n"
         "Выберите статус для создания чек-листа:",
-        reply_markup=get_statuses_for_checklist_keyboard(statuses, "select_checklist_status")
+        reply_markup=get_statuses_for_checklist_keyboard(statuses, SELECT_CHECKLIST_STATUS)
     )
 
 
-@router.callback_query(F.data.startswith("select_checklist_status_"))
-async def select_checklist_status(callback: CallbackQuery, state: FSMContext):
+@callback_handler(SELECT_CHECKLIST_STATUS)
+async def select_checklist_status(callback: CallbackQuery, status_id: int, state: FSMContext):
     """Обработчик выбора статуса для чек-листа"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ У вас нет прав доступа", show_alert=True)
         return
     
-    status_id = int(callback.data.split("_")[-1])
     status = get_status_by_id(status_id)
     
     if not status:
@@ -288,7 +314,7 @@ async def process_checklist_item(message: Message, state: FSMContext):
     )
 
 
-@router.message(F.text == "📝 Редактировать чек-лист")
+@text_handler("📝 Редактировать чек-лист")
 async def edit_checklist_handler(message: Message):
     """Обработчик для редактирования чек-листа"""
     user_id = message.from_user.id
@@ -309,18 +335,17 @@ async def edit_checklist_handler(message: Message):
     await message.answer(
         "📝 Редактирование чек-листа\n\n"
         "Выберите статус для редактирования чек-листа:",
-        reply_markup=get_statuses_for_checklist_keyboard(statuses, "edit_checklist")
+        reply_markup=get_statuses_for_checklist_keyboard(statuses, EDIT_CHECKLIST)
     )
 
 
-@router.callback_query(F.data.startswith("edit_checklist_"))
-async def edit_checklist_callback(callback: CallbackQuery):
+@callback_handler(EDIT_CHECKLIST)
+async def edit_checklist_callback(callback: CallbackQuery, status_id: int):
     """Обработчик выбора статуса для редактирования чек-листа"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ У вас нет прав доступа", show_alert=True)
         return
     
-    status_id = int(callback.data.split("_")[-1])
     checklist = get_checklist_by_status_id(status_id)
     status = get_status_by_id(status_id)
     
@@ -349,12 +374,12 @@ async def edit_checklist_callback(callback: CallbackQuery):
         checklist_text += f"{i}. {item.text}\n"
         buttons.append([InlineKeyboardButton(
             text=f"🗑️ Удалить: {item.text[:30]}...",
-            callback_data=f"delete_checklist_item_{status_id}_{item.id}"
+            callback_data=DELETE_CHECKLIST_ITEM.pack(status_id, item.id)
         )])
     
     buttons.append([InlineKeyboardButton(
         text="🔙 Назад",
-        callback_data="back_to_checklist_menu"
+        callback_data=BACK_TO_CHECKLIST_MENU.pack()
     )])
     
     await callback.message.edit_text(
@@ -364,18 +389,13 @@ async def edit_checklist_callback(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("delete_checklist_item_"))
-async def delete_checklist_item_callback(callback: CallbackQuery):
+@callback_handler(DELETE_CHECKLIST_ITEM)
+async def delete_checklist_item_callback(callback: CallbackQuery, status_id: int, item_id: int):
     """Обработчик удаления пункта чек-листа"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ У вас нет прав доступа", show_alert=True)
         return
     
-    # Парсим: delete_checklist_item_{status_id}_{item_id}
-    parts = callback.data.split("_")
-    status_id = int(parts[3])
-    item_id = int(parts[4])
-    
     if delete_checklist_item(status_id, item_id):
         checklist = get_checklist_by_status_id(status_id)
         status = get_status_by_id(status_id)
@@ -399,12 +419,12 @@ async def delete_checklist_item_callback(callback: CallbackQuery):
             checklist_text += f"{i}. {item.text}\n"
             buttons.append([InlineKeyboardButton(
                 text=f"🗑️ Удалить: {item.text[:30]}...",
-                callback_data=f"delete_checklist_item_{status_id}_{item.id}"
+                callback_data=DELETE_CHECKLIST_ITEM.pack(status_id, item.id)
             )])
         
         buttons.append([InlineKeyboardButton(
             text="🔙 Назад",
-            callback_data="back_to_checklist_menu"
+            callback_data=BACK_TO_CHECKLIST_MENU.pack()
         )])
         
         await callback.message.edit_text(
@@ -416,7 +436,7 @@ async def delete_checklist_item_callback(callback: CallbackQuery):
         await callback.answer("❌ Ошибка при удалении", show_alert=True)
 
 
-@router.callback_query(F.data == "back_to_checklist_menu")
+@callback_handler(BACK_TO_CHECKLIST_MENU)
 async def back_to_checklist_menu_callback(callback: CallbackQuery):
     """Возврат в меню управления чек-листами"""
     if not is_admin(callback.from_user.id):
@@ -435,7 +455,7 @@ async def back_to_checklist_menu_callback(callback: CallbackQuery):
     )
 
 
-@router.message(F.text == "📋 Список чек-листов")
+@text_handler("📋 Список чек-листов")
 async def list_checklists_handler(message: Message):
     """Показывает список всех чек-листов"""
     user_id = message.from_user.id
@@ -467,15 +487,336 @@ async def list_checklists_handler(message: Message):
     )
 
 
-@router.message(F.text == "🔙 Главное меню")
-async def back_to_main_from_admin(message: Message, state: FSMContext):
-    """Возврат в главное меню из раздела админа"""
-    await state.clear()
+def _format_duration(seconds: float) -> str:
+    """Длительность в виде '2 д 5 ч', '3 ч 10 мин' или '12 мин'"""
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days} д {hours} ч"
+    if hours:
+        return f"{hours} ч {minutes} мин"
+    return f"{minutes} мин"
+
+
+@text_handler("📈 Отчет по статусам")
+async def status_report_handler(message: Message):
+    """Отчет по журналу переходов: время в статусах, завершения по неделям, время цикла"""
     user_id = message.from_user.id
-    user = get_user_by_id(user_id)
-    user_role = user.role if user else None
+    
+    if not is_admin(user_id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    report = get_status_history_report()
+    lines = ["📈 Отчет по статусам", "", "⏱ Среднее время в статусе:"]
+    
+    avg_time = report["avg_time_in_status"]
+    if avg_time:
+        for status_id, (seconds, visits) in sorted(avg_time.items()):
+            status = get_status_by_id(status_id)
+            status_name = status.name if status else f"ID:{status_id}"
+            lines.append(f"• {status_name}: {_format_duration(seconds)} ({visits} раз)")
+    else:
+        lines.append("Пока нет данных.")
+    
+    lines.extend(["", "📦 Ушло в архив по неделям:"])
+    for week, count in report["weekly_throughput"]:
+        lines.append(f"• с {week.strftime('%d.%m')}: {count}")
+    
+    lines.extend(["", "💻 Время цикла по разработчикам:"])
+    cycle_time = report["developer_cycle_time"]
+    if cycle_time:
+        for developer_id, (seconds, count) in sorted(cycle_time.items(), key=lambda item: item[1][0]):
+            developer = get_developer_by_id(developer_id)
+            developer_name = developer.name if developer else f"ID:{developer_id}"
+            lines.append(f"• {developer_name}: {_format_duration(seconds)} ({count} проектов)")
+    else:
+        lines.append("Пока нет завершенных проектов.")
+    
+    await message.answer("\n".join(lines), reply_markup=get_bot_settings_keyboard())
+
+
+@text_handler("📤 Экспорт данных")
+async def export_handler(message: Message):
+    """Выбор выгрузки проектов или истории статусов"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
     await message.answer(
-        "🔙 Главное меню",
-        reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user_role)
+        "📤 Экспорт данных\n\n"
+        "Выберите, что выгрузить:",
+        reply_markup=get_export_keyboard()
     )
 
+
+def _write_export_file(rows, fields, fmt: str, fd: int) -> int:
+    with os.fdopen(fd, "w", encoding="utf-8", newline="") as output:
+        return write_export(rows, fields, fmt, output)
+
+
+@callback_handler(EXPORT, flags={"rate_limit": 10})
+async def export_callback(callback: CallbackQuery, kind: str, fmt: str):
+    """Выгружает данные во временный файл построчно и отправляет его документом"""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа", show_alert=True)
+        return
+    
+    # kind: projects или history, fmt: csv или json
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        await callback.answer("⚠️ Кнопка устарела, откройте меню заново", show_alert=True)
+        return
+    await callback.answer("⏳ Готовлю файл...")
+    
+    # Снимок данных - здесь, в потоке цикла событий: индексы и кэши storage меняются
+    # обработчиками без блокировок. Формирование строк и запись файла - в отдельном
+    # потоке, чтобы не останавливать обработку апдейтов других пользователей
+    rows, fields = prepare_export(kind)
+    fd, path = tempfile.mkstemp(prefix=f"workbot-{kind}-", suffix=f".{fmt}")
+    try:
+        count = await asyncio.to_thread(_write_export_file, rows, fields, fmt, fd)
+        await callback.message.answer_document(
+            FSInputFile(path, filename=f"{kind}.{fmt}"),
+            caption=f"📤 Выгружено строк: {count}"
+        )
+    finally:
+        os.remove(path)
+
+
+@text_handler("📥 Импорт проектов")
+async def import_start_handler(message: Message, state: FSMContext):
+    """Начинает импорт проектов из файла"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    await state.set_state(ProjectImport.waiting_for_file)
+    await message.answer(
+        "📥 Импорт проектов\n\n"
+        "Отправьте файл .csv или .json.\n"
+        f"Колонки (ключи): {', '.join(IMPORT_FIELDS)}\n\n"
+        "Персонажи ищутся по имени, разработчики - по username; "
+        "если их нет, они будут созданы. Статус - название или ID, "
+        "по умолчанию первый статус.\n"
+        "Если в файле есть ошибки, ничего не импортируется.",
+        reply_markup=get_bot_settings_keyboard()
+    )
+
+
+@router.message(ProjectImport.waiting_for_file, F.document)
+async def import_file_handler(message: Message, state: FSMContext):
+    """Проверяет и импортирует файл одним пакетом"""
+    if not is_admin(message.from_user.id):
+        await state.clear()
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    document = message.document
+    if document.file_size is None or document.file_size > MAX_IMPORT_FILE_SIZE:
+        await message.answer(
+            f"❌ Файл слишком большой: не больше {MAX_IMPORT_FILE_SIZE // (1024 * 1024)} МБ.\n\n"
+            "Разделите файл на части и отправьте снова.",
+            reply_markup=get_bot_settings_keyboard()
+        )
+        return
+    
+    raw = await message.bot.download(document)
+    
+    try:
+        rows = parse_import_file(document.file_name, raw.read())
+        result = import_projects(rows, actor_id=message.from_user.id)
+    except ValueError as e:
+        errors = str(e).split("\n")
+        text = "\n".join(errors[:20])
+        if len(errors) > 20:
+            text += f"\n... и еще {len(errors) - 20} ошибок"
+        await message.answer(
+            f"❌ Импорт отменен, ничего не сохранено:\n\n{text}\n\n"
+            "Исправьте файл и отправьте снова.",
+            reply_markup=get_bot_settings_keyboard()
+        )
+        return
+    
+    await state.clear()
+    await message.answer(
+        f"✅ Импорт завершен!\n\n"
+        f"📁 Проектов: {result['projects']}\n"
+        f"🎭 Новых персонажей: {result['characters']}\n"
+        f"💻 Новых разработчиков: {result['developers']}",
+        reply_markup=get_bot_settings_keyboard()
+    )
+
+
+def _format_integrity_report(report: dict) -> str:
+    """Текст отчета проверки данных"""
+    def ids(values):
+        shown = ", ".join(str(v) for v in values[:20])
+        return shown + (f" и еще {len(values) - 20}" if len(values) > 20 else "")
+    
+    lines = []
+    if report["missing_character"]:
+        lines.append(f"🎭 Проекты с удаленным персонажем: {ids(report['missing_character'])}")
+    if report["missing_developer"]:
+        lines.append(f"💻 Проекты с удаленным разработчиком: {ids(report['missing_developer'])}")
+    if report["missing_status"]:
+        lines.append(f"📊 Проекты с удаленным статусом: {ids(report['missing_status'])}")
+    if report["stale_developer_stats"]:
+        lines.append(f"📈 Устаревшая статистика разработчиков: {ids(report['stale_developer_stats'])}")
+    if report["orphan_checklist_progress"]:
+        lines.append(f"☑️ Отметки чек-листов удаленных проектов: {report['orphan_checklist_progress']}")
+    return "\n".join(lines)
+
+
+@text_handler("🩺 Проверка данных")
+@router.message(Command("integrity"))
+async def integrity_check_handler(message: Message):
+    """Проверяет ссылки проектов и статистику, исправляя то, что исправляется автоматически"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    found = _format_integrity_report(check_integrity())
+    if not found:
+        await message.answer("🩺 Проверка данных\n\n✅ Проблем не найдено.", reply_markup=get_bot_settings_keyboard())
+        return
+    
+    remaining = _format_integrity_report(repair_integrity())
+    text = f"🩺 Проверка данных\n\nНайдено:\n{found}"
+    if remaining:
+        text += f"\n\nТребует ручного исправления:\n{remaining}"
+    else:
+        text += "\n\n✅ Все исправлено автоматически."
+    await message.answer(text, reply_markup=get_bot_settings_keyboard())
+
+
+@router.message(Command("roles"))
+async def roles_handler(message: Message):
+    """Показывает роли команды: пользователей и статусы каждой роли"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    text = "👥 Роли команды\n"
+    for role in get_all_roles():
+        users = get_role_users(role.name)
+        user_names = ", ".join(u.first_name or u.username or f"ID:{u.user_id}" for u in users) or "нет"
+        text += f"\n👤 {role.name}" + (" (управление)" if role.can_manage else "")
+        text += f"\n   Пользователи: {user_names}"
+        text += f"\n   Статусов: {len(get_role_status_ids(role.name))}"
+    text += (
+        "\n\n/addrole Имя - добавить роль"
+        "\n/addrole Имя manage - добавить роль с доступом к управлению"
+        "\n/delrole Имя - удалить роль"
+    )
+    await message.answer(text)
+
+
+@router.message(Command("addrole"))
+async def add_role_handler(message: Message, command: CommandObject):
+    """Добавляет роль команды: /addrole Имя [manage]"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    args = (command.args or "").split()
+    can_manage = bool(args) and args[-1] == "manage"
+    if can_manage:
+        args = args[:-1]
+    try:
+        role = add_role(" ".join(args), can_manage=can_manage)
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        return
+    await message.answer(f"✅ Роль '{role.name}' добавлена. Назначьте ее пользователям в \"👥 Выбор роли\".")
+
+
+@router.message(Command("delrole"))
+async def delete_role_handler(message: Message, command: CommandObject):
+    """Удаляет роль команды: /delrole Имя"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    name = (command.args or "").strip()
+    try:
+        deleted = delete_role(name)
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        return
+    if deleted:
+        await message.answer(f"✅ Роль '{name}' удалена, ее пользователи стали обычными пользователями.")
+    else:
+        await message.answer(f"❌ Роль '{name}' не найдена")
+
+
+@router.message(Command("workspaces"))
+async def workspaces_handler(message: Message):
+    """Показывает рабочие пространства (только владельцу бота из ADMIN_ID)"""
+    if message.from_user.id != config.ADMIN_ID:
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    members = load_workspaces()
+    text = "🏢 Рабочие пространства\n"
+    for workspace in get_all_workspaces():
+        if workspace == DEFAULT_WORKSPACE:
+            text += "\n• по умолчанию - все остальные пользователи"
+        else:
+            text += f"\n• {workspace} - пользователей: {len(members.get(workspace, []))}"
+    text += f"\n\nВаше пространство: {get_user_workspace(message.from_user.id) or 'по умолчанию'}"
+    text += "\n\n/workspace имя ID - перенести пользователя в пространство (создается автоматически)"
+    text += "\n/workspace - ID - вернуть пользователя в пространство по умолчанию"
+    await message.answer(text)
+
+
+@router.message(Command("workspace"))
+async def workspace_member_handler(message: Message, command: CommandObject):
+    """Переносит пользователя в рабочее пространство: /workspace имя ID"""
+    if message.from_user.id != config.ADMIN_ID:
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    args = (command.args or "").split()
+    if len(args) != 2 or not args[1].isdigit():
+        await message.answer("❌ Формат: /workspace имя ID (или /workspace - ID для пространства по умолчанию)")
+        return
+    
+    workspace = DEFAULT_WORKSPACE if args[0] == "-" else args[0]
+    try:
+        add_workspace_member(workspace, int(args[1]))
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        return
+    await message.answer(f"✅ Пользователь {args[1]} перенесен в пространство {workspace or 'по умолчанию'}")
+
+
+WORKFLOW_KIND_LABELS = {
+    "active": "в работе",
+    "published": "архив, опубликован",
+    "banned": "архив, заблокирован",
+    "archive": "архив",
+}
+
+
+@router.message(Command("workflow"))
+async def workflow_handler(message: Message):
+    """Показывает схему переходов между статусами"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    
+    workflow = get_workflow()
+    names = {s.id: s.name for s in get_all_statuses()}
+    
+    text = "🔀 Схема переходов\n"
+    if workflow.initial is not None:
+        text += f"Начальный статус: {names.get(workflow.initial, workflow.initial)}\n"
+    for status_id, name in names.items():
+        text += f"\n{name} ({WORKFLOW_KIND_LABELS[workflow.kinds[status_id]]})"
+        targets = workflow.next_options(status_id)
+        if targets:
+            text += "\n   → " + ", ".join(names[t] for t in targets)
+    text += "\n\nСхема задается файлом workflow.json, без него статусы идут по порядку ID."
+    await message.answer(text)
+
@@ -1,17 +1,24 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from callbacks import (
+    callback_handler, DELETE_CHARACTER, REASSIGN_CHARACTER, MOVE_CHARACTER_PROJECTS,
+    CASCADE_CHARACTER, CANCEL_REMOVE_CHARACTER
+)
+from routing import text_handler
 from keyboards import (
     get_main_menu_keyboard,
     get_characters_management_keyboard,
-    get_characters_list_keyboard
+    get_characters_list_keyboard,
+    get_in_use_delete_keyboard
 )
 from storage import (
     get_all_characters,
     add_character,
     delete_character,
-    get_character_by_id
+    get_character_by_id,
+    get_character_project_ids
 )
 
 router = Router()
@@ -21,18 +28,18 @@ class CharacterCreation(StatesGroup):
     waiting_for_name = State()
 
 
-@router.message(F.text == "🎭 Управление Персонажами")
+@text_handler("🎭 Управление Персонажами")
 async def characters_management_handler(message: Message):
     """Обработчик для кнопки 'Управление Персонажами'"""
-    from storage import get_user_by_id, is_admin
+    from storage import get_user_by_id, is_admin, has_manage_access
     user_id = message.from_user.id
     user = get_user_by_id(user_id)
     
-    # Проверяем, что пользователь имеет роль "Лёша" или является админом
-    if not user or (user.role != "Лёша" and not is_admin(user_id)):
+    # Проверяем, что у роли пользователя есть доступ к управлению или он админ
+    if not has_manage_access(user_id):
         await message.answer(
             "❌ У вас нет прав доступа к управлению персонажами.\n"
-            "Доступ разрешен только для пользователей с ролью 'Лёша'.",
+            "Доступ разрешен только для ролей с правом управления.",
             reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user.role if user else None)
         )
         return
@@ -44,7 +51,7 @@ async def characters_management_handler(message: Message):
     )
 
 
-@router.message(F.text == "📋 Список персонажей")
+@text_handler("📋 Список персонажей")
 async def list_characters_handler(message: Message):
     """Показывает список всех персонажей"""
     characters = get_all_characters()
@@ -65,7 +72,7 @@ async def list_characters_handler(message: Message):
     )
 
 
-@router.message(F.text == "➕ Добавить персонажа")
+@text_handler("➕ Добавить персонажа")
 async def add_character_start(message: Message, state: FSMContext):
     """Начинает процесс добавления персонажа"""
     await state.set_state(CharacterCreation.waiting_for_name)
@@ -103,7 +110,7 @@ async def process_character_name(message: Message, state: FSMContext):
     )
 
 
-@router.message(F.text == "🗑️ Удалить персонажа")
+@text_handler("🗑️ Удалить персонажа")
 async def delete_character_start(message: Message):
     """Начинает процесс удаления персонажа"""
     characters = get_all_characters()
@@ -117,22 +124,43 @@ async def delete_character_start(message: Message):
     
     await message.answer(
         "🗑️ Выберите персонажа для удаления:",
-        reply_markup=get_characters_list_keyboard(characters, "delete")
+        reply_markup=get_characters_list_keyboard(characters, DELETE_CHARACTER)
     )
 
 
-@router.callback_query(F.data.startswith("delete_character_"))
-async def process_delete_character(callback: CallbackQuery):
+@callback_handler(DELETE_CHARACTER)
+async def process_delete_character(callback: CallbackQuery, character_id: int):
     """Обрабатывает удаление персонажа"""
-    character_id = int(callback.data.split("_")[-1])
     character = get_character_by_id(character_id)
     
     if not character:
         await callback.answer("❌ Персонаж не найден", show_alert=True)
         return
     
-    # Удаляем персонажа
-    if delete_character(character_id):
+    # Персонаж в проектах - предлагаем передать проекты или удалить их
+    project_ids = get_character_project_ids(character_id)
+    if project_ids:
+        await callback.message.edit_text(
+            f"⚠️ Персонаж используется в проектах: {len(project_ids)}\n\n"
+            f"🎭 {character.name}\n\n"
+            f"Что сделать с проектами?",
+            reply_markup=get_in_use_delete_keyboard("character", character_id)
+        )
+        await callback.answer()
+        return
+    
+    await _finish_character_delete(callback, character)
+
+
+async def _finish_character_delete(callback: CallbackQuery, character, reassign_to: int = None, cascade: bool = False):
+    """Удаляет персонажа и возвращает в меню управления"""
+    try:
+        deleted = delete_character(character.id, reassign_to=reassign_to, cascade=cascade)
+    except ValueError as e:
+        await callback.answer(f"❌ {e}", show_alert=True)
+        return
+    
+    if deleted:
         await callback.message.edit_text(
             f"✅ Персонаж удален:\n\n"
             f"🎭 {character.name}"
@@ -155,16 +183,45 @@ async def process_delete_character(callback: CallbackQuery):
         )
 
 
-@router.message(F.text == "🔙 Главное меню")
-async def back_to_main_from_characters(message: Message, state: FSMContext):
-    """Возврат в главное меню из раздела персонажей"""
-    from storage import get_user_by_id, is_admin
-    await state.clear()
-    user_id = message.from_user.id
-    user = get_user_by_id(user_id)
-    user_role = user.role if user else None
-    await message.answer(
-        "🔙 Главное меню",
-        reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user_role)
+@callback_handler(REASSIGN_CHARACTER)
+async def reassign_character_callback(callback: CallbackQuery, character_id: int):
+    """Выбор персонажа, которому передать проекты удаляемого"""
+    others = [c for c in get_all_characters() if c.id != character_id]
+    
+    if not others:
+        await callback.answer("❌ Нет других персонажей", show_alert=True)
+        return
+    
+    await callback.message.edit_text(
+        "🔁 Кому передать проекты?",
+        reply_markup=get_characters_list_keyboard(others, MOVE_CHARACTER_PROJECTS.partial(character_id))
     )
+    await callback.answer()
+
+
+@callback_handler(MOVE_CHARACTER_PROJECTS)
+async def move_character_projects_callback(callback: CallbackQuery, character_id: int, target_id: int):
+    """Передает проекты другому персонажу и удаляет персонажа"""
+    character = get_character_by_id(character_id)
+    if not character:
+        await callback.answer("❌ Персонаж не найден", show_alert=True)
+        return
+    await _finish_character_delete(callback, character, reassign_to=target_id)
+
+
+@callback_handler(CASCADE_CHARACTER)
+async def cascade_character_callback(callback: CallbackQuery, character_id: int):
+    """Удаляет персонажа вместе с его проектами"""
+    character = get_character_by_id(character_id)
+    if not character:
+        await callback.answer("❌ Персонаж не найден", show_alert=True)
+        return
+    await _finish_character_delete(callback, character, cascade=True)
+
+
+@callback_handler(CANCEL_REMOVE_CHARACTER)
+async def cancel_delete_character_callback(callback: CallbackQuery):
+    """Отмена удаления персонажа"""
+    await callback.message.edit_text("❌ Удаление отменено")
+    await callback.answer()
 
@@ -1,17 +1,23 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from callbacks import (
+    callback_handler, DELETE_DEVELOPER, REASSIGN_DEVELOPER, MOVE_DEVELOPER_PROJECTS,
+    CASCADE_DEVELOPER, CANCEL_REMOVE_DEVELOPER
+)
+from routing import text_handler
 from keyboards import (
-    get_main_menu_keyboard,
     get_developers_management_keyboard,
-    get_developers_list_keyboard
+    get_developers_list_keyboard,
+    get_in_use_delete_keyboard
 )
 from storage import (
     get_all_developers,
     add_developer,
     delete_developer,
     get_developer_by_id,
+    get_developer_project_ids,
     recalculate_all_developers_stats
 )
 
@@ -23,7 +29,7 @@ class DeveloperCreation(StatesGroup):
     waiting_for_username = State()
 
 
-@router.message(F.text == "👥 Разработчики")
+@text_handler("👥 Разработчики")
 async def developers_management_handler(message: Message):
     """Обработчик для кнопки 'Разработчики'"""
     # Пересчитываем статистику перед показом
@@ -50,7 +56,7 @@ async def developers_management_handler(message: Message):
     )
 
 
-@router.message(F.text == "📋 Список разработчиков")
+@text_handler("📋 Список разработчиков")
 async def list_developers_handler(message: Message):
     """Показывает список всех разработчиков"""
     # Пересчитываем статистику перед показом
@@ -74,7 +80,7 @@ async def list_developers_handler(message: Message):
     )
 
 
-@router.message(F.text == "➕ Добавить разработчика")
+@text_handler("➕ Добавить разработчика")
 async def add_developer_start(message: Message, state: FSMContext):
     """Начинает процесс добавления разработчика"""
     await state.set_state(DeveloperCreation.waiting_for_name)
@@ -138,7 +144,7 @@ async def process_developer_username(message: Message, state: FSMContext):
     )
 
 
-@router.message(F.text == "🗑️ Удалить разработчика")
+@text_handler("🗑️ Удалить разработчика")
 async def delete_developer_start(message: Message):
     """Начинает процесс удаления разработчика"""
     developers = get_all_developers()
@@ -152,22 +158,43 @@ async def delete_developer_start(message: Message):
     
     await message.answer(
         "🗑️ Выберите разработчика для удаления:",
-        reply_markup=get_developers_list_keyboard(developers, "delete")
+        reply_markup=get_developers_list_keyboard(developers, DELETE_DEVELOPER)
     )
 
 
-@router.callback_query(F.data.startswith("delete_developer_"))
-async def process_delete_developer(callback: CallbackQuery):
+@callback_handler(DELETE_DEVELOPER)
+async def process_delete_developer(callback: CallbackQuery, developer_id: int):
     """Обрабатывает удаление разработчика"""
-    developer_id = int(callback.data.split("_")[-1])
     developer = get_developer_by_id(developer_id)
     
     if not developer:
         await callback.answer("❌ Разработчик не найден", show_alert=True)
         return
     
-    # Удаляем разработчика
-    if delete_developer(developer_id):
+    # На разработчика назначены проекты - предлагаем передать их или удалить
+    project_ids = get_developer_project_ids(developer_id)
+    if project_ids:
+        await callback.message.edit_text(
+            f"⚠️ На разработчика назначены проекты: {len(project_ids)}\n\n"
+            f"👤 {developer.name} (@{developer.username})\n\n"
+            f"Что сделать с проектами?",
+            reply_markup=get_in_use_delete_keyboard("developer", developer_id)
+        )
+        await callback.answer()
+        return
+    
+    await _finish_developer_delete(callback, developer)
+
+
+async def _finish_developer_delete(callback: CallbackQuery, developer, reassign_to: int = None, cascade: bool = False):
+    """Удаляет разработчика и возвращает в меню управления"""
+    try:
+        deleted = delete_developer(developer.id, reassign_to=reassign_to, cascade=cascade)
+    except ValueError as e:
+        await callback.answer(f"❌ {e}", show_alert=True)
+        return
+    
+    if deleted:
         await callback.message.edit_text(
             f"✅ Разработчик удален:\n\n"
             f"👤 {developer.name} (@{developer.username})"
@@ -190,16 +217,45 @@ async def process_delete_developer(callback: CallbackQuery):
         )
 
 
-@router.message(F.text == "🔙 Главное меню")
-async def back_to_main_from_developers(message: Message, state: FSMContext):
-    """Возврат в главное меню из раздела разработчиков"""
-    from storage import get_user_by_id, is_admin
-    await state.clear()
-    user_id = message.from_user.id
-    user = get_user_by_id(user_id)
-    user_role = user.role if user else None
-    await message.answer(
-        "🔙 Главное меню",
-        reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user_role)
+@callback_handler(REASSIGN_DEVELOPER)
+async def reassign_developer_callback(callback: CallbackQuery, developer_id: int):
+    """Выбор разработчика, которому передать проекты удаляемого"""
+    others = [d for d in get_all_developers() if d.id != developer_id]
+    
+    if not others:
+        await callback.answer("❌ Нет других разработчиков", show_alert=True)
+        return
+    
+    await callback.message.edit_text(
+        "🔁 Кому передать проекты?",
+        reply_markup=get_developers_list_keyboard(others, MOVE_DEVELOPER_PROJECTS.partial(developer_id))
     )
+    await callback.answer()
+
+
+@callback_handler(MOVE_DEVELOPER_PROJECTS)
+async def move_developer_projects_callback(callback: CallbackQuery, developer_id: int, target_id: int):
+    """Передает проекты другому разработчику и удаляет разработчика"""
+    developer = get_developer_by_id(developer_id)
+    if not developer:
+        await callback.answer("❌ Разработчик не найден", show_alert=True)
+        return
+    await _finish_developer_delete(callback, developer, reassign_to=target_id)
+
+
+@callback_handler(CASCADE_DEVELOPER)
+async def cascade_developer_callback(callback: CallbackQuery, developer_id: int):
+    """Удаляет разработчика вместе с его проектами"""
+    developer = get_developer_by_id(developer_id)
+    if not developer:
+        await callback.answer("❌ Разработчик не найден", show_alert=True)
+        return
+    await _finish_developer_delete(callback, developer, cascade=True)
+
+
+@callback_handler(CANCEL_REMOVE_DEVELOPER)
+async def cancel_delete_developer_callback(callback: CallbackQuery):
+    """Отмена удаления разработчика"""
+    await callback.message.edit_text("❌ Удаление отменено")
+    await callback.answer()
 
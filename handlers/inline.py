@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from typing import List, Tuple
+
+from aiogram import Router
+from aiogram.types import (
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultsButton,
+    InputTextMessageContent
+)
+from config import INLINE_CACHE_TIME
+from indexes import normalize_text
+from storage import (
+    get_user_by_id,
+    is_admin,
+    search_projects,
+    query_projects,
+    get_character_by_id,
+    get_status_by_id,
+    get_data_version
+)
+
+router = Router()
+
+# Результатов на одну страницу (Telegram допускает до 50)
+INLINE_PAGE_SIZE = 20
+# Сколько ответов хранить в кэше (по пользователю, запросу и странице)
+INLINE_CACHE_SIZE = 1000
+
+# (user_id, нормализованный запрос, offset) -> (версия данных, результаты, next_offset)
+_results_cache: "OrderedDict[tuple, Tuple[tuple, List[InlineQueryResultArticle], str]]" = OrderedDict()
+
+
+def _project_article(project) -> InlineQueryResultArticle:
+    """Карточка проекта для inline-ответа"""
+    character = get_character_by_id(project.character_id)
+    status = get_status_by_id(project.status_id)
+    character_name = character.name if character else f"ID:{project.character_id}"
+    status_name = status.name if status else f"ID:{project.status_id}"
+    
+    return InlineQueryResultArticle(
+        id=str(project.id),
+        title=project.name,
+        description=f"🎭 {character_name} • 📊 {status_name}",
+        input_message_content=InputTextMessageContent(
+            message_text=f"📁 {project.name}\n🎭 Персонаж: {character_name}\n📊 Статус: {status_name}"
+        )
+    )
+
+
+def _build_results(query: str, offset: int) -> Tuple[List[InlineQueryResultArticle], str]:
+    """Страница результатов и смещение следующей страницы ("" - страниц больше нет)"""
+    limit = offset + INLINE_PAGE_SIZE + 1
+    if query:
+        projects = search_projects(query, limit=limit)
+    else:
+        # Пустой запрос - последние активные проекты
+        projects = query_projects(scope="active", sort="-id", limit=limit)
+    
+    page = projects[offset:offset + INLINE_PAGE_SIZE]
+    next_offset = str(offset + INLINE_PAGE_SIZE) if len(projects) > offset + INLINE_PAGE_SIZE else ""
+    return [_project_article(project) for project in page], next_offset
+
+
+def _get_results(user_id: int, query: str, offset: int) -> Tuple[List[InlineQueryResultArticle], str]:
+    """Результаты из кэша пользователя, если данные не менялись с момента ответа"""
+    key = (user_id, normalize_text(query), offset)
+    version = get_data_version()
+    cached = _results_cache.get(key)
+    if cached is not None and cached[0] == version:
+        _results_cache.move_to_end(key)
+        return cached[1], cached[2]
+    
+    results, next_offset = _build_results(query, offset)
+    _results_cache[key] = (version, results, next_offset)
+    _results_cache.move_to_end(key)
+    while len(_results_cache) > INLINE_CACHE_SIZE:
+        _results_cache.popitem(last=False)
+    return results, next_offset
+
+
+@router.inline_query()
+async def inline_search_handler(inline_query: InlineQuery):
+    """Inline-поиск проектов: @bot название"""
+    user_id = inline_query.from_user.id
+    
+    # Данные проектов доступны только пользователям бота
+    if not is_admin(user_id) and get_user_by_id(user_id) is None:
+        await inline_query.answer(
+            [],
+            cache_time=INLINE_CACHE_TIME,
+            is_personal=True,
+            button=InlineQueryResultsButton(text="Открыть бота", start_parameter="inline")
+        )
+        return
+    
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    results, next_offset = _get_results(user_id, inline_query.query.strip(), offset)
+    
+    await inline_query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=True,
+        next_offset=next_offset
+    )
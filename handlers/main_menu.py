@@ -1,5 +1,11 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
+from aiogram.fsm.context import FSMContext
+from callbacks import (
+    callback_handler, FILTER_ARCHIVE_PUBLISHED, FILTER_ARCHIVE_BANNED, FILTER_ARCHIVE_ALL,
+    BACK_TO_MAIN_FROM_ARCHIVE, RESTORE_PROJECT
+)
+from routing import text_handler
 from keyboards import get_main_menu_keyboard, get_project_actions_keyboard, get_archive_filters_keyboard
 from storage import (
     get_user_by_id,
@@ -12,9 +18,14 @@ from storage import (
     get_published_projects,
     get_banned_projects,
     get_all_statuses,
+    get_first_status,
     get_project_by_id,
     update_project_status,
-    is_archive_status
+    is_archive_status,
+    get_project_counts,
+    is_team_role,
+    get_all_roles,
+    get_workflow
 )
 
 
@@ -31,22 +42,28 @@ def format_status_name(status) -> str:
 router = Router()
 
 
-@router.message(F.text == "📦 Архив")
+def _archive_summary(title: str, total_label: str) -> str:
+    """Заголовок архива со счетчиками из индекса проектов"""
+    counts = get_project_counts()
+    return (
+        f"{title}\n\n"
+        f"✅ Опубликовано: {counts['published']}\n"
+        f"🚫 Заблокировано: {counts['banned']}\n\n"
+        f"{total_label}: {counts['archive']}"
+    )
+
+
+@text_handler("📦 Архив")
 async def archive_handler(message: Message):
     """Обработчик для кнопки 'Архив'"""
     user_id = message.from_user.id
     user = get_user_by_id(user_id)
     user_role = user.role if user else None
     
-    published_projects = get_published_projects()
-    banned_projects = get_banned_projects()
     archive_projects = get_archive_projects()
     
     await message.answer(
-        f"📦 Архив\n\n"
-        f"✅ Опубликовано: {len(published_projects)}\n"
-        f"🚫 Заблокировано: {len(banned_projects)}\n\n"
-        f"Всего в архиве: {len(archive_projects)}",
+        _archive_summary("📦 Архив", "Всего в архиве"),
         reply_markup=get_archive_filters_keyboard()
     )
     
@@ -60,8 +77,15 @@ async def archive_handler(message: Message):
         )
 
 
+_ARCHIVE_KIND_LABELS = {
+    "published": "✅ Опубликован",
+    "banned": "🚫 Заблокирован",
+}
+
+
 async def _show_archive_projects(message: Message, projects: list):
     """Вспомогательная функция для отображения архивных проектов"""
+    kinds = get_workflow().kinds
     for i, project in enumerate(projects, 1):
         character = get_character_by_id(project.character_id)
         developer = get_developer_by_id(project.developer_id)
@@ -72,8 +96,8 @@ async def _show_archive_projects(message: Message, projects: list):
         developer_username = f"@{developer.username}" if developer and developer.username else ""
         status_name = format_status_name(status) if status else f"ID:{project.status_id}"
         
-        # Определяем тип архива
-        archive_type = "✅ Опубликован" if status and status.name == "Живой" else "🚫 Заблокирован"
+        # Тип архива - по виду статуса в схеме переходов
+        archive_type = _ARCHIVE_KIND_LABELS.get(kinds.get(project.status_id), "📦 В архиве")
         
         project_text = f"{i}. 📁 {project.name}\n"
         project_text += f"🎭 Персонаж: {character_name}\n"
@@ -89,19 +113,20 @@ async def _show_archive_projects(message: Message, projects: list):
         )
 
 
-@router.message(F.text == "✅ Мои Задачи")
+@text_handler("✅ Мои Задачи")
 async def my_tasks_handler(message: Message):
     """Обработчик для кнопки 'Мои Задачи'"""
     user_id = message.from_user.id
     user = get_user_by_id(user_id)
     
     # Проверяем роль пользователя
-    if not user or user.role not in ["Игнат", "Лёша"]:
+    if not user or not is_team_role(user.role):
+        role_names = ", ".join(f"'{role.name}'" for role in get_all_roles())
         await message.answer(
             "✅ Мои Задачи\n\n"
             "У вас нет назначенных задач.\n"
-            "Задачи назначаются только пользователям с ролями 'Игнат' или 'Лёша'.",
-            reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user.role)
+            f"Задачи назначаются только пользователям с ролями команды: {role_names}.",
+            reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user.role if user else None)
         )
         return
     
@@ -147,7 +172,7 @@ async def my_tasks_handler(message: Message):
         )
 
 
-@router.callback_query(F.data == "filter_archive_published")
+@callback_handler(FILTER_ARCHIVE_PUBLISHED)
 async def filter_archive_published_callback(callback: CallbackQuery):
     """Фильтр архива: только опубликованные"""
     published_projects = get_published_projects()
@@ -167,7 +192,7 @@ async def filter_archive_published_callback(callback: CallbackQuery):
         )
 
 
-@router.callback_query(F.data == "filter_archive_banned")
+@callback_handler(FILTER_ARCHIVE_BANNED)
 async def filter_archive_banned_callback(callback: CallbackQuery):
     """Фильтр архива: только заблокированные"""
     banned_projects = get_banned_projects()
@@ -187,19 +212,12 @@ async def filter_archive_banned_callback(callback: CallbackQuery):
         )
 
 
-@router.callback_query(F.data == "filter_archive_all")
+@callback_handler(FILTER_ARCHIVE_ALL)
 async def filter_archive_all_callback(callback: CallbackQuery):
     """Фильтр архива: все архивные"""
     archive_projects = get_archive_projects()
-    published_projects = get_published_projects()
-    banned_projects = get_banned_projects()
     
-    await callback.message.edit_text(
-        f"📦 Архив - Все\n\n"
-        f"✅ Опубликовано: {len(published_projects)}\n"
-        f"🚫 Заблокировано: {len(banned_projects)}\n\n"
-        f"Всего: {len(archive_projects)}"
-    )
+    await callback.message.edit_text(_archive_summary("📦 Архив - Все", "Всего"))
     await callback.answer()
     
     if archive_projects:
@@ -211,7 +229,7 @@ async def filter_archive_all_callback(callback: CallbackQuery):
         )
 
 
-@router.callback_query(F.data == "back_to_main_from_archive")
+@callback_handler(BACK_TO_MAIN_FROM_ARCHIVE)
 async def back_to_main_from_archive_callback(callback: CallbackQuery):
     """Возврат в главное меню из архива"""
     from storage import get_user_by_id, is_admin
@@ -228,10 +246,9 @@ async def back_to_main_from_archive_callback(callback: CallbackQuery):
     )
 
 
-@router.callback_query(F.data.startswith("restore_project_"))
-async def restore_project_callback(callback: CallbackQuery):
+@callback_handler(RESTORE_PROJECT)
+async def restore_project_callback(callback: CallbackQuery, project_id: int):
     """Обработчик возврата проекта из архива в активные"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -243,19 +260,22 @@ async def restore_project_callback(callback: CallbackQuery):
         await callback.answer("❌ Проект не в архиве", show_alert=True)
         return
     
-    # Находим первый не-архивный статус для возврата
-    all_statuses = get_all_statuses()
-    non_archive_statuses = [s for s in all_statuses if not is_archive_status(s.id)]
-    
-    if not non_archive_statuses:
-        await callback.answer("❌ Нет доступных статусов для возврата", show_alert=True)
-        return
-    
-    # Берем первый статус (самый ранний по ID)
-    first_status = min(non_archive_statuses, key=lambda s: s.id)
+    # Возвращаем в начальный статус схемы переходов, а если он архивный -
+    # в первый не-архивный статус
+    first_status = get_first_status()
+    if first_status is None or is_archive_status(first_status.id):
+        all_statuses = get_all_statuses()
+        non_archive_statuses = [s for s in all_statuses if not is_archive_status(s.id)]
+        
+        if not non_archive_statuses:
+            await callback.answer("❌ Нет доступных статусов для возврата", show_alert=True)
+            return
+        
+        # Берем первый статус (самый ранний по ID)
+        first_status = min(non_archive_statuses, key=lambda s: s.id)
     
     # Обновляем статус проекта
-    if update_project_status(project_id, first_status.id):
+    if update_project_status(project_id, first_status.id, actor_id=callback.from_user.id):
         character = get_character_by_id(project.character_id)
         developer = get_developer_by_id(project.developer_id)
         new_status = get_status_by_id(first_status.id)
@@ -274,14 +294,9 @@ async def restore_project_callback(callback: CallbackQuery):
         
         # Обновляем список архива
         archive_projects = get_archive_projects()
-        published_projects = get_published_projects()
-        banned_projects = get_banned_projects()
         
         await callback.message.answer(
-            f"📦 Архив\n\n"
-            f"✅ Опубликовано: {len(published_projects)}\n"
-            f"🚫 Заблокировано: {len(banned_projects)}\n\n"
-            f"Всего в архиве: {len(archive_projects)}",
+            _archive_summary("📦 Архив", "Всего в архиве"),
             reply_markup=get_archive_filters_keyboard()
         )
         
@@ -290,3 +305,16 @@ async def restore_project_callback(callback: CallbackQuery):
     else:
         await callback.answer("❌ Ошибка при возврате проекта", show_alert=True)
 
+
+@text_handler("🔙 Главное меню")
+async def back_to_main_menu(message: Message, state: FSMContext):
+    """Возврат в главное меню из любого раздела"""
+    await state.clear()
+    user_id = message.from_user.id
+    user = get_user_by_id(user_id)
+    user_role = user.role if user else None
+    await message.answer(
+        "🔙 Главное меню",
+        reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user_role)
+    )
+
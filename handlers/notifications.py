@@ -1,6 +1,8 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from callbacks import callback_handler, SET_INTERVAL
+from routing import text_handler
 from keyboards import (
     get_main_menu_keyboard,
     get_notification_settings_keyboard,
@@ -15,7 +17,7 @@ from storage import (
 router = Router()
 
 
-@router.message(F.text == "🔔 Настройки уведомлений")
+@text_handler("🔔 Настройки уведомлений")
 async def notification_settings_handler(message: Message):
     """Обработчик для настроек уведомлений"""
     user_id = message.from_user.id
@@ -72,11 +74,10 @@ async def change_interval_handler(message: Message):
     )
 
 
-@router.callback_query(F.data.startswith("set_interval_"))
-async def set_interval_callback(callback: CallbackQuery):
+@callback_handler(SET_INTERVAL)
+async def set_interval_callback(callback: CallbackQuery, interval: int):
     """Обработчик установки интервала уведомлений"""
     user_id = callback.from_user.id
-    interval = int(callback.data.split("_")[-1])
     
     if update_user_notifications(user_id, interval=interval):
         user = get_user_by_id(user_id)
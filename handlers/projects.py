@@ -1,10 +1,22 @@
+from collections import Counter
+from typing import List, Optional
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup, default_state
+from callbacks import (
+    callback_handler, FILTER_BY_STATUS, FILTER_STATUS, FILTER_BY_CHARACTER, FILTER_CHARACTER,
+    FILTER_BY_DEVELOPER, FILTER_DEVELOPER, BATCH_ACTIONS, BATCH_MOVE, BATCH_STATUS, BATCH_REASSIGN,
+    BATCH_DEVELOPER, BATCH_DELETE, BATCH_DELETE_CONFIRM, BATCH_CANCEL, RESET_FILTERS,
+    BACK_TO_PROJECTS, SELECT_CHARACTER, SELECT_DEVELOPER, EDIT_PROJECT, EDIT_FIELD_NAME,
+    EDIT_FIELD_CHARACTER, EDIT_CHARACTER, EDIT_FIELD_DEVELOPER, EDIT_DEVELOPER, EDIT_FIELD_STATUS,
+    EDIT_STATUS, CANCEL_EDIT, PREV_STATUS, NEXT_STATUS, TOGGLE_CHECKLIST, CONFIRM_NEXT_STATUS,
+    MOVE_STATUS, BACK_TO_PROJECT, DELETE_PROJECT, CONFIRM_DELETE, CANCEL_DELETE
+)
+from routing import text_handler
 from keyboards import (
-    get_main_menu_keyboard,
     get_active_projects_keyboard,
     get_characters_list_keyboard,
     get_developers_list_keyboard,
@@ -13,7 +25,12 @@ from keyboards import (
     get_checklist_keyboard,
     get_filters_keyboard,
     get_edit_project_keyboard,
-    get_statuses_list_keyboard
+    get_statuses_list_keyboard,
+    get_filter_refine_keyboard,
+    get_project_filters_keyboard,
+    get_batch_actions_keyboard,
+    get_batch_delete_confirm_keyboard,
+    get_status_choice_keyboard
 )
 from storage import (
     get_all_projects,
@@ -33,11 +50,19 @@ from storage import (
     update_project_status,
     update_project,
     delete_project,
-    get_next_status_id,
-    get_prev_status_id,
-    get_checklist_by_status_id,
+    get_next_status_ids,
+    get_prev_status_ids,
+    can_move_status,
+    get_workflow,
+    get_project_checklist,
     reset_checklist,
-    is_archive_status
+    is_archive_status,
+    query_projects,
+    get_project_counts,
+    batch_update_projects,
+    batch_delete_projects,
+    search_projects,
+    has_manage_access
 )
 
 router = Router()
@@ -68,7 +93,11 @@ class ProjectEdit(StatesGroup):
     waiting_for_status = State()
 
 
-@router.message(F.text == "📋 Проекты")
+class ProjectSearch(StatesGroup):
+    waiting_for_query = State()
+
+
+@text_handler("📋 Проекты")
 async def active_projects_handler(message: Message, state: FSMContext):
     """Обработчик для кнопки 'Проекты'"""
     # Очищаем состояние, если оно было активно
@@ -77,7 +106,9 @@ async def active_projects_handler(message: Message, state: FSMContext):
         await state.clear()
     
     # Очищаем фильтры из состояния
-    await state.update_data(filter_status_id=None, filter_character_id=None, filter_developer_id=None)
+    await state.update_data(
+        filter_status_id=None, filter_character_id=None, filter_developer_id=None, batch_project_ids=None
+    )
     
     projects = get_active_projects()  # Показываем только активные проекты
     
@@ -124,16 +155,72 @@ async def _show_projects(message: Message, projects: list):
         
         await message.answer(
             project_text,
-            reply_markup=get_project_actions_keyboard(project.id, is_archive=False)
+            reply_markup=get_project_actions_keyboard(project.id, is_archive=is_archive_status(project.status_id))
+        )
+
+
+async def _answer_search(message: Message, query: str):
+    """Ищет проекты (включая архив) и показывает лучшие совпадения"""
+    projects = search_projects(query, limit=10)
+    if not projects:
+        await message.answer(
+            f"🔎 По запросу «{query}» ничего не найдено.",
+            reply_markup=get_active_projects_keyboard()
         )
+        return
+    
+    await message.answer(
+        f"🔎 Результаты поиска «{query}»: {len(projects)}",
+        reply_markup=get_active_projects_keyboard()
+    )
+    await _show_projects(message, projects)
+
+
+@router.message(Command("search"))
+async def search_command(message: Message, command: CommandObject, state: FSMContext):
+    """Поиск проектов: /search текст"""
+    if command.args and command.args.strip():
+        await state.set_state(None)
+        await _answer_search(message, command.args.strip())
+        return
+    
+    await state.set_state(ProjectSearch.waiting_for_query)
+    await message.answer("🔎 Введите название проекта, персонажа или разработчика:")
+
+
+@text_handler("🔎 Поиск")
+async def search_button_handler(message: Message, state: FSMContext):
+    """Обработчик для кнопки 'Поиск'"""
+    await state.set_state(ProjectSearch.waiting_for_query)
+    await message.answer("🔎 Введите название проекта, персонажа или разработчика:")
+
 
+@router.message(ProjectSearch.waiting_for_query, F.text)
+async def process_search_query(message: Message, state: FSMContext):
+    """Выполняет поиск по введенному тексту"""
+    await state.set_state(None)
+    await _answer_search(message, message.text.strip())
 
-@router.message(F.text == "🔍 Фильтры")
-async def filters_handler(message: Message):
+
+def _active_status_counts() -> dict:
+    """Количество активных проектов по статусам (без архивных статусов)"""
+    return {
+        status_id: count
+        for status_id, count in get_project_counts()["by_status"].items()
+        if not is_archive_status(status_id)
+    }
+
+
+@text_handler("🔍 Фильтры")
+async def filters_handler(message: Message, state: FSMContext):
     """Обработчик для кнопки 'Фильтры' - показывает только статусы с проектами"""
-    projects = get_active_projects()  # Показываем только активные проекты
+    # Новый выбор фильтров не должен смешиваться с фильтрами прошлого раза
+    await state.update_data(
+        filter_status_id=None, filter_character_id=None, filter_developer_id=None, batch_project_ids=None
+    )
     
-    if not projects:
+    # Показываем только активные проекты
+    if not get_project_counts()["active"]:
         await message.answer(
             "📋 Проекты\n\n"
             "Проектов пока нет.\n"
@@ -142,10 +229,8 @@ async def filters_handler(message: Message):
         )
         return
     
-    # Подсчитываем проекты по статусам
-    status_counts = {}
-    for project in projects:
-        status_counts[project.status_id] = status_counts.get(project.status_id, 0) + 1
+    # Количество активных проектов по статусам берем из счетчиков индекса
+    status_counts = _active_status_counts()
     
     # Получаем только статусы, в которых есть проекты (больше 0)
     all_statuses = get_all_statuses()
@@ -158,27 +243,30 @@ async def filters_handler(message: Message):
         )
         return
     
-    from keyboards import get_status_list_keyboard
     await message.answer(
         "🔍 Фильтры проектов\n\n"
         "Выберите статус для просмотра проектов:",
-        reply_markup=get_status_list_keyboard(statuses_with_projects, "filter_status", status_counts)
+        reply_markup=get_project_filters_keyboard(statuses_with_projects, status_counts)
     )
 
 
-@router.callback_query(F.data == "filter_by_status")
-async def filter_by_status_callback(callback: CallbackQuery):
+def _refine_counts(data: dict, filter_key: str, field: str) -> dict:
+    """Сколько проектов найдется при выборе каждого значения field вместе с остальными
+    фильтрами из состояния (выбранное значение заменит текущий фильтр filter_key)
+    """
+    return dict(Counter(getattr(p, field) for p in _query_filtered_projects({**data, filter_key: None})))
+
+
+@callback_handler(FILTER_BY_STATUS)
+async def filter_by_status_callback(callback: CallbackQuery, state: FSMContext):
     """Обработчик фильтра по статусу - показывает только статусы с проектами"""
-    projects = get_active_projects()  # Показываем только активные проекты
-    
-    if not projects:
+    # Показываем только активные проекты
+    if not get_project_counts()["active"]:
         await callback.answer("❌ Нет проектов", show_alert=True)
         return
     
-    # Подсчитываем проекты по статусам
-    status_counts = {}
-    for project in projects:
-        status_counts[project.status_id] = status_counts.get(project.status_id, 0) + 1
+    # Количество проектов по статусам - с учетом выбранных персонажа и разработчика
+    status_counts = _refine_counts(await state.get_data(), "filter_status_id", "status_id")
     
     # Получаем только статусы, в которых есть проекты
     all_statuses = get_all_statuses()
@@ -188,30 +276,52 @@ async def filter_by_status_callback(callback: CallbackQuery):
         await callback.answer("❌ Нет статусов с проектами", show_alert=True)
         return
     
-    from keyboards import get_status_list_keyboard
     await callback.message.edit_text(
         "🔍 Фильтр по статусу\n\n"
         "Выберите статус для просмотра проектов:",
-        reply_markup=get_status_list_keyboard(statuses_with_projects, "filter_status")
+        reply_markup=get_project_filters_keyboard(statuses_with_projects, status_counts)
     )
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("filter_status_"))
-async def apply_status_filter(callback: CallbackQuery, state: FSMContext):
-    """Применяет фильтр по статусу"""
-    status_id = int(callback.data.split("_")[-1])
-    await state.update_data(filter_status_id=status_id)
+_FILTER_KEYS = ("filter_status_id", "filter_character_id", "filter_developer_id")
+
+
+def _query_filtered_projects(data: dict):
+    """Активные проекты по фильтрам из данных состояния"""
+    return query_projects(
+        status_id=data.get("filter_status_id"),
+        character_id=data.get("filter_character_id"),
+        developer_id=data.get("filter_developer_id"),
+        scope="active"
+    )
+
+
+async def _show_filtered_projects(callback: CallbackQuery, state: FSMContext):
+    """Показывает проекты с учетом всех фильтров из состояния (статус, персонаж, разработчик)"""
+    data = await state.get_data()
+    status_id = data.get("filter_status_id")
+    character_id = data.get("filter_character_id")
+    developer_id = data.get("filter_developer_id")
     
-    projects = get_active_projects()  # Показываем только активные проекты
-    filtered_projects = [p for p in projects if p.status_id == status_id]
+    # Показываем только активные проекты
+    filtered_projects = _query_filtered_projects(data)
     
-    status = get_status_by_id(status_id)
-    status_name = format_status_name(status) if status else f"ID:{status_id}"
+    conditions = []
+    if status_id is not None:
+        status = get_status_by_id(status_id)
+        conditions.append(f"Статус = {format_status_name(status) if status else f'ID:{status_id}'}")
+    if character_id is not None:
+        character = get_character_by_id(character_id)
+        conditions.append(f"Персонаж = {character.name if character else f'ID:{character_id}'}")
+    if developer_id is not None:
+        developer = get_developer_by_id(developer_id)
+        conditions.append(f"Разработчик = {developer.name if developer else f'ID:{developer_id}'}")
     
     await callback.message.edit_text(
-        f"🔍 Фильтр: Статус = {status_name}\n\n"
-        f"Найдено проектов: {len(filtered_projects)}"
+        f"🔍 Фильтр: {'; '.join(conditions) or 'нет'}\n\n"
+        f"Найдено проектов: {len(filtered_projects)}",
+        reply_markup=get_filter_refine_keyboard()
     )
     await callback.answer()
     
@@ -224,8 +334,15 @@ async def apply_status_filter(callback: CallbackQuery, state: FSMContext):
         )
 
 
-@router.callback_query(F.data == "filter_by_character")
-async def filter_by_character_callback(callback: CallbackQuery):
+@callback_handler(FILTER_STATUS)
+async def apply_status_filter(callback: CallbackQuery, status_id: int, state: FSMContext):
+    """Применяет фильтр по статусу (вместе с уже выбранными фильтрами)"""
+    await state.update_data(filter_status_id=status_id)
+    await _show_filtered_projects(callback, state)
+
+
+@callback_handler(FILTER_BY_CHARACTER)
+async def filter_by_character_callback(callback: CallbackQuery, state: FSMContext):
     """Обработчик фильтра по персонажу"""
     characters = get_all_characters()
     
@@ -236,86 +353,209 @@ async def filter_by_character_callback(callback: CallbackQuery):
     await callback.message.edit_text(
         "🔍 Фильтр по персонажу\n\n"
         "Выберите персонажа:",
-        reply_markup=get_characters_list_keyboard(characters, "filter_character")
+        reply_markup=get_characters_list_keyboard(
+            characters, FILTER_CHARACTER, _refine_counts(await state.get_data(), "filter_character_id", "character_id")
+        )
     )
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("filter_character_"))
-async def apply_character_filter(callback: CallbackQuery, state: FSMContext):
-    """Применяет фильтр по персонажу"""
-    character_id = int(callback.data.split("_")[-1])
+@callback_handler(FILTER_CHARACTER)
+async def apply_character_filter(callback: CallbackQuery, character_id: int, state: FSMContext):
+    """Применяет фильтр по персонажу (вместе с уже выбранными фильтрами)"""
     await state.update_data(filter_character_id=character_id)
+    await _show_filtered_projects(callback, state)
+
+
+@callback_handler(FILTER_BY_DEVELOPER)
+async def filter_by_developer_callback(callback: CallbackQuery, state: FSMContext):
+    """Обработчик фильтра по разработчику"""
+    developers = get_all_developers()
     
-    projects = get_active_projects()  # Показываем только активные проекты
-    filtered_projects = [p for p in projects if p.character_id == character_id]
+    if not developers:
+        await callback.answer("❌ Нет доступных разработчиков", show_alert=True)
+        return
     
-    character = get_character_by_id(character_id)
-    character_name = character.name if character else f"ID:{character_id}"
+    await callback.message.edit_text(
+        "🔍 Фильтр по разработчику\n\n"
+        "Выберите разработчика:",
+        reply_markup=get_developers_list_keyboard(
+            developers, FILTER_DEVELOPER, _refine_counts(await state.get_data(), "filter_developer_id", "developer_id")
+        )
+    )
+    await callback.answer()
+
+
+@callback_handler(FILTER_DEVELOPER)
+async def apply_developer_filter(callback: CallbackQuery, developer_id: int, state: FSMContext):
+    """Применяет фильтр по разработчику (вместе с уже выбранными фильтрами)"""
+    await state.update_data(filter_developer_id=developer_id)
+    await _show_filtered_projects(callback, state)
+
+
+async def _get_batch_selection(callback: CallbackQuery, state: FSMContext) -> Optional[List[int]]:
+    """ID проектов выборки, показанной в меню массовых действий.
+
+    Массовые действия работают только с этими проектами, а не с повторным запросом
+    по фильтрам: выборка не расширяется, если проекты ушли из фильтра.
+    Возвращает None (и отвечает на callback), если прав нет или выборки нет.
+    """
+    if not has_manage_access(callback.from_user.id):
+        await callback.answer("❌ Массовые действия доступны только ролям с правом управления", show_alert=True)
+        return None
+    project_ids = (await state.get_data()).get("batch_project_ids")
+    if not project_ids:
+        await callback.answer("❌ Выборка устарела, примените фильтр заново", show_alert=True)
+        return None
+    return project_ids
+
+
+@callback_handler(BATCH_ACTIONS)
+async def batch_actions_callback(callback: CallbackQuery, state: FSMContext):
+    """Меню действий над всеми проектами текущей выборки"""
+    if not has_manage_access(callback.from_user.id):
+        await callback.answer("❌ Массовые действия доступны только ролям с правом управления", show_alert=True)
+        return
+    
+    data = await state.get_data()
+    if all(data.get(key) is None for key in _FILTER_KEYS):
+        await callback.answer("❌ Сначала выберите фильтр", show_alert=True)
+        return
+    
+    projects = _query_filtered_projects(data)
+    if not projects:
+        await callback.answer("❌ По фильтрам нет проектов", show_alert=True)
+        return
     
+    # Запоминаем выборку: дальнейшие действия применяются только к ней
+    await state.update_data(batch_project_ids=[p.id for p in projects])
     await callback.message.edit_text(
-        f"🔍 Фильтр: Персонаж = {character_name}\n\n"
-        f"Найдено проектов: {len(filtered_projects)}"
+        f"⚡ Действия с найденными проектами\n\n"
+        f"Проектов в выборке: {len(projects)}\n"
+        f"Выберите действие:",
+        reply_markup=get_batch_actions_keyboard()
     )
     await callback.answer()
+
+
+@callback_handler(BATCH_MOVE)
+async def batch_move_callback(callback: CallbackQuery, state: FSMContext):
+    """Выбор статуса для всей выборки"""
+    if await _get_batch_selection(callback, state) is None:
+        return
     
-    if filtered_projects:
-        await _show_projects(callback.message, filtered_projects)
-    else:
-        await callback.message.answer(
-            "Проекты не найдены.",
-            reply_markup=get_active_projects_keyboard()
-        )
+    await callback.message.edit_text(
+        "➡️ Перевести все найденные проекты в статус:",
+        reply_markup=get_statuses_list_keyboard(get_all_statuses(), BATCH_STATUS)
+    )
+    await callback.answer()
 
 
-@router.callback_query(F.data == "filter_by_developer")
-async def filter_by_developer_callback(callback: CallbackQuery):
-    """Обработчик фильтра по разработчику"""
-    developers = get_all_developers()
+@callback_handler(BATCH_STATUS, flags={"rate_limit": True})
+async def batch_status_callback(callback: CallbackQuery, status_id: int, state: FSMContext):
+    """Переводит всю выборку в выбранный статус одной операцией"""
+    project_ids = await _get_batch_selection(callback, state)
+    if project_ids is None:
+        return
+    
+    status = get_status_by_id(status_id)
+    if not status:
+        await callback.answer("❌ Статус не найден", show_alert=True)
+        return
+    
+    changed = batch_update_projects(project_ids, status_id=status_id, actor_id=callback.from_user.id)
+    skipped = len(project_ids) - changed
     
+    await callback.message.edit_text(
+        f"✅ Статус изменен у {changed} проектов\n\n"
+        f"📊 Новый статус: {format_status_name(status)}"
+        + (f"\n⚠️ Не изменено: {skipped} (переход не разрешен схемой, не выполнен чек-лист, проект уже в этом статусе или удален)"
+           if skipped else "")
+    )
+    await callback.answer("Готово")
+
+
+@callback_handler(BATCH_REASSIGN)
+async def batch_reassign_callback(callback: CallbackQuery, state: FSMContext):
+    """Выбор разработчика для всей выборки"""
+    if await _get_batch_selection(callback, state) is None:
+        return
+    
+    developers = get_all_developers()
     if not developers:
         await callback.answer("❌ Нет доступных разработчиков", show_alert=True)
         return
     
     await callback.message.edit_text(
-        "🔍 Фильтр по разработчику\n\n"
-        "Выберите разработчика:",
-        reply_markup=get_developers_list_keyboard(developers, "filter_developer")
+        "💻 Назначить всем найденным проектам разработчика:",
+        reply_markup=get_developers_list_keyboard(developers, BATCH_DEVELOPER)
     )
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("filter_developer_"))
-async def apply_developer_filter(callback: CallbackQuery, state: FSMContext):
-    """Применяет фильтр по разработчику"""
-    developer_id = int(callback.data.split("_")[-1])
-    await state.update_data(filter_developer_id=developer_id)
-    
-    projects = get_active_projects()  # Показываем только активные проекты
-    filtered_projects = [p for p in projects if p.developer_id == developer_id]
+@callback_handler(BATCH_DEVELOPER, flags={"rate_limit": True})
+async def batch_developer_callback(callback: CallbackQuery, developer_id: int, state: FSMContext):
+    """Назначает разработчика всей выборке одной операцией"""
+    project_ids = await _get_batch_selection(callback, state)
+    if project_ids is None:
+        return
     
     developer = get_developer_by_id(developer_id)
-    developer_name = developer.name if developer else f"ID:{developer_id}"
+    if not developer:
+        await callback.answer("❌ Разработчик не найден", show_alert=True)
+        return
+    
+    changed = batch_update_projects(project_ids, developer_id=developer_id)
+    
+    await callback.message.edit_text(
+        f"✅ Разработчик изменен у {changed} проектов\n\n"
+        f"💻 Новый разработчик: {developer.name}"
+    )
+    await callback.answer("Готово")
+
+
+@callback_handler(BATCH_DELETE)
+async def batch_delete_callback(callback: CallbackQuery, state: FSMContext):
+    """Запрашивает подтверждение удаления всей выборки"""
+    project_ids = await _get_batch_selection(callback, state)
+    if project_ids is None:
+        return
     
     await callback.message.edit_text(
-        f"🔍 Фильтр: Разработчик = {developer_name}\n\n"
-        f"Найдено проектов: {len(filtered_projects)}"
+        f"🗑️ Удалить все найденные проекты ({len(project_ids)})?\n\n"
+        f"⚠️ Это действие нельзя отменить!",
+        reply_markup=get_batch_delete_confirm_keyboard()
     )
     await callback.answer()
+
+
+@callback_handler(BATCH_DELETE_CONFIRM, flags={"rate_limit": True})
+async def batch_delete_confirm_callback(callback: CallbackQuery, state: FSMContext):
+    """Удаляет всю выборку одной операцией"""
+    project_ids = await _get_batch_selection(callback, state)
+    if project_ids is None:
+        return
     
-    if filtered_projects:
-        await _show_projects(callback.message, filtered_projects)
-    else:
-        await callback.message.answer(
-            "Проекты не найдены.",
-            reply_markup=get_active_projects_keyboard()
-        )
+    deleted = batch_delete_projects(project_ids)
+    await state.update_data(batch_project_ids=None)
+    
+    await callback.message.edit_text(f"✅ Удалено проектов: {deleted}")
+    await callback.answer("Готово")
+
+
+@callback_handler(BATCH_CANCEL)
+async def batch_cancel_callback(callback: CallbackQuery):
+    """Отмена массового действия"""
+    await callback.message.edit_text("❌ Действие отменено")
+    await callback.answer()
 
 
-@router.callback_query(F.data == "reset_filters")
+@callback_handler(RESET_FILTERS)
 async def reset_filters_callback(callback: CallbackQuery, state: FSMContext):
     """Сбрасывает фильтры"""
-    await state.update_data(filter_status_id=None, filter_character_id=None, filter_developer_id=None)
+    await state.update_data(
+        filter_status_id=None, filter_character_id=None, filter_developer_id=None, batch_project_ids=None
+    )
     
     projects = get_active_projects()  # Показываем только активные проекты
     
@@ -334,7 +574,7 @@ async def reset_filters_callback(callback: CallbackQuery, state: FSMContext):
         )
 
 
-@router.callback_query(F.data == "back_to_projects")
+@callback_handler(BACK_TO_PROJECTS)
 async def back_to_projects_callback(callback: CallbackQuery):
     """Возврат к списку проектов"""
     await callback.message.edit_text(
@@ -352,7 +592,7 @@ async def back_to_projects_callback(callback: CallbackQuery):
         )
 
 
-@router.message(F.text == "➕ Создать")
+@text_handler("➕ Создать")
 async def create_project_start(message: Message, state: FSMContext):
     """Начинает процесс создания проекта"""
     # Получаем первый статус
@@ -404,14 +644,13 @@ async def process_project_name(message: Message, state: FSMContext):
     await message.answer(
         f"✅ Название: {project_name}\n\n"
         "Выберите персонажа:",
-        reply_markup=get_characters_list_keyboard(characters, "select")
+        reply_markup=get_characters_list_keyboard(characters, SELECT_CHARACTER)
     )
 
 
-@router.callback_query(F.data.startswith("select_character_"))
-async def process_project_character(callback: CallbackQuery, state: FSMContext):
+@callback_handler(SELECT_CHARACTER)
+async def process_project_character(callback: CallbackQuery, character_id: int, state: FSMContext):
     """Обрабатывает выбор персонажа проекта"""
-    character_id = int(callback.data.split("_")[-1])
     character = get_character_by_id(character_id)
     
     if not character:
@@ -451,14 +690,13 @@ async def process_project_character(callback: CallbackQuery, state: FSMContext):
     
     await callback.message.answer(
         "Выберите разработчика:",
-        reply_markup=get_developers_list_keyboard(developers, "select")
+        reply_markup=get_developers_list_keyboard(developers, SELECT_DEVELOPER)
     )
 
 
-@router.callback_query(F.data.startswith("select_developer_"))
-async def process_project_developer(callback: CallbackQuery, state: FSMContext):
+@callback_handler(SELECT_DEVELOPER)
+async def process_project_developer(callback: CallbackQuery, developer_id: int, state: FSMContext):
     """Обрабатывает выбор разработчика проекта"""
-    developer_id = int(callback.data.split("_")[-1])
     developer = get_developer_by_id(developer_id)
     
     if not developer:
@@ -478,7 +716,7 @@ async def process_project_developer(callback: CallbackQuery, state: FSMContext):
         return
     
     # Создаем проект
-    new_project = add_project(name, character_id, developer_id, status_id)
+    new_project = add_project(name, character_id, developer_id, status_id, actor_id=callback.from_user.id)
     
     await callback.message.edit_text(
         f"✅ Проект успешно создан!\n\n"
@@ -499,7 +737,7 @@ async def process_project_developer(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@router.message(F.text == "✏️ Редактировать")
+@text_handler("✏️ Редактировать")
 async def edit_project_handler(message: Message):
     """Обработчик для кнопки 'Редактировать'"""
     projects = get_active_projects()  # Показываем только активные проекты
@@ -519,24 +757,9 @@ async def edit_project_handler(message: Message):
     )
 
 
-@router.message(F.text == "🔙 Главное меню")
-async def back_to_main_from_projects(message: Message, state: FSMContext):
-    """Возврат в главное меню из раздела проектов"""
-    from storage import get_user_by_id, is_admin
-    await state.clear()
-    user_id = message.from_user.id
-    user = get_user_by_id(user_id)
-    user_role = user.role if user else None
-    await message.answer(
-        "🔙 Главное меню",
-        reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user_role)
-    )
-
-
-@router.callback_query(F.data.startswith("edit_project_"))
-async def edit_project_callback(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_PROJECT)
+async def edit_project_callback(callback: CallbackQuery, project_id: int, state: FSMContext):
     """Обработчик кнопки 'Редактировать' проекта"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -571,10 +794,9 @@ async def edit_project_callback(callback: CallbackQuery, state: FSMContext):
     await state.set_state(ProjectEdit.waiting_for_field)
 
 
-@router.callback_query(F.data.startswith("edit_field_name_"))
-async def edit_field_name_callback(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_FIELD_NAME)
+async def edit_field_name_callback(callback: CallbackQuery, project_id: int, state: FSMContext):
     """Обработчик выбора редактирования названия"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -592,10 +814,9 @@ async def edit_field_name_callback(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("edit_field_character_"))
-async def edit_field_character_callback(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_FIELD_CHARACTER)
+async def edit_field_character_callback(callback: CallbackQuery, project_id: int, state: FSMContext):
     """Обработчик выбора редактирования персонажа"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -623,14 +844,13 @@ async def edit_field_character_callback(callback: CallbackQuery, state: FSMConte
     
     await callback.message.answer(
         "Выберите персонажа:",
-        reply_markup=get_characters_list_keyboard(characters, "edit")
+        reply_markup=get_characters_list_keyboard(characters, EDIT_CHARACTER)
     )
 
 
-@router.callback_query(F.data.startswith("edit_field_developer_"))
-async def edit_field_developer_callback(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_FIELD_DEVELOPER)
+async def edit_field_developer_callback(callback: CallbackQuery, project_id: int, state: FSMContext):
     """Обработчик выбора редактирования разработчика"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -658,14 +878,13 @@ async def edit_field_developer_callback(callback: CallbackQuery, state: FSMConte
     
     await callback.message.answer(
         "Выберите разработчика:",
-        reply_markup=get_developers_list_keyboard(developers, "edit")
+        reply_markup=get_developers_list_keyboard(developers, EDIT_DEVELOPER)
     )
 
 
-@router.callback_query(F.data.startswith("edit_field_status_"))
-async def edit_field_status_callback(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_FIELD_STATUS)
+async def edit_field_status_callback(callback: CallbackQuery, project_id: int, state: FSMContext):
     """Обработчик выбора редактирования статуса"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -693,14 +912,13 @@ async def edit_field_status_callback(callback: CallbackQuery, state: FSMContext)
     
     await callback.message.answer(
         "Выберите статус:",
-        reply_markup=get_statuses_list_keyboard(statuses, "edit")
+        reply_markup=get_statuses_list_keyboard(statuses, EDIT_STATUS)
     )
 
 
-@router.callback_query(F.data.startswith("cancel_edit_"))
-async def cancel_edit_callback(callback: CallbackQuery, state: FSMContext):
+@callback_handler(CANCEL_EDIT)
+async def cancel_edit_callback(callback: CallbackQuery, project_id: int, state: FSMContext):
     """Обработчик отмены редактирования"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -780,8 +998,8 @@ async def process_edit_name(message: Message, state: FSMContext):
         await state.clear()
 
 
-@router.callback_query(F.data.startswith("edit_character_"))
-async def process_edit_character(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_CHARACTER)
+async def process_edit_character(callback: CallbackQuery, character_id: int, state: FSMContext):
     """Обрабатывает выбор нового персонажа"""
     data = await state.get_data()
     project_id = data.get("project_id")
@@ -791,7 +1009,6 @@ async def process_edit_character(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
     
-    character_id = int(callback.data.split("_")[-1])
     character = get_character_by_id(character_id)
     
     if not character:
@@ -827,8 +1044,8 @@ async def process_edit_character(callback: CallbackQuery, state: FSMContext):
         await state.clear()
 
 
-@router.callback_query(F.data.startswith("edit_developer_"))
-async def process_edit_developer(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_DEVELOPER)
+async def process_edit_developer(callback: CallbackQuery, developer_id: int, state: FSMContext):
     """Обрабатывает выбор нового разработчика"""
     data = await state.get_data()
     project_id = data.get("project_id")
@@ -838,7 +1055,6 @@ async def process_edit_developer(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
     
-    developer_id = int(callback.data.split("_")[-1])
     developer = get_developer_by_id(developer_id)
     
     if not developer:
@@ -874,8 +1090,8 @@ async def process_edit_developer(callback: CallbackQuery, state: FSMContext):
         await state.clear()
 
 
-@router.callback_query(F.data.startswith("edit_status_"))
-async def process_edit_status(callback: CallbackQuery, state: FSMContext):
+@callback_handler(EDIT_STATUS)
+async def process_edit_status(callback: CallbackQuery, status_id: int, state: FSMContext):
     """Обрабатывает выбор нового статуса"""
     data = await state.get_data()
     project_id = data.get("project_id")
@@ -885,7 +1101,6 @@ async def process_edit_status(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
     
-    status_id = int(callback.data.split("_")[-1])
     status = get_status_by_id(status_id)
     
     if not status:
@@ -893,7 +1108,7 @@ async def process_edit_status(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем статус
-    if update_project(project_id, status_id=status_id):
+    if update_project(project_id, status_id=status_id, actor_id=callback.from_user.id):
         project = get_project_by_id(project_id)
         character = get_character_by_id(project.character_id)
         developer = get_developer_by_id(project.developer_id)
@@ -926,23 +1141,42 @@ async def process_edit_status(callback: CallbackQuery, state: FSMContext):
         await state.clear()
 
 
-@router.callback_query(F.data.startswith("prev_status_"))
-async def prev_status_callback(callback: CallbackQuery):
+async def _ask_status_choice(callback: CallbackQuery, project_id: int, options, title: str) -> bool:
+    """Если по схеме переходов вариантов несколько, предлагает выбрать статус.
+
+    Возвращает True, если показан выбор (переход выполнит move_status_callback).
+    """
+    if len(options) < 2:
+        return False
+    
+    statuses = [get_status_by_id(status_id) for status_id in options]
+    await callback.message.edit_text(
+        title,
+        reply_markup=get_status_choice_keyboard(project_id, [s for s in statuses if s])
+    )
+    await callback.answer()
+    return True
+
+
+@callback_handler(PREV_STATUS, flags={"rate_limit": True})
+async def prev_status_callback(callback: CallbackQuery, project_id: int):
     """Обработчик кнопки 'Пред.Статус'"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
         await callback.answer("❌ Проект не найден", show_alert=True)
         return
     
-    prev_status_id = get_prev_status_id(project.status_id)
-    if prev_status_id is None:
+    options = get_prev_status_ids(project.status_id)
+    if not options:
         await callback.answer("❌ Нет доступных статусов", show_alert=True)
         return
+    if await _ask_status_choice(callback, project_id, options, "🔀 Выберите, в какой статус вернуть проект:"):
+        return
+    prev_status_id = options[0]
     
     # Обновляем статус
-    if update_project_status(project_id, prev_status_id):
+    if update_project_status(project_id, prev_status_id, actor_id=callback.from_user.id):
         # Получаем обновленный проект и новый статус
         updated_project = get_project_by_id(project_id)
         new_status = get_status_by_id(prev_status_id)
@@ -981,18 +1215,17 @@ async def prev_status_callback(callback: CallbackQuery):
         await callback.answer("❌ Ошибка при обновлении статуса", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("next_status_"))
-async def next_status_callback(callback: CallbackQuery):
+@callback_handler(NEXT_STATUS, flags={"rate_limit": True})
+async def next_status_callback(callback: CallbackQuery, project_id: int):
     """Обработчик кнопки 'След.Статус' - проверяет чек-лист"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
         await callback.answer("❌ Проект не найден", show_alert=True)
         return
     
-    # Проверяем, есть ли чек-лист для текущего статуса
-    checklist = get_checklist_by_status_id(project.status_id)
+    # Проверяем, есть ли чек-лист для текущего статуса (с отметками этого проекта)
+    checklist = get_project_checklist(project_id, project.status_id)
     
     if checklist and checklist.items:
         # Есть чек-лист - показываем его
@@ -1019,13 +1252,16 @@ async def next_status_callback(callback: CallbackQuery):
         await callback.answer()
     else:
         # Нет чек-листа - переходим сразу на следующий статус
-        next_status_id = get_next_status_id(project.status_id)
-        if next_status_id is None:
+        options = get_next_status_ids(project.status_id)
+        if not options:
             await callback.answer("❌ Нет доступных статусов", show_alert=True)
             return
+        if await _ask_status_choice(callback, project_id, options, "🔀 Выберите следующий статус:"):
+            return
+        next_status_id = options[0]
         
         # Обновляем статус
-        if update_project_status(project_id, next_status_id):
+        if update_project_status(project_id, next_status_id, actor_id=callback.from_user.id):
             # Получаем обновленный проект и новый статус
             updated_project = get_project_by_id(project_id)
             new_status = get_status_by_id(next_status_id)
@@ -1064,20 +1300,14 @@ async def next_status_callback(callback: CallbackQuery):
             await callback.answer("❌ Ошибка при обновлении статуса", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("toggle_checklist_"))
-async def toggle_checklist_item_callback(callback: CallbackQuery):
+@callback_handler(TOGGLE_CHECKLIST, flags={"repeatable": True})
+async def toggle_checklist_item_callback(callback: CallbackQuery, status_id: int, project_id: int, item_id: int):
     """Обработчик переключения пункта чек-листа"""
     from storage import toggle_checklist_item
     
-    # Парсим: toggle_checklist_{status_id}_{project_id}_{item_id}
-    parts = callback.data.split("_")
-    status_id = int(parts[2])
-    project_id = int(parts[3])
-    item_id = int(parts[4])
-    
-    if toggle_checklist_item(status_id, item_id):
+    if toggle_checklist_item(status_id, item_id, project_id):
         # Обновляем отображение чек-листа
-        checklist = get_checklist_by_status_id(status_id)
+        checklist = get_project_checklist(project_id, status_id)
         status = get_status_by_id(status_id)
         status_name = status.name if status else f"ID:{status_id}"
         
@@ -1103,10 +1333,9 @@ async def toggle_checklist_item_callback(callback: CallbackQuery):
         await callback.answer("❌ Ошибка при обновлении пункта", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("confirm_next_status_"))
-async def confirm_next_status_callback(callback: CallbackQuery):
+@callback_handler(CONFIRM_NEXT_STATUS, flags={"rate_limit": True})
+async def confirm_next_status_callback(callback: CallbackQuery, project_id: int):
     """Обработчик подтверждения перехода на следующий статус после выполнения чек-листа"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -1114,21 +1343,24 @@ async def confirm_next_status_callback(callback: CallbackQuery):
         return
     
     # Проверяем, что чек-лист выполнен
-    checklist = get_checklist_by_status_id(project.status_id)
+    checklist = get_project_checklist(project_id, project.status_id)
     if checklist and not checklist.is_complete():
         await callback.answer("❌ Выполните все пункты чек-листа", show_alert=True)
         return
     
-    next_status_id = get_next_status_id(project.status_id)
-    if next_status_id is None:
+    options = get_next_status_ids(project.status_id)
+    if not options:
         await callback.answer("❌ Нет доступных статусов", show_alert=True)
         return
+    if await _ask_status_choice(callback, project_id, options, "🔀 Выберите следующий статус:"):
+        return
+    next_status_id = options[0]
     
-    # Сбрасываем чек-лист для следующего использования
-    reset_checklist(project.status_id)
+    # Сбрасываем отметки проекта на случай возврата в этот статус
+    reset_checklist(project.status_id, project_id)
     
     # Обновляем статус
-    if update_project_status(project_id, next_status_id):
+    if update_project_status(project_id, next_status_id, actor_id=callback.from_user.id):
         # Получаем обновленный проект и новый статус
         updated_project = get_project_by_id(project_id)
         new_status = get_status_by_id(next_status_id)
@@ -1167,10 +1399,68 @@ async def confirm_next_status_callback(callback: CallbackQuery):
         await callback.answer("❌ Ошибка при обновлении статуса", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("back_to_project_"))
-async def back_to_project_callback(callback: CallbackQuery):
+@callback_handler(MOVE_STATUS, flags={"rate_limit": True})
+async def move_status_callback(callback: CallbackQuery, project_id: int, new_status_id: int):
+    """Обработчик выбора статуса, когда по схеме переходов возможно несколько вариантов"""
+    project = get_project_by_id(project_id)
+    
+    if not project:
+        await callback.answer("❌ Проект не найден", show_alert=True)
+        return
+    
+    # Кнопка могла устареть: проверяем переход по текущей схеме
+    if not can_move_status(project.status_id, new_status_id):
+        await callback.answer("❌ Такой переход не разрешен", show_alert=True)
+        return
+    
+    is_forward = get_workflow().is_forward(project.status_id, new_status_id)
+    if is_forward:
+        checklist = get_project_checklist(project_id, project.status_id)
+        if checklist and not checklist.is_complete():
+            await callback.answer("❌ Выполните все пункты чек-листа", show_alert=True)
+            return
+        # Сбрасываем отметки проекта на случай возврата в этот статус
+        reset_checklist(project.status_id, project_id)
+    
+    if update_project_status(project_id, new_status_id, actor_id=callback.from_user.id):
+        updated_project = get_project_by_id(project_id)
+        new_status = get_status_by_id(new_status_id)
+        character = get_character_by_id(updated_project.character_id)
+        developer = get_developer_by_id(updated_project.developer_id)
+        
+        character_name = character.name if character else f"ID:{updated_project.character_id}"
+        developer_name = developer.name if developer else f"ID:{updated_project.developer_id}"
+        developer_username = f"@{developer.username}" if developer and developer.username else ""
+        status_name = format_status_name(new_status) if new_status else f"ID:{new_status_id}"
+        
+        project_text = f"📁 {updated_project.name}\n"
+        project_text += f"🎭 Персонаж: {character_name}\n"
+        project_text += f"💻 Разработчик: {developer_name}"
+        if developer_username:
+            project_text += f" {developer_username}"
+        project_text += f"\n📊 Статус: {status_name}"
+        
+        is_archive = is_archive_status(new_status_id)
+        
+        if is_archive:
+            await callback.message.edit_text(
+                f"📦 Проект перенесен в архив!\n\n{project_text}",
+                reply_markup=get_project_actions_keyboard(project_id, is_archive=is_archive)
+            )
+            await callback.answer("✅ Проект перенесен в архив")
+        else:
+            await callback.message.edit_text(
+                project_text,
+                reply_markup=get_project_actions_keyboard(project_id, is_archive=is_archive)
+            )
+            await callback.answer("✅ Статус изменен")
+    else:
+        await callback.answer("❌ Ошибка при обновлении статуса", show_alert=True)
+
+
+@callback_handler(BACK_TO_PROJECT)
+async def back_to_project_callback(callback: CallbackQuery, project_id: int):
     """Обработчик возврата к проекту из чек-листа"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -1200,10 +1490,9 @@ async def back_to_project_callback(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("delete_project_"))
-async def delete_project_callback(callback: CallbackQuery):
+@callback_handler(DELETE_PROJECT)
+async def delete_project_callback(callback: CallbackQuery, project_id: int):
     """Обработчик кнопки 'Удалить' проекта - показывает подтверждение"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -1233,10 +1522,9 @@ async def delete_project_callback(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("confirm_delete_"))
-async def confirm_delete_project_callback(callback: CallbackQuery):
+@callback_handler(CONFIRM_DELETE)
+async def confirm_delete_project_callback(callback: CallbackQuery, project_id: int):
     """Обработчик подтверждения удаления проекта"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -1256,10 +1544,9 @@ async def confirm_delete_project_callback(callback: CallbackQuery):
         await callback.answer("❌ Ошибка при удалении", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("cancel_delete_"))
-async def cancel_delete_project_callback(callback: CallbackQuery):
+@callback_handler(CANCEL_DELETE)
+async def cancel_delete_project_callback(callback: CallbackQuery, project_id: int):
     """Обработчик отмены удаления проекта"""
-    project_id = int(callback.data.split("_")[-1])
     project = get_project_by_id(project_id)
     
     if not project:
@@ -1,7 +1,9 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from callbacks import callback_handler, RESPONSIBLE, DELETE_STATUS
+from routing import text_handler
 from keyboards import (
     get_main_menu_keyboard,
     get_status_management_keyboard,
@@ -12,8 +14,11 @@ from storage import (
     get_all_statuses,
     add_status,
     delete_status,
-    get_status_by_id
+    get_status_by_id,
+    get_all_roles,
+    is_team_role
 )
+from models import NO_RESPONSIBLE
 
 router = Router()
 
@@ -23,18 +28,18 @@ class StatusCreation(StatesGroup):
     waiting_for_responsible = State()
 
 
-@router.message(F.text == "⚙️ Управление Статусами")
+@text_handler("⚙️ Управление Статусами")
 async def status_management_handler(message: Message):
     """Обработчик для кнопки 'Управление Статусами'"""
-    from storage import get_user_by_id, is_admin
+    from storage import get_user_by_id, is_admin, has_manage_access
     user_id = message.from_user.id
     user = get_user_by_id(user_id)
     
-    # Проверяем, что пользователь имеет роль "Лёша" или является админом
-    if not user or (user.role != "Лёша" and not is_admin(user_id)):
+    # Проверяем, что у роли пользователя есть доступ к управлению или он админ
+    if not has_manage_access(user_id):
         await message.answer(
             "❌ У вас нет прав доступа к управлению статусами.\n"
-            "Доступ разрешен только для пользователей с ролью 'Лёша'.",
+            "Доступ разрешен только для ролей с правом управления.",
             reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user.role if user else None)
         )
         return
@@ -46,21 +51,7 @@ async def status_management_handler(message: Message):
     )
 
 
-@router.message(F.text == "🔙 Главное меню")
-async def back_to_main_menu(message: Message, state: FSMContext):
-    """Возврат в главное меню"""
-    from storage import get_user_by_id, is_admin
-    await state.clear()
-    user_id = message.from_user.id
-    user = get_user_by_id(user_id)
-    user_role = user.role if user else None
-    await message.answer(
-        "🔙 Главное меню",
-        reply_markup=get_main_menu_keyboard(is_admin=is_admin(user_id), user_role=user_role)
-    )
-
-
-@router.message(F.text == "📋 Список статусов")
+@text_handler("📋 Список статусов")
 async def list_statuses_handler(message: Message):
     """Показывает список всех статусов"""
     statuses = get_all_statuses()
@@ -81,7 +72,7 @@ async def list_statuses_handler(message: Message):
     )
 
 
-@router.message(F.text == "➕ Добавить статус")
+@text_handler("➕ Добавить статус")
 async def add_status_start(message: Message, state: FSMContext):
     """Начинает процесс добавления статуса"""
     await state.set_state(StatusCreation.waiting_for_name)
@@ -107,14 +98,13 @@ async def process_status_name(message: Message, state: FSMContext):
     await message.answer(
         f"✅ Название: {status_name}\n\n"
         "Теперь выберите ответственного:",
-        reply_markup=get_responsible_keyboard()
+        reply_markup=get_responsible_keyboard(get_all_roles())
     )
 
 
-@router.callback_query(F.data.startswith("responsible_"))
-async def process_responsible(callback: CallbackQuery, state: FSMContext):
+@callback_handler(RESPONSIBLE)
+async def process_responsible(callback: CallbackQuery, responsible: str, state: FSMContext):
     """Обрабатывает выбор ответственного"""
-    responsible = callback.data.split("_", 1)[1]
     data = await state.get_data()
     status_name = data.get("status_name")
     
@@ -123,6 +113,10 @@ async def process_responsible(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
     
+    if responsible != NO_RESPONSIBLE and not is_team_role(responsible):
+        await callback.answer("❌ Такой роли больше нет", show_alert=True)
+        return
+    
     # Создаем статус
     new_status = add_status(status_name, responsible)
     
@@ -143,7 +137,7 @@ async def process_responsible(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@router.message(F.text == "🗑️ Удалить статус")
+@text_handler("🗑️ Удалить статус")
 async def delete_status_start(message: Message):
     """Начинает процесс удаления статуса"""
     statuses = get_all_statuses()
@@ -157,14 +151,13 @@ async def delete_status_start(message: Message):
     
     await message.answer(
         "🗑️ Выберите статус для удаления:",
-        reply_markup=get_status_list_keyboard(statuses, "delete")
+        reply_markup=get_status_list_keyboard(statuses, DELETE_STATUS)
     )
 
 
-@router.callback_query(F.data.startswith("delete_status_"))
-async def process_delete_status(callback: CallbackQuery):
+@callback_handler(DELETE_STATUS)
+async def process_delete_status(callback: CallbackQuery, status_id: int):
     """Обрабатывает удаление статуса"""
-    status_id = int(callback.data.split("_")[-1])
     status = get_status_by_id(status_id)
     
     if not status:
@@ -0,0 +1,540 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from models import ADMIN_ROLE, DEFAULT_USER_ROLE, NO_RESPONSIBLE, Project, ProjectStatus, Role, StatusTransition, User
+
+# Ключевые слова архивных статусов (Живой, Бан, Опубликовано, Заблокировано).
+# Используются только для схемы переходов по умолчанию, когда workflow.json нет.
+ARCHIVE_KEYWORDS = ["живой", "бан", "опубликовано", "заблокировано", "опубликован", "заблокирован"]
+
+# Области выборки проектов
+SCOPES = ("active", "archive", "published", "banned", "all")
+
+# Поддерживаемые сортировки: ключ -> (функция ключа, по убыванию)
+SORTS = {
+    "id": (lambda p: p.id, False),
+    "-id": (lambda p: p.id, True),
+    "name": (lambda p: p.name.lower(), False),
+    "-name": (lambda p: p.name.lower(), True),
+    "status": (lambda p: (p.status_id, p.id), False),
+}
+
+
+def is_archive_status_name(name: str) -> bool:
+    """Проверяет по названию, является ли статус архивным"""
+    if name in ["Живой", "Бан"]:
+        return True
+    name_lower = name.lower()
+    return any(keyword in name_lower for keyword in ARCHIVE_KEYWORDS)
+
+
+def is_published_status_name(name: str) -> bool:
+    """Проверяет по названию, означает ли статус опубликованный проект"""
+    name_lower = name.lower()
+    return name == "Живой" or "опубликовано" in name_lower or "опубликован" in name_lower
+
+
+def is_banned_status_name(name: str) -> bool:
+    """Проверяет по названию, означает ли статус заблокированный проект"""
+    name_lower = name.lower()
+    return name == "Бан" or "заблокировано" in name_lower or "заблокирован" in name_lower
+
+
+# Виды состояний схемы переходов: active - в работе, остальные - архивные
+STATE_KINDS = ("active", "published", "banned", "archive")
+
+
+def default_workflow(statuses: Iterable[ProjectStatus]) -> dict:
+    """Схема переходов по умолчанию, повторяющая прежнее поведение.
+
+    Все статусы идут цепочкой по возрастанию ID, из последнего - снова в первый
+    (назад - в предыдущий по ID, из первого - в последний). Начальный статус -
+    первый активный. Вид архивного статуса определяется по названию.
+    """
+    ordered = sorted(statuses, key=lambda s: s.id)
+    states = {}
+    for status in ordered:
+        if is_published_status_name(status.name):
+            kind = "published"
+        elif is_banned_status_name(status.name):
+            kind = "banned"
+        elif is_archive_status_name(status.name):
+            kind = "archive"
+        else:
+            kind = "active"
+        states[str(status.id)] = {"kind": kind}
+
+    active = [s.id for s in ordered if states[str(s.id)]["kind"] == "active"]
+    ids = [s.id for s in ordered]
+    transitions = {str(a): [b] for a, b in zip(ids, ids[1:] + ids[:1]) if a != b}
+    return {"initial": active[0] if active else None, "states": states, "transitions": transitions}
+
+
+def _status_id(value) -> int:
+    """ID статуса из схемы переходов (ключи JSON - строки)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректный ID статуса в схеме переходов: {value!r}") from None
+
+
+class Workflow:
+    """Схема переходов между статусами, скомпилированная в таблицы смежности.
+
+    Данные схемы: states - вид каждого статуса (active, published, banned, archive),
+    transitions - разрешенные переходы вперед (первый - переход по умолчанию),
+    initial - статус новых проектов. Переход назад разрешен в любой статус,
+    из которого можно прийти в текущий. Статусы, которых нет в схеме,
+    считаются активными и без переходов. Некорректная схема - ValueError.
+    """
+
+    def __init__(self, statuses: Dict[int, ProjectStatus], data: dict):
+        states = data.get("states", {}) if isinstance(data, dict) else None
+        transitions = data.get("transitions", {}) if isinstance(data, dict) else None
+        if not isinstance(states, dict) or not isinstance(transitions, dict):
+            raise ValueError("Схема переходов должна быть объектом с объектами states и transitions")
+
+        self.kinds: Dict[int, str] = {}
+        for status_id in statuses:
+            state = states.get(str(status_id), {})
+            kind = state.get("kind", "active") if isinstance(state, dict) else None
+            if kind not in STATE_KINDS:
+                raise ValueError(f"Неизвестный вид статуса {status_id}: {kind}")
+            self.kinds[status_id] = kind
+
+        self.forward: Dict[int, Tuple[int, ...]] = {}
+        backward: Dict[int, List[int]] = {}
+        for source, targets in transitions.items():
+            source_id = _status_id(source)
+            if not isinstance(targets, list):
+                raise ValueError(f"Переходы из статуса {source} должны быть списком")
+            if source_id not in statuses:
+                continue
+            target_ids = [_status_id(t) for t in targets]
+            allowed = tuple(t for t in target_ids if t in statuses and t != source_id)
+            self.forward[source_id] = allowed
+            for target_id in allowed:
+                backward.setdefault(target_id, []).append(source_id)
+        self.backward: Dict[int, Tuple[int, ...]] = {k: tuple(sorted(v)) for k, v in backward.items()}
+        self._allowed: Dict[int, Set[int]] = {
+            status_id: set(self.forward.get(status_id, ())) | set(self.backward.get(status_id, ()))
+            for status_id in statuses
+        }
+
+        initial = data.get("initial")
+        if initial is not None and not isinstance(initial, int):
+            raise ValueError(f"Некорректный начальный статус: {initial!r}")
+        self.initial: Optional[int] = initial if initial in statuses else None
+
+    def next_options(self, status_id: int) -> Tuple[int, ...]:
+        return self.forward.get(status_id, ())
+
+    def prev_options(self, status_id: int) -> Tuple[int, ...]:
+        return self.backward.get(status_id, ())
+
+    def can_move(self, from_status_id: int, to_status_id: int) -> bool:
+        """Разрешен ли переход (вперед по схеме или назад по ней)"""
+        return to_status_id in self._allowed.get(from_status_id, ())
+
+    def is_forward(self, from_status_id: int, to_status_id: int) -> bool:
+        return to_status_id in self.forward.get(from_status_id, ())
+
+    def is_terminal(self, status_id: int) -> bool:
+        return not self.forward.get(status_id)
+
+    def to_data(self) -> dict:
+        """Схема в формате workflow.json"""
+        return {
+            "initial": self.initial,
+            "states": {str(k): {"kind": v} for k, v in sorted(self.kinds.items())},
+            "transitions": {str(k): list(v) for k, v in sorted(self.forward.items())},
+        }
+
+
+class StatusIndex:
+    """Статусы по ID, схема переходов и классификация (архив, опубликован, заблокирован).
+
+    Классификация берется из схемы переходов; без схемы используется схема по умолчанию.
+    """
+
+    def __init__(self, statuses: Iterable[ProjectStatus], workflow: Optional[dict] = None):
+        self.statuses: Dict[int, ProjectStatus] = {s.id: s for s in statuses}
+        if workflow is None:
+            workflow = default_workflow(self.statuses.values())
+        self.workflow = Workflow(self.statuses, workflow)
+        kinds = self.workflow.kinds
+        self.archive: Set[int] = {s for s, kind in kinds.items() if kind != "active"}
+        self.published: Set[int] = {s for s, kind in kinds.items() if kind == "published"}
+        self.banned: Set[int] = {s for s, kind in kinds.items() if kind == "banned"}
+        # Роль -> статусы, за которые она отвечает
+        self.by_responsible: Dict[str, Set[int]] = {}
+        for status in self.statuses.values():
+            self.by_responsible.setdefault(status.responsible, set()).add(status.id)
+
+    def get(self, status_id: int) -> Optional[ProjectStatus]:
+        return self.statuses.get(status_id)
+
+    def is_archive(self, status_id: int) -> bool:
+        return status_id in self.archive
+
+    def in_scope(self, status_id: int, scope: str) -> bool:
+        """Проверяет, попадает ли статус в область выборки"""
+        if scope == "all":
+            return True
+        if scope == "active":
+            return status_id not in self.archive
+        if scope == "archive":
+            return status_id in self.archive
+        if scope == "published":
+            return status_id in self.published
+        if scope == "banned":
+            return status_id in self.banned
+        raise ValueError(f"Неизвестная область выборки: {scope}")
+
+
+class ProjectIndex:
+    """Индексы проектов по статусу, персонажу и разработчику для выборок без полного перебора.
+
+    Вместе с индексами поддерживаются счетчики активных проектов по статусам,
+    персонажам, разработчикам и ответственным, а также размеры областей
+    (active, archive, published, banned). Индекс обновляется точечно
+    через add/remove/replace при изменении проектов.
+    """
+
+    def __init__(self, projects: Iterable[Project], statuses: StatusIndex):
+        self.statuses = statuses
+        self.projects: Dict[int, Project] = {}
+        self.by_status: Dict[int, Set[int]] = {}
+        self.by_character: Dict[int, Set[int]] = {}
+        self.by_developer: Dict[int, Set[int]] = {}
+        self.active_by_character: Counter = Counter()
+        self.active_by_developer: Counter = Counter()
+        self.active_by_responsible: Counter = Counter()
+        self.scope_counts: Counter = Counter()
+        self._search: Optional[TrigramIndex] = None
+        for project in projects:
+            self.add(project)
+
+    @staticmethod
+    def _bucket_add(buckets: Dict[int, Set[int]], key: int, project_id: int):
+        buckets.setdefault(key, set()).add(project_id)
+
+    @staticmethod
+    def _bucket_remove(buckets: Dict[int, Set[int]], key: int, project_id: int):
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.discard(project_id)
+            if not bucket:
+                del buckets[key]
+
+    def _count(self, project: Project, delta: int):
+        """Обновляет счетчики для проекта (delta = 1 при добавлении, -1 при удалении)"""
+        status_id = project.status_id
+        for scope in ("active", "archive", "published", "banned"):
+            if self.statuses.in_scope(status_id, scope):
+                self.scope_counts[scope] += delta
+        if not self.statuses.is_archive(status_id):
+            self.active_by_character[project.character_id] += delta
+            self.active_by_developer[project.developer_id] += delta
+            responsible = self._responsible(status_id)
+            if responsible is not None:
+                self.active_by_responsible[responsible] += delta
+
+    def add(self, project: Project):
+        """Добавляет проект в индекс (хранится копия)"""
+        if project.id in self.projects:
+            self.remove(project.id)
+        project = replace(project)
+        self.projects[project.id] = project
+        self._bucket_add(self.by_status, project.status_id, project.id)
+        self._bucket_add(self.by_character, project.character_id, project.id)
+        self._bucket_add(self.by_developer, project.developer_id, project.id)
+        self._count(project, 1)
+        if self._search is not None:
+            self._search.add(project.id, project.name)
+
+    def remove(self, project_id: int) -> Optional[Project]:
+        """Удаляет проект из индекса"""
+        project = self.projects.pop(project_id, None)
+        if project is None:
+            return None
+        self._bucket_remove(self.by_status, project.status_id, project_id)
+        self._bucket_remove(self.by_character, project.character_id, project_id)
+        self._bucket_remove(self.by_developer, project.developer_id, project_id)
+        self._count(project, -1)
+        if self._search is not None:
+            self._search.remove(project_id)
+        return project
+
+    def search_index(self) -> "TrigramIndex":
+        """Поисковый индекс по названиям проектов (строится при первом поиске)"""
+        if self._search is None:
+            self._search = TrigramIndex((p.id, p.name) for p in self.projects.values())
+        return self._search
+
+    def replace(self, project: Project):
+        """Обновляет проект в индексе после изменения"""
+        self.add(project)
+
+    def counts(self) -> dict:
+        """Счетчики проектов для экранов фильтров.
+
+        by_status - проекты по статусам (все статусы, в том числе архивные),
+        by_character/by_developer/by_responsible - только активные проекты,
+        active/archive/published/banned - размеры областей.
+        """
+        return {
+            "by_status": {status_id: len(ids) for status_id, ids in self.by_status.items()},
+            "by_character": {k: v for k, v in self.active_by_character.items() if v > 0},
+            "by_developer": {k: v for k, v in self.active_by_developer.items() if v > 0},
+            "by_responsible": {k: v for k, v in self.active_by_responsible.items() if v > 0},
+            "active": self.scope_counts["active"],
+            "archive": self.scope_counts["archive"],
+            "published": self.scope_counts["published"],
+            "banned": self.scope_counts["banned"],
+        }
+
+    def _status_ids(self, scope: str, responsible: Optional[str]) -> List[int]:
+        """Статусы (из тех, где есть проекты), подходящие под область и ответственного"""
+        if responsible is not None:
+            candidates = self.statuses.by_responsible.get(responsible, ())
+        else:
+            candidates = self.by_status
+        return [
+            status_id for status_id in candidates
+            if status_id in self.by_status and self.statuses.in_scope(status_id, scope)
+        ]
+
+    def query(
+        self,
+        status_id: Optional[int] = None,
+        character_id: Optional[int] = None,
+        developer_id: Optional[int] = None,
+        responsible: Optional[str] = None,
+        scope: str = "active",
+        name_contains: Optional[str] = None,
+        sort: str = "id",
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Project]:
+        """Выборка проектов по нескольким критериям одновременно"""
+        if scope not in SCOPES:
+            raise ValueError(f"Неизвестная область выборки: {scope}")
+        if sort not in SORTS:
+            raise ValueError(f"Неизвестная сортировка: {sort}")
+
+        # Множества-кандидаты по точным критериям; начинаем с самого маленького
+        candidate_sets = []
+        if status_id is not None:
+            candidate_sets.append(self.by_status.get(status_id, set()))
+        if character_id is not None:
+            candidate_sets.append(self.by_character.get(character_id, set()))
+        if developer_id is not None:
+            candidate_sets.append(self.by_developer.get(developer_id, set()))
+
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            ids = set(candidate_sets[0])
+            for other in candidate_sets[1:]:
+                ids &= other
+            projects = [self.projects[pid] for pid in ids]
+            projects = [
+                p for p in projects
+                if self.statuses.in_scope(p.status_id, scope)
+                and (responsible is None or self._responsible(p.status_id) == responsible)
+            ]
+        else:
+            # Объединяем корзины подходящих статусов - без перебора остальных проектов
+            projects = [
+                self.projects[pid]
+                for sid in self._status_ids(scope, responsible)
+                for pid in self.by_status[sid]
+            ]
+
+        if name_contains:
+            needle = name_contains.lower()
+            projects = [p for p in projects if needle in p.name.lower()]
+
+        key, reverse = SORTS[sort]
+        projects.sort(key=key, reverse=reverse)
+        if offset:
+            projects = projects[offset:]
+        if limit is not None:
+            projects = projects[:limit]
+        return projects
+
+    def _responsible(self, status_id: int) -> Optional[str]:
+        status = self.statuses.get(status_id)
+        return status.responsible if status else None
+
+
+class RoleIndex:
+    """Роли команды и пользователи по ID и по ролям.
+
+    Системные роли admin и user не входят в roles: на них не назначаются статусы.
+    """
+
+    def __init__(self, roles: Iterable[Role], users: Iterable[User]):
+        self.roles: Dict[str, Role] = {r.name: r for r in roles if r.name not in (ADMIN_ROLE, DEFAULT_USER_ROLE, NO_RESPONSIBLE)}
+        self.users: Dict[int, User] = {}
+        self.users_by_role: Dict[str, List[int]] = {}
+        for user in users:
+            self.users[user.user_id] = user
+            self.users_by_role.setdefault(user.role, []).append(user.user_id)
+
+    def is_team_role(self, role: Optional[str]) -> bool:
+        return role in self.roles
+
+    def can_manage(self, role: Optional[str]) -> bool:
+        found = self.roles.get(role)
+        return found is not None and found.can_manage
+
+    def role_users(self, role: str) -> List[User]:
+        return [self.users[user_id] for user_id in self.users_by_role.get(role, ())]
+
+
+_NON_WORD = re.compile(r"[^\w]+|_")
+
+
+def normalize_text(text: str) -> str:
+    """Приводит текст к виду для поиска: без регистра, эмодзи и знаков, ё -> е"""
+    text = unicodedata.normalize("NFKC", text or "").lower().replace("ё", "е")
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Триграммы каждого слова нормализованного текста (слова дополняются пробелами по краям)"""
+    result = set()
+    for word in normalized.split():
+        padded = f" {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class TrigramIndex:
+    """Инвертированный индекс триграмм для нечеткого поиска по коротким текстам.
+
+    Оценка совпадения - доля триграмм запроса, найденных в тексте, плюс
+    бонус за точное вхождение запроса. Документы добавляются и удаляются
+    по одному, без перестройки индекса.
+    """
+
+    def __init__(self, documents: Iterable[Tuple[int, str]] = ()):
+        self.texts: Dict[int, str] = {}
+        self.grams: Dict[int, Set[str]] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        for doc_id, text in documents:
+            self.add(doc_id, text)
+
+    def add(self, doc_id: int, text: str):
+        if doc_id in self.texts:
+            self.remove(doc_id)
+        normalized = normalize_text(text)
+        grams = trigrams(normalized)
+        self.texts[doc_id] = normalized
+        self.grams[doc_id] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id: int):
+        self.texts.pop(doc_id, None)
+        for gram in self.grams.pop(doc_id, ()):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self.postings[gram]
+
+    def search(self, query: str, min_score: float = 0.5) -> Dict[int, float]:
+        """Документы с оценкой не ниже min_score: doc_id -> оценка"""
+        normalized = normalize_text(query)
+        query_grams = trigrams(normalized)
+        if not query_grams:
+            return {}
+
+        # Документ с оценкой >= min_score содержит не меньше needed триграмм запроса,
+        # значит, он есть хотя бы в одном из (total - needed + 1) самых коротких списков
+        total = len(query_grams)
+        needed = max(1, math.ceil(total * min_score))
+        postings = sorted((self.postings.get(gram, set()) for gram in query_grams), key=len)
+        candidates = set().union(*postings[:total - needed + 1])
+
+        scores = {}
+        for doc_id in candidates:
+            score = len(self.grams[doc_id] & query_grams) / total
+            if score < min_score:
+                continue
+            if normalized in self.texts[doc_id]:
+                score += 1.0
+            scores[doc_id] = score
+        return scores
+
+
+def week_start(timestamp: float) -> date:
+    """Понедельник недели, к которой относится момент времени"""
+    day = datetime.fromtimestamp(timestamp).date()
+    return day - timedelta(days=day.weekday())
+
+
+class StatusHistoryIndex:
+    """Журнал переходов по проектам и агрегаты по нему.
+
+    Агрегаты (суммарное время в статусах, завершения по неделям, время цикла
+    проектов) обновляются при добавлении каждой записи, поэтому отчет не
+    перебирает журнал. Время цикла - от первой записи проекта (создания)
+    до перехода в архивный статус.
+    """
+
+    def __init__(self, transitions: Iterable[StatusTransition], statuses: StatusIndex):
+        self.statuses = statuses
+        self.by_project: Dict[int, List[StatusTransition]] = {}
+        self.started_at: Dict[int, float] = {}
+        self.entered_at: Dict[int, float] = {}
+        self.status_seconds: Dict[int, float] = {}
+        self.status_visits: Counter = Counter()
+        self.completed_by_week: Counter = Counter()
+        self.cycle_seconds: Dict[int, float] = {}
+        for transition in transitions:
+            self.add(transition)
+
+    def add(self, transition: StatusTransition):
+        """Добавляет запись журнала и обновляет агрегаты"""
+        project_id = transition.project_id
+        timestamp = transition.timestamp
+        self.by_project.setdefault(project_id, []).append(transition)
+
+        entered = self.entered_at.get(project_id)
+        if entered is not None and transition.from_status_id is not None:
+            status_id = transition.from_status_id
+            self.status_seconds[status_id] = self.status_seconds.get(status_id, 0.0) + max(timestamp - entered, 0.0)
+            self.status_visits[status_id] += 1
+        self.started_at.setdefault(project_id, timestamp)
+        self.entered_at[project_id] = timestamp
+
+        from_archive = transition.from_status_id is not None and self.statuses.is_archive(transition.from_status_id)
+        if self.statuses.is_archive(transition.to_status_id) and not from_archive:
+            self.completed_by_week[week_start(timestamp)] += 1
+            self.cycle_seconds[project_id] = timestamp - self.started_at[project_id]
+
+    def project_history(self, project_id: int) -> List[StatusTransition]:
+        return list(self.by_project.get(project_id, []))
+
+    def average_time_in_status(self) -> Dict[int, Tuple[float, int]]:
+        """Статус -> (среднее время в статусе в секундах, число завершенных пребываний)"""
+        return {
+            status_id: (seconds / self.status_visits[status_id], self.status_visits[status_id])
+            for status_id, seconds in self.status_seconds.items()
+            if self.status_visits[status_id]
+        }
+
+    def weekly_throughput(self, weeks: int = 8, now: Optional[float] = None) -> List[Tuple[date, int]]:
+        """Число проектов, ушедших в архив, за последние недели (начиная с самой ранней)"""
+        current = week_start(now if now is not None else datetime.now().timestamp())
+        return [
+            (current - timedelta(weeks=i), self.completed_by_week.get(current - timedelta(weeks=i), 0))
+            for i in reversed(range(weeks))
+        ]
@@ -1,10 +1,59 @@
+from collections import OrderedDict
+from functools import lru_cache
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List
-from models import ProjectStatus, Character, Developer, User
+from typing import Callable, Hashable, List, Optional, Union
+from models import ProjectStatus, Character, Developer, User, Role, NO_RESPONSIBLE, ADMIN_ROLE, DEFAULT_USER_ROLE
+from storage import role_can_manage, get_data_version, STATUSES_FILE, CHARACTERS_FILE
+from callbacks import (
+    CallbackAction, PartialAction, RESPONSIBLE, DELETE_STATUS, FILTER_STATUS, BACK_TO_PROJECTS,
+    FILTER_BY_STATUS, FILTER_BY_CHARACTER, FILTER_BY_DEVELOPER, BATCH_ACTIONS, RESET_FILTERS,
+    BATCH_MOVE, BATCH_REASSIGN, BATCH_DELETE, BATCH_DELETE_CONFIRM, BATCH_CANCEL, SET_INTERVAL,
+    SELECT_CHARACTER, SELECT_DEVELOPER, REASSIGN_CHARACTER, CASCADE_CHARACTER, CANCEL_REMOVE_CHARACTER,
+    REASSIGN_DEVELOPER, CASCADE_DEVELOPER, CANCEL_REMOVE_DEVELOPER, PREV_STATUS, NEXT_STATUS,
+    RESTORE_PROJECT, DELETE_PROJECT, EDIT_PROJECT, FILTER_ARCHIVE_PUBLISHED, FILTER_ARCHIVE_BANNED,
+    FILTER_ARCHIVE_ALL, BACK_TO_MAIN_FROM_ARCHIVE, EDIT_FIELD_NAME, EDIT_FIELD_CHARACTER,
+    EDIT_FIELD_DEVELOPER, EDIT_FIELD_STATUS, CANCEL_EDIT, EDIT_STATUS, CONFIRM_DELETE, CANCEL_DELETE,
+    EXPORT, SET_ROLE, SELECT_ROLE, TOGGLE_CHECKLIST, CONFIRM_NEXT_STATUS, BACK_TO_PROJECT, MOVE_STATUS,
+    SELECT_CHECKLIST_STATUS
+)
+
+# Действие кнопки в клавиатурах списков: само действие или действие с заданными первыми полями
+ListAction = Union[CallbackAction, PartialAction]
+
+# Клавиатуры aiogram неизменяемы, поэтому один и тот же объект можно отдавать
+# во все обработчики. Клавиатуры без параметров и зависящие только от
+# аргументов кэшируются через lru_cache, клавиатуры по данным - в
+# _data_keyboards с версией файлов данных в ключе: после изменения данных
+# ключ меняется и клавиатура строится заново.
+DATA_KEYBOARDS_CACHE_SIZE = 256
+
+_data_keyboards: "OrderedDict[Hashable, InlineKeyboardMarkup]" = OrderedDict()
+
+
+def _cached_data_keyboard(key: Hashable, build: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+    """Возвращает клавиатуру из кэша по ключу или строит ее (вытесняя самые старые)"""
+    keyboard = _data_keyboards.get(key)
+    if keyboard is not None:
+        _data_keyboards.move_to_end(key)
+        return keyboard
+    keyboard = _data_keyboards[key] = build()
+    while len(_data_keyboards) > DATA_KEYBOARDS_CACHE_SIZE:
+        _data_keyboards.popitem(last=False)
+    return keyboard
+
+
+def _counts_key(counts: Optional[dict]) -> Optional[tuple]:
+    return tuple(sorted(counts.items())) if counts is not None else None
 
 
 def get_main_menu_keyboard(is_admin: bool = False, user_role: str = None) -> ReplyKeyboardMarkup:
     """Главное меню с кнопками"""
+    # Показываем управление статусами и персонажами только ролям с доступом к управлению
+    return _main_menu_keyboard(bool(is_admin), role_can_manage(user_role))
+
+
+@lru_cache(maxsize=None)
+def _main_menu_keyboard(is_admin: bool, can_manage: bool) -> ReplyKeyboardMarkup:
     buttons = [
         [KeyboardButton(text="📋 Проекты")],
         [KeyboardButton(text="📦 Архив")],
@@ -13,8 +62,7 @@ def get_main_menu_keyboard(is_admin: bool = False, user_role: str = None) -> Rep
         [KeyboardButton(text="🔔 Настройки уведомлений")]
     ]
     
-    # Показываем управление статусами и персонажами только для Лёша
-    if user_role == "Лёша":
+    if can_manage:
         buttons.append([KeyboardButton(text="⚙️ Управление Статусами")])
         buttons.append([KeyboardButton(text="🎭 Управление Персонажами")])
     
@@ -29,6 +77,7 @@ def get_main_menu_keyboard(is_admin: bool = False, user_role: str = None) -> Rep
     return keyboard
 
 
+@lru_cache(maxsize=None)
 def get_status_management_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура управления статусами"""
     keyboard = ReplyKeyboardMarkup(
@@ -43,28 +92,29 @@ def get_status_management_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
-def get_responsible_keyboard() -> InlineKeyboardMarkup:
+def get_responsible_keyboard(roles: List[Role]) -> InlineKeyboardMarkup:
     """Инлайн-клавиатура для выбора ответственного"""
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="👤 Игнат", callback_data="responsible_Игнат")],
-            [InlineKeyboardButton(text="👤 Лёша", callback_data="responsible_Лёша")],
-            [InlineKeyboardButton(text="⚪ никто", callback_data="responsible_никто")]
-        ]
-    )
-    return keyboard
+    buttons = [
+        [InlineKeyboardButton(text=f"👤 {role.name}", callback_data=RESPONSIBLE.pack(role.name))]
+        for role in roles
+    ]
+    buttons.append([InlineKeyboardButton(text=f"⚪ {NO_RESPONSIBLE}", callback_data=RESPONSIBLE.pack(NO_RESPONSIBLE))])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def get_status_list_keyboard(statuses: List[ProjectStatus], action: str = "delete", status_counts: dict = None) -> InlineKeyboardMarkup:
+def get_status_list_keyboard(statuses: List[ProjectStatus], action: ListAction = DELETE_STATUS, status_counts: dict = None) -> InlineKeyboardMarkup:
     """Клавиатура со списком статусов"""
+    key = (
+        "status_list", get_data_version(STATUSES_FILE), action,
+        tuple(status.id for status in statuses), _counts_key(status_counts)
+    )
+    return _cached_data_keyboard(key, lambda: _build_status_list_keyboard(statuses, action, status_counts))
+
+
+def _build_status_list_keyboard(statuses: List[ProjectStatus], action: ListAction, status_counts: Optional[dict]) -> InlineKeyboardMarkup:
     buttons = []
     for status in statuses:
-        responsible_emoji = {
-            "Игнат": "👤",
-            "Лёша": "👤",
-            "никто": "⚪"
-        }
-        emoji = responsible_emoji.get(status.responsible, "⚪")
+        emoji = "⚪" if status.responsible == NO_RESPONSIBLE else "👤"
         
         # Если передан словарь с количеством проектов, показываем его
         if status_counts and status.id in status_counts:
@@ -75,18 +125,19 @@ def get_status_list_keyboard(statuses: List[ProjectStatus], action: str = "delet
         
         buttons.append([InlineKeyboardButton(
             text=text,
-            callback_data=f"{action}_status_{status.id}"
+            callback_data=action.pack(status.id)
         )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=None)
 def get_active_projects_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура для меню активных проектов"""
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="➕ Создать")],
-            [KeyboardButton(text="🔍 Фильтры")],
+            [KeyboardButton(text="🔍 Фильтры"), KeyboardButton(text="🔎 Поиск")],
             [KeyboardButton(text="🔙 Главное меню")]
         ],
         resize_keyboard=True
@@ -94,20 +145,81 @@ def get_active_projects_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=None)
 def get_filters_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура фильтров для проектов (устарела, используется прямой выбор статусов)"""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_projects")]
+            [InlineKeyboardButton(text="🔙 Назад", callback_data=BACK_TO_PROJECTS.pack())]
+        ]
+    )
+    return keyboard
+
+
+@lru_cache(maxsize=None)
+def get_filter_refine_keyboard() -> InlineKeyboardMarkup:
+    """Кнопки для уточнения фильтра проектов (фильтры суммируются)"""
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="📊 Статус", callback_data=FILTER_BY_STATUS.pack()),
+                InlineKeyboardButton(text="🎭 Персонаж", callback_data=FILTER_BY_CHARACTER.pack()),
+                InlineKeyboardButton(text="💻 Разработчик", callback_data=FILTER_BY_DEVELOPER.pack())
+            ],
+            [InlineKeyboardButton(text="⚡ Действия с найденными", callback_data=BATCH_ACTIONS.pack())],
+            [InlineKeyboardButton(text="♻️ Сбросить фильтры", callback_data=RESET_FILTERS.pack())]
+        ]
+    )
+    return keyboard
+
+
+@lru_cache(maxsize=None)
+def get_batch_actions_keyboard() -> InlineKeyboardMarkup:
+    """Действия сразу над всеми проектами текущей выборки фильтров"""
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="➡️ Перевести в статус", callback_data=BATCH_MOVE.pack())],
+            [InlineKeyboardButton(text="💻 Сменить разработчика", callback_data=BATCH_REASSIGN.pack())],
+            [InlineKeyboardButton(text="🗑️ Удалить все", callback_data=BATCH_DELETE.pack())]
         ]
     )
     return keyboard
 
 
+@lru_cache(maxsize=None)
+def get_batch_delete_confirm_keyboard() -> InlineKeyboardMarkup:
+    """Подтверждение удаления всех проектов выборки"""
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✅ Да, удалить", callback_data=BATCH_DELETE_CONFIRM.pack()),
+                InlineKeyboardButton(text="❌ Отмена", callback_data=BATCH_CANCEL.pack())
+            ]
+        ]
+    )
+    return keyboard
+
+
+def get_project_filters_keyboard(statuses: List[ProjectStatus], status_counts: dict = None) -> InlineKeyboardMarkup:
+    """Клавиатура фильтров проектов: статусы и переход к другим фильтрам"""
+    buttons = list(get_status_list_keyboard(statuses, FILTER_STATUS, status_counts).inline_keyboard)
+    buttons.append([
+        InlineKeyboardButton(text="🎭 По персонажу", callback_data=FILTER_BY_CHARACTER.pack()),
+        InlineKeyboardButton(text="💻 По разработчику", callback_data=FILTER_BY_DEVELOPER.pack())
+    ])
+    buttons.append([InlineKeyboardButton(text="♻️ Сбросить фильтры", callback_data=RESET_FILTERS.pack())])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
 def get_notification_settings_keyboard(user) -> ReplyKeyboardMarkup:
     """Клавиатура настроек уведомлений"""
-    status_text = "✅ Включены" if user.notifications_enabled else "❌ Выключены"
-    interval_text = f"⏰ {user.notification_interval} мин"
+    return _notification_settings_keyboard(bool(user.notifications_enabled), user.notification_interval)
+
+
+@lru_cache(maxsize=None)
+def _notification_settings_keyboard(enabled: bool, interval: int) -> ReplyKeyboardMarkup:
+    status_text = "✅ Включены" if enabled else "❌ Выключены"
+    interval_text = f"⏰ {interval} мин"
     
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
@@ -120,53 +232,68 @@ def get_notification_settings_keyboard(user) -> ReplyKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=None)
 def get_notification_interval_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора интервала уведомлений"""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(text="5 мин", callback_data="set_interval_5"),
-                InlineKeyboardButton(text="10 мин", callback_data="set_interval_10"),
-                InlineKeyboardButton(text="15 мин", callback_data="set_interval_15")
+                InlineKeyboardButton(text="5 мин", callback_data=SET_INTERVAL.pack(5)),
+                InlineKeyboardButton(text="10 мин", callback_data=SET_INTERVAL.pack(10)),
+                InlineKeyboardButton(text="15 мин", callback_data=SET_INTERVAL.pack(15))
             ],
             [
-                InlineKeyboardButton(text="20 мин", callback_data="set_interval_20"),
-                InlineKeyboardButton(text="25 мин", callback_data="set_interval_25"),
-                InlineKeyboardButton(text="30 мин", callback_data="set_interval_30")
+                InlineKeyboardButton(text="20 мин", callback_data=SET_INTERVAL.pack(20)),
+                InlineKeyboardButton(text="25 мин", callback_data=SET_INTERVAL.pack(25)),
+                InlineKeyboardButton(text="30 мин", callback_data=SET_INTERVAL.pack(30))
             ],
             [
-                InlineKeyboardButton(text="60 мин", callback_data="set_interval_60")
+                InlineKeyboardButton(text="60 мин", callback_data=SET_INTERVAL.pack(60))
             ]
         ]
     )
     return keyboard
 
 
-def get_characters_list_keyboard(characters: List[Character], action: str = "select") -> InlineKeyboardMarkup:
-    """Клавиатура со списком персонажей"""
+def get_characters_list_keyboard(characters: List[Character], action: ListAction = SELECT_CHARACTER, counts: dict = None) -> InlineKeyboardMarkup:
+    """Клавиатура со списком персонажей (counts - количество проектов по ID персонажа)"""
+    key = (
+        "characters_list", get_data_version(CHARACTERS_FILE), action,
+        tuple(character.id for character in characters), _counts_key(counts)
+    )
+    return _cached_data_keyboard(key, lambda: _build_characters_list_keyboard(characters, action, counts))
+
+
+def _build_characters_list_keyboard(characters: List[Character], action: ListAction, counts: Optional[dict]) -> InlineKeyboardMarkup:
     buttons = []
     for character in characters:
+        text = character.name
+        if counts is not None:
+            text += f" - {counts.get(character.id, 0)} проектов"
         buttons.append([InlineKeyboardButton(
-            text=character.name,
-            callback_data=f"{action}_character_{character.id}"
+            text=text,
+            callback_data=action.pack(character.id)
         )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def get_developers_list_keyboard(developers: List[Developer], action: str = "select") -> InlineKeyboardMarkup:
-    """Клавиатура со списком разработчиков"""
+def get_developers_list_keyboard(developers: List[Developer], action: ListAction = SELECT_DEVELOPER, counts: dict = None) -> InlineKeyboardMarkup:
+    """Клавиатура со списком разработчиков (counts - количество проектов по ID разработчика)"""
     buttons = []
     for developer in developers:
         text = f"{developer.name} (@{developer.username})"
+        if counts is not None:
+            text += f" - {counts.get(developer.id, 0)} проектов"
         buttons.append([InlineKeyboardButton(
             text=text,
-            callback_data=f"{action}_developer_{developer.id}"
+            callback_data=action.pack(developer.id)
         )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=None)
 def get_characters_management_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура управления персонажами"""
     keyboard = ReplyKeyboardMarkup(
@@ -181,6 +308,27 @@ def get_characters_management_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+# Действия кнопок удаления используемой сущности: (передать проекты, удалить с проектами, отмена)
+_IN_USE_DELETE_ACTIONS = {
+    "character": (REASSIGN_CHARACTER, CASCADE_CHARACTER, CANCEL_REMOVE_CHARACTER),
+    "developer": (REASSIGN_DEVELOPER, CASCADE_DEVELOPER, CANCEL_REMOVE_DEVELOPER),
+}
+
+
+def get_in_use_delete_keyboard(kind: str, entity_id: int) -> InlineKeyboardMarkup:
+    """Варианты удаления персонажа/разработчика (kind: character или developer), у которого есть проекты"""
+    reassign, cascade, cancel = _IN_USE_DELETE_ACTIONS[kind]
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="🔁 Передать проекты", callback_data=reassign.pack(entity_id))],
+            [InlineKeyboardButton(text="🗑️ Удалить вместе с проектами", callback_data=cascade.pack(entity_id))],
+            [InlineKeyboardButton(text="❌ Отмена", callback_data=cancel.pack())]
+        ]
+    )
+    return keyboard
+
+
+@lru_cache(maxsize=None)
 def get_developers_management_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура управления разработчиками"""
     keyboard = ReplyKeyboardMarkup(
@@ -195,6 +343,7 @@ def get_developers_management_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=1024)
 def get_project_actions_keyboard(project_id: int, is_archive: bool = False) -> InlineKeyboardMarkup:
     """Инлайн-клавиатура с действиями для проекта"""
     if is_archive:
@@ -202,12 +351,12 @@ def get_project_actions_keyboard(project_id: int, is_archive: bool = False) -> I
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text="⬅️ Пред.Статус", callback_data=f"prev_status_{project_id}"),
-                    InlineKeyboardButton(text="➡️ След.Статус", callback_data=f"next_status_{project_id}")
+                    InlineKeyboardButton(text="⬅️ Пред.Статус", callback_data=PREV_STATUS.pack(project_id)),
+                    InlineKeyboardButton(text="➡️ След.Статус", callback_data=NEXT_STATUS.pack(project_id))
                 ],
                 [
-                    InlineKeyboardButton(text="↩️ Вернуть в проекты", callback_data=f"restore_project_{project_id}"),
-                    InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"delete_project_{project_id}")
+                    InlineKeyboardButton(text="↩️ Вернуть в проекты", callback_data=RESTORE_PROJECT.pack(project_id)),
+                    InlineKeyboardButton(text="🗑️ Удалить", callback_data=DELETE_PROJECT.pack(project_id))
                 ]
             ]
         )
@@ -216,82 +365,90 @@ def get_project_actions_keyboard(project_id: int, is_archive: bool = False) -> I
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"edit_project_{project_id}"),
-                    InlineKeyboardButton(text="⬅️ Пред.Статус", callback_data=f"prev_status_{project_id}")
+                    InlineKeyboardButton(text="✏️ Редактировать", callback_data=EDIT_PROJECT.pack(project_id)),
+                    InlineKeyboardButton(text="⬅️ Пред.Статус", callback_data=PREV_STATUS.pack(project_id))
                 ],
                 [
-                    InlineKeyboardButton(text="➡️ След.Статус", callback_data=f"next_status_{project_id}"),
-                    InlineKeyboardButton(text="🗑️ Удалить", callback_data=f"delete_project_{project_id}")
+                    InlineKeyboardButton(text="➡️ След.Статус", callback_data=NEXT_STATUS.pack(project_id)),
+                    InlineKeyboardButton(text="🗑️ Удалить", callback_data=DELETE_PROJECT.pack(project_id))
                 ]
             ]
         )
     return keyboard
 
 
+@lru_cache(maxsize=None)
 def get_archive_filters_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура фильтров для архива"""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Опубликованные", callback_data="filter_archive_published")],
-            [InlineKeyboardButton(text="🚫 Заблокированные", callback_data="filter_archive_banned")],
-            [InlineKeyboardButton(text="📋 Все архивные", callback_data="filter_archive_all")],
-            [InlineKeyboardButton(text="🔙 Главное меню", callback_data="back_to_main_from_archive")]
+            [InlineKeyboardButton(text="✅ Опубликованные", callback_data=FILTER_ARCHIVE_PUBLISHED.pack())],
+            [InlineKeyboardButton(text="🚫 Заблокированные", callback_data=FILTER_ARCHIVE_BANNED.pack())],
+            [InlineKeyboardButton(text="📋 Все архивные", callback_data=FILTER_ARCHIVE_ALL.pack())],
+            [InlineKeyboardButton(text="🔙 Главное меню", callback_data=BACK_TO_MAIN_FROM_ARCHIVE.pack())]
         ]
     )
     return keyboard
 
 
+@lru_cache(maxsize=1024)
 def get_edit_project_keyboard(project_id: int) -> InlineKeyboardMarkup:
     """Инлайн-клавиатура для выбора поля редактирования проекта"""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="📝 Название", callback_data=f"edit_field_name_{project_id}")],
-            [InlineKeyboardButton(text="🎭 Персонаж", callback_data=f"edit_field_character_{project_id}")],
-            [InlineKeyboardButton(text="💻 Разработчик", callback_data=f"edit_field_developer_{project_id}")],
-            [InlineKeyboardButton(text="📊 Статус", callback_data=f"edit_field_status_{project_id}")],
-            [InlineKeyboardButton(text="❌ Отмена", callback_data=f"cancel_edit_{project_id}")]
+            [InlineKeyboardButton(text="📝 Название", callback_data=EDIT_FIELD_NAME.pack(project_id))],
+            [InlineKeyboardButton(text="🎭 Персонаж", callback_data=EDIT_FIELD_CHARACTER.pack(project_id))],
+            [InlineKeyboardButton(text="💻 Разработчик", callback_data=EDIT_FIELD_DEVELOPER.pack(project_id))],
+            [InlineKeyboardButton(text="📊 Статус", callback_data=EDIT_FIELD_STATUS.pack(project_id))],
+            [InlineKeyboardButton(text="❌ Отмена", callback_data=CANCEL_EDIT.pack(project_id))]
         ]
     )
     return keyboard
 
 
-def get_statuses_list_keyboard(statuses: List[ProjectStatus], action: str = "select") -> InlineKeyboardMarkup:
+def get_statuses_list_keyboard(statuses: List[ProjectStatus], action: ListAction = EDIT_STATUS) -> InlineKeyboardMarkup:
     """Клавиатура со списком статусов"""
     buttons = []
     for status in statuses:
         # Форматируем название статуса с указанием ответственного
-        if hasattr(status, 'responsible') and status.responsible != "никто":
+        if hasattr(status, 'responsible') and status.responsible != NO_RESPONSIBLE:
             status_text = f"{status.name} ({status.responsible})"
         else:
             status_text = status.name
         
         buttons.append([InlineKeyboardButton(
             text=status_text,
-            callback_data=f"{action}_status_{status.id}"
+            callback_data=action.pack(status.id)
         )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=1024)
 def get_delete_confirm_keyboard(project_id: int) -> InlineKeyboardMarkup:
     """Инлайн-клавиатура для подтверждения удаления проекта"""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(text="✅ Да, удалить", callback_data=f"confirm_delete_{project_id}"),
-                InlineKeyboardButton(text="❌ Отмена", callback_data=f"cancel_delete_{project_id}")
+                InlineKeyboardButton(text="✅ Да, удалить", callback_data=CONFIRM_DELETE.pack(project_id)),
+                InlineKeyboardButton(text="❌ Отмена", callback_data=CANCEL_DELETE.pack(project_id))
             ]
         ]
     )
     return keyboard
 
 
+@lru_cache(maxsize=None)
 def get_bot_settings_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура настроек бота"""
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="👥 Выбор роли")],
             [KeyboardButton(text="📋 Управление чек-листами")],
+            [KeyboardButton(text="📈 Отчет по статусам")],
+            [KeyboardButton(text="📤 Экспорт данных")],
+            [KeyboardButton(text="📥 Импорт проектов")],
+            [KeyboardButton(text="🩺 Проверка данных")],
             [KeyboardButton(text="🔙 Главное меню")]
         ],
         resize_keyboard=True
@@ -299,39 +456,48 @@ def get_bot_settings_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
-def get_role_selection_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    """Инлайн-клавиатура для выбора роли пользователя"""
+@lru_cache(maxsize=None)
+def get_export_keyboard() -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура выбора выгрузки"""
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(text="👑 Админ", callback_data=f"set_role_{user_id}_admin"),
-                InlineKeyboardButton(text="👤 Игнат", callback_data=f"set_role_{user_id}_Игнат")
+                InlineKeyboardButton(text="📁 Проекты CSV", callback_data=EXPORT.pack("projects", "csv")),
+                InlineKeyboardButton(text="📁 Проекты JSON", callback_data=EXPORT.pack("projects", "json"))
             ],
             [
-                InlineKeyboardButton(text="👤 Лёша", callback_data=f"set_role_{user_id}_Лёша"),
-                InlineKeyboardButton(text="👤 Пользователь", callback_data=f"set_role_{user_id}_user")
+                InlineKeyboardButton(text="🕓 История CSV", callback_data=EXPORT.pack("history", "csv")),
+                InlineKeyboardButton(text="🕓 История JSON", callback_data=EXPORT.pack("history", "json"))
             ]
         ]
     )
     return keyboard
 
 
-def get_users_list_keyboard(users: List[User], action: str = "select_role") -> InlineKeyboardMarkup:
+def get_role_selection_keyboard(user_id: int, roles: List[Role]) -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура для выбора роли пользователя"""
+    options = [InlineKeyboardButton(text="👑 Админ", callback_data=SET_ROLE.pack(user_id, ADMIN_ROLE))]
+    options += [
+        InlineKeyboardButton(text=f"👤 {role.name}", callback_data=SET_ROLE.pack(user_id, role.name))
+        for role in roles
+    ]
+    options.append(InlineKeyboardButton(text="👤 Пользователь", callback_data=SET_ROLE.pack(user_id, DEFAULT_USER_ROLE)))
+    
+    # По две кнопки в ряд
+    buttons = [options[i:i + 2] for i in range(0, len(options), 2)]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_users_list_keyboard(users: List[User], action: ListAction = SELECT_ROLE) -> InlineKeyboardMarkup:
     """Клавиатура со списком пользователей для выбора роли"""
     buttons = []
     for user in users:
-        role_emoji = {
-            "admin": "👑",
-            "Игнат": "👤",
-            "Лёша": "👤",
-            "user": "👤"
-        }
-        emoji = role_emoji.get(user.role, "👤")
+        emoji = "👑" if user.role == ADMIN_ROLE else "👤"
         name = user.first_name or user.username or f"ID:{user.user_id}"
         text = f"{emoji} {name} ({user.role})"
         buttons.append([InlineKeyboardButton(
             text=text,
-            callback_data=f"{action}_{user.user_id}"
+            callback_data=action.pack(user.user_id)
         )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -346,7 +512,7 @@ def get_checklist_keyboard(status_id: int, project_id: int, checklist_items) ->
         text = f"{checkbox} {item.text}"
         buttons.append([InlineKeyboardButton(
             text=text,
-            callback_data=f"toggle_checklist_{status_id}_{project_id}_{item.id}"
+            callback_data=TOGGLE_CHECKLIST.pack(status_id, project_id, item.id)
         )])
     
     # Кнопка "Перейти на следующий статус" (только если все отмечено)
@@ -354,17 +520,36 @@ def get_checklist_keyboard(status_id: int, project_id: int, checklist_items) ->
     if all_checked and checklist_items:
         buttons.append([InlineKeyboardButton(
             text="➡️ Перейти на следующий статус",
-            callback_data=f"confirm_next_status_{project_id}"
+            callback_data=CONFIRM_NEXT_STATUS.pack(project_id)
+        )])
+    
+    buttons.append([InlineKeyboardButton(
+        text="🔙 Назад к проекту",
+        callback_data=BACK_TO_PROJECT.pack(project_id)
+    )])
+    
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_status_choice_keyboard(project_id: int, statuses) -> InlineKeyboardMarkup:
+    """Клавиатура выбора статуса, когда по схеме переходов возможно несколько вариантов"""
+    buttons = []
+    
+    for status in statuses:
+        buttons.append([InlineKeyboardButton(
+            text=status.name,
+            callback_data=MOVE_STATUS.pack(project_id, status.id)
         )])
     
     buttons.append([InlineKeyboardButton(
         text="🔙 Назад к проекту",
-        callback_data=f"back_to_project_{project_id}"
+        callback_data=BACK_TO_PROJECT.pack(project_id)
     )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=None)
 def get_checklist_management_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура управления чек-листами"""
     keyboard = ReplyKeyboardMarkup(
@@ -379,6 +564,7 @@ def get_checklist_management_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=None)
 def get_checklist_creation_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура при создании чек-листа"""
     keyboard = ReplyKeyboardMarkup(
@@ -391,21 +577,15 @@ def get_checklist_creation_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
-def get_statuses_for_checklist_keyboard(statuses, action: str = "select_checklist") -> InlineKeyboardMarkup:
+def get_statuses_for_checklist_keyboard(statuses, action: ListAction = SELECT_CHECKLIST_STATUS) -> InlineKeyboardMarkup:
     """Клавиатура со списком статусов для выбора чек-листа"""
-    from models import ProjectStatus
     buttons = []
     for status in statuses:
-        responsible_emoji = {
-            "Игнат": "👤",
-            "Лёша": "👤",
-            "никто": "⚪"
-        }
-        emoji = responsible_emoji.get(status.responsible, "⚪")
+        emoji = "⚪" if status.responsible == NO_RESPONSIBLE else "👤"
         text = f"{emoji} {status.name} ({status.responsible})"
         buttons.append([InlineKeyboardButton(
             text=text,
-            callback_data=f"{action}_{status.id}"
+            callback_data=action.pack(status.id)
         )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -0,0 +1,303 @@
+"""Нагрузочный прогон обработчиков бота без обращения к Telegram.
+
+Синтетические апдейты (Message/CallbackQuery) прогоняются через настоящий
+Dispatcher со всеми роутерами из main.py. Вместо HTTP-сессии используется
+FakeSession, которая только считает исходящие вызовы Telegram API.
+Данные копируются во временную папку, поэтому рабочие JSON-файлы не меняются.
+
+Запуск:
+    python loadtest.py --projects 200 --iterations 20
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+
+DATA_FILES = [
+    "statuses.json",
+    "projects.json",
+    "characters.json",
+    "developers.json",
+    "users.json",
+    "checklists.json",
+    "checklist_progress.json",
+    "status_history.jsonl",
+    "workflow.json",
+    "roles.json",
+]
+
+FAKE_TOKEN = "123456:LOADTEST"
+BOT_ID = 123456
+LOADTEST_USER_ID = 777000001
+
+
+class FakeSession(BaseSession):
+    """Сессия, которая не ходит в сеть, а считает вызовы API"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1000)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        api_method = method.__api_method__
+        self.calls[api_method] += 1
+        result = self._fake_result(api_method, method)
+        content = json.dumps({"ok": True, "result": result})
+        return self.check_response(bot=bot, method=method, status_code=200, content=content)
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    def _fake_result(self, api_method: str, method: TelegramMethod) -> Any:
+        """Формирует правдоподобный ответ Telegram для метода"""
+        if api_method == "getMe":
+            return {"id": BOT_ID, "is_bot": True, "first_name": "LoadTest"}
+        if api_method in ("sendMessage", "sendDocument"):
+            chat_id = getattr(method, "chat_id", LOADTEST_USER_ID)
+            return {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "LoadTest"},
+                "text": getattr(method, "text", None) or "",
+            }
+        # editMessageText, answerCallbackQuery и прочие методы возвращают True
+        return True
+
+
+def _user_dict(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": "LoadTest", "username": "loadtest"}
+
+
+def make_message_update(update_id: int, user_id: int, text: str) -> Update:
+    """Синтетический апдейт с текстовым сообщением (нажатие reply-кнопки)"""
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user_dict(user_id),
+            "text": text,
+        },
+    })
+
+
+def make_callback_update(update_id: int, user_id: int, data: str) -> Update:
+    """Синтетический апдейт с нажатием инлайн-кнопки"""
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user_dict(user_id),
+            "chat_instance": "loadtest",
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "LoadTest"},
+                "text": "loadtest",
+            },
+        },
+    })
+
+
+def make_inline_update(update_id: int, user_id: int, query: str) -> Update:
+    """Синтетический апдейт с inline-запросом (@bot запрос)"""
+    return Update.model_validate({
+        "update_id": update_id,
+        "inline_query": {
+            "id": str(update_id),
+            "from": _user_dict(user_id),
+            "query": query,
+            "offset": "",
+        },
+    })
+
+
+def prepare_data_dir(source_dir: str, projects_count: int) -> str:
+    """Копирует данные во временную папку и добавляет синтетические проекты.
+
+    Папкой данных storage становится временная папка, поэтому прогон не трогает
+    настоящие данные, даже если DATA_DIR - абсолютный путь.
+    """
+    work_dir = tempfile.mkdtemp(prefix="workbot-loadtest-")
+    for file_name in DATA_FILES:
+        source = os.path.join(source_dir, file_name)
+        if os.path.exists(source):
+            shutil.copy(source, os.path.join(work_dir, file_name))
+
+    import storage
+    storage.data_dir = work_dir
+    storage.invalidate_cache()
+    statuses = storage.get_all_statuses()
+    if not storage.get_all_characters():
+        storage.add_character("Loadtest Character")
+    if not storage.get_all_developers():
+        storage.add_developer("Loadtest Developer", "loadtest_dev")
+    characters = storage.get_all_characters()
+    developers = storage.get_all_developers()
+
+    projects = storage.get_all_projects()
+    next_id = max([p.id for p in projects], default=0) + 1
+    active_statuses = [s for s in statuses if not storage.is_archive_status(s.id)] or statuses
+    for i in range(projects_count):
+        projects.append(storage.Project(
+            id=next_id + i,
+            name=f"Loadtest project {next_id + i}",
+            character_id=characters[i % len(characters)].id,
+            developer_id=developers[i % len(developers)].id,
+            status_id=active_statuses[i % len(active_statuses)].id,
+        ))
+    storage.save_projects(projects)
+    storage.recalculate_all_developers_stats()
+
+    # Пользователь нагрузочного теста - админ с ролью "Лёша"
+    import config
+    config.ADMIN_ID = LOADTEST_USER_ID
+    # Сценарии повторяют одни и те же нажатия подряд - защита от двойных нажатий их бы отбросила
+    config.CALLBACK_DUPLICATE_WINDOW = 0
+    config.RATE_LIMIT_INTERVAL = 0
+    user = storage.get_or_create_user(LOADTEST_USER_ID, "loadtest", "LoadTest")
+    user.role = "Лёша"
+    storage.update_user(user)
+    return work_dir
+
+
+def build_scenarios() -> Dict[str, List[str]]:
+    """Сценарии: название -> список апдейтов ("text:...", "cb:..." или "inline:...")"""
+    import storage
+    from callbacks import (
+        FILTER_STATUS, FILTER_CHARACTER, NEXT_STATUS, PREV_STATUS, TOGGLE_CHECKLIST, FILTER_BY_STATUS
+    )
+    projects = storage.get_active_projects()
+    project = projects[0]
+    statuses = storage.get_all_statuses()
+    status_id = project.status_id
+    checklist = next((c for c in storage.get_all_checklists() if c.items), None)
+
+    scenarios = {
+        "📋 Проекты": ["text:📋 Проекты"],
+        "🔍 Фильтры": ["text:🔍 Фильтры"],
+        "filter_status": [f"cb:{FILTER_STATUS.pack(status_id)}"],
+        "status+character": [f"cb:{FILTER_STATUS.pack(status_id)}", f"cb:{FILTER_CHARACTER.pack(project.character_id)}"],
+        "next+prev status": [f"cb:{NEXT_STATUS.pack(project.id)}", f"cb:{PREV_STATUS.pack(project.id)}"],
+        "📦 Архив": ["text:📦 Архив"],
+        "✅ Мои Задачи": ["text:✅ Мои Задачи"],
+        "👥 Разработчики": ["text:👥 Разработчики"],
+        "🔎 /search": ["text:/search loadtest project 1"],
+        "inline_query": ["inline:loadtest project"],
+    }
+    if checklist:
+        item_id = checklist.items[0].id
+        scenarios["toggle_checklist"] = [
+            f"cb:{TOGGLE_CHECKLIST.pack(checklist.status_id, project.id, item_id)}",
+            f"cb:{TOGGLE_CHECKLIST.pack(checklist.status_id, project.id, item_id)}",
+        ]
+    if statuses:
+        scenarios["filter_by_status"] = [f"cb:{FILTER_BY_STATUS.pack()}"]
+    return scenarios
+
+
+async def run(projects_count: int, iterations: int, keep_data: bool):
+    import storage
+    source_dir = storage.data_dir
+    work_dir = prepare_data_dir(source_dir, projects_count)
+
+    from main import create_dispatcher
+    from services.metrics import registry, setup_metrics
+
+    session = FakeSession()
+    bot = Bot(token=FAKE_TOKEN, session=session)
+    dp = create_dispatcher()
+    setup_metrics(dp, bot)
+    storage.reset_io_stats()
+
+    update_ids = itertools.count(1)
+    results = []
+    try:
+        for name, steps in build_scenarios().items():
+            latencies = []
+            reads = writes = 0
+            session.calls.clear()
+            for _ in range(iterations):
+                for step in steps:
+                    kind, payload = step.split(":", 1)
+                    if kind == "text":
+                        update = make_message_update(next(update_ids), LOADTEST_USER_ID, payload)
+                    elif kind == "inline":
+                        update = make_inline_update(next(update_ids), LOADTEST_USER_ID, payload)
+                    else:
+                        update = make_callback_update(next(update_ids), LOADTEST_USER_ID, payload)
+                    started = time.perf_counter()
+                    with storage.io_scope() as io_counters:
+                        await dp.feed_update(bot, update)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    reads += io_counters["reads"]
+                    writes += io_counters["writes"]
+            runs = iterations * len(steps)
+            results.append({
+                "scenario": name,
+                "p50_ms": statistics.median(latencies),
+                "max_ms": max(latencies),
+                "api_calls": sum(session.calls.values()) / runs,
+                "api_detail": dict(session.calls),
+                "reads": reads / runs,
+                "writes": writes / runs,
+            })
+    finally:
+        io_stats = storage.get_io_stats()
+        await bot.session.close()
+        storage.data_dir = source_dir
+        storage.invalidate_cache()
+        if not keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Проектов: {projects_count} (+ существующие), итераций: {iterations}")
+    print(f"{'Сценарий':<22}{'p50, мс':>10}{'max, мс':>10}{'API/апд':>10}{'чтений':>10}{'записей':>10}")
+    for row in results:
+        print(f"{row['scenario']:<22}{row['p50_ms']:>10.1f}{row['max_ms']:>10.1f}"
+              f"{row['api_calls']:>10.1f}{row['reads']:>10.1f}{row['writes']:>10.1f}")
+    print()
+    for row in results:
+        detail = ", ".join(f"{k}={v}" for k, v in sorted(row["api_detail"].items()))
+        print(f"{row['scenario']}: {detail}")
+    print()
+    print(registry.format_summary(limit=20))
+    print()
+    print("Чаще всего читают/пишут файлы:")
+    for row in io_stats["callers"][:15]:
+        print(f"  {row['count']:>7} {row['op']:<5} {row['function']:<16} через {row['via']:<28} из {row['caller']}")
+    if keep_data:
+        print(f"\nДанные прогона сохранены в {work_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон обработчиков Work Bot")
+    parser.add_argument("--projects", type=int, default=100, help="Сколько синтетических проектов добавить")
+    parser.add_argument("--iterations", type=int, default=10, help="Сколько раз повторить каждый сценарий")
+    parser.add_argument("--keep-data", action="store_true", help="Не удалять временную папку с данными")
+    args = parser.parse_args()
+    asyncio.run(run(args.projects, args.iterations, args.keep_data))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,12 @@ from aiogram import Bot, Dispatcher
 from aiogram.filters import Command
 from aiogram.types import Message
 from aiogram.fsm.storage.memory import MemoryStorage
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, METRICS_PORT, METRICS_LOG_INTERVAL, WORKERS, UPDATE_CONCURRENCY,
+    CALLBACK_DUPLICATE_WINDOW, RATE_LIMIT_INTERVAL
+)
 from keyboards import get_main_menu_keyboard
-from storage import get_or_create_user, is_admin, get_user_by_id
+from storage import get_or_create_user, is_admin, get_user_by_id, init_data_dir
 from handlers.main_menu import router as main_menu_router
 from handlers.status_management import router as status_management_router
 from handlers.projects import router as projects_router
@@ -14,7 +17,16 @@ from handlers.characters import router as characters_router
 from handlers.developers import router as developers_router
 from handlers.admin import router as admin_router
 from handlers.notifications import router as notifications_router
+from handlers.inline import router as inline_router
 from services.notifications import start_notification_service
+from services.leader import run_as_leader
+from services.workers import run_front
+from services.workspaces import setup_workspaces
+from services.concurrency import UserEventIsolation, setup_storage_errors
+from services.throttling import setup_duplicate_callbacks, setup_throttling
+from callbacks import setup_callbacks
+from routing import setup_text_handlers
+from services.metrics import setup_metrics, start_metrics_server, log_metrics_periodically
 
 # Настройка логирования
 logging.basicConfig(
@@ -44,15 +56,24 @@ async def start_command(message: Message):
     )
 
 
-async def main():
-    """Основная функция запуска бота"""
-    if not BOT_TOKEN:
-        logger.error("BOT_TOKEN не найден! Создайте файл .env и добавьте BOT_TOKEN=your_token")
-        return
-    
-    bot = Bot(token=BOT_TOKEN)
+def create_dispatcher() -> Dispatcher:
+    """Создает диспетчер со всеми роутерами бота"""
     storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    # Очередность апдейтов пользователя обеспечивает изоляция событий FSM: состояние
+    # читается уже под блокировкой пользователя. FSM подключаем сами, после подавления
+    # повторных нажатий, чтобы повтор получал ответ, не дожидаясь очереди пользователя
+    dp = Dispatcher(
+        storage=storage,
+        events_isolation=UserEventIsolation(max(UPDATE_CONCURRENCY, 1)),
+        disable_fsm=True
+    )
+    setup_duplicate_callbacks(dp, CALLBACK_DUPLICATE_WINDOW)
+    dp.update.outer_middleware(dp.fsm)
+    setup_workspaces(dp)
+    setup_storage_errors(dp)
+    setup_throttling(dp, RATE_LIMIT_INTERVAL)
+    setup_callbacks(dp)  # все callback-запросы маршрутизируются по таблице действий
+    setup_text_handlers(dp)  # кнопки reply-клавиатур - по таблице текстов
     
     # Регистрация обработчиков
     dp.message.register(start_command, Command("start"))
@@ -61,22 +82,48 @@ async def main():
     dp.include_router(characters_router)
     dp.include_router(developers_router)
     dp.include_router(notifications_router)
+    dp.include_router(inline_router)
     dp.include_router(main_menu_router)
     dp.include_router(status_management_router)
     
+    return dp
+
+
+async def main():
+    """Основная функция запуска бота"""
+    if not BOT_TOKEN:
+        logger.error("BOT_TOKEN не найден! Создайте файл .env и добавьте BOT_TOKEN=your_token")
+        return
+    
+    init_data_dir()
+    bot = Bot(token=BOT_TOKEN)
+    dp = create_dispatcher()
+    setup_metrics(dp, bot)
+    
     logger.info("Бот запущен!")
     
-    # Запускаем сервис уведомлений в фоне
-    notification_task = asyncio.create_task(start_notification_service(bot))
+    # Сервис уведомлений работает только в ведущем процессе, чтобы при нескольких
+    # экземплярах бота напоминания не дублировались
+    background_tasks = [asyncio.create_task(run_as_leader(lambda: start_notification_service(bot)))]
+    if METRICS_LOG_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(log_metrics_periodically(METRICS_LOG_INTERVAL)))
+    metrics_runner = await start_metrics_server(METRICS_PORT) if METRICS_PORT else None
     
     try:
-        await dp.start_polling(bot)
+        if WORKERS > 1:
+            # Апдейты обрабатывают отдельные процессы, этот только раздает их
+            await run_front(bot, WORKERS, dp.resolve_used_update_types())
+        else:
+            await dp.start_polling(bot, handle_as_tasks=UPDATE_CONCURRENCY > 1)
     finally:
-        notification_task.cancel()
-        try:
-            await notification_task
-        except asyncio.CancelledError:
-            pass
+        for task in background_tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if metrics_runner:
+            await metrics_runner.cleanup()
         await bot.session.close()
 
 
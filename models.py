@@ -1,11 +1,17 @@
 from dataclasses import dataclass, asdict
-from typing import Optional, Literal, List
+from typing import Optional, List
 import json
 import os
 
 
-ResponsiblePerson = Literal["Игнат", "Лёша", "никто"]
-UserRole = Literal["admin", "Игнат", "Лёша", "user"]
+# Ответственный за статус - название роли из roles.json или "никто"
+ResponsiblePerson = str
+# Роль пользователя - "admin", "user" или название роли из roles.json
+UserRole = str
+
+NO_RESPONSIBLE = "никто"
+ADMIN_ROLE = "admin"
+DEFAULT_USER_ROLE = "user"
 
 
 @dataclass
@@ -16,12 +22,7 @@ class ProjectStatus:
     responsible: ResponsiblePerson
     
     def __str__(self):
-        responsible_emoji = {
-            "Игнат": "👤",
-            "Лёша": "👤",
-            "никто": "⚪"
-        }
-        emoji = responsible_emoji.get(self.responsible, "⚪")
+        emoji = "⚪" if self.responsible == NO_RESPONSIBLE else "👤"
         return f"{emoji} {self.name} ({self.responsible})"
     
     def to_dict(self):
@@ -32,6 +33,23 @@ class ProjectStatus:
         return cls(**data)
 
 
+@dataclass
+class Role:
+    """Модель роли команды (тот, на кого назначаются статусы)"""
+    name: str
+    can_manage: bool = False  # доступ к управлению статусами и персонажами
+    
+    def to_dict(self):
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+    
+    def __str__(self):
+        return f"👤 {self.name}"
+
+
 @dataclass
 class Character:
     """Модель персонажа"""
@@ -96,7 +114,7 @@ class User:
     user_id: int
     username: Optional[str] = None
     first_name: Optional[str] = None
-    role: UserRole = "user"
+    role: UserRole = DEFAULT_USER_ROLE
     notifications_enabled: bool = True
     notification_interval: int = 30  # минуты: 5, 10, 15, 20, 25, 30, 60
     
@@ -113,13 +131,7 @@ class User:
         return cls(**data)
     
     def __str__(self):
-        role_emoji = {
-            "admin": "👑",
-            "Игнат": "👤",
-            "Лёша": "👤",
-            "user": "👤"
-        }
-        emoji = role_emoji.get(self.role, "👤")
+        emoji = "👑" if self.role == ADMIN_ROLE else "👤"
         name = self.first_name or self.username or f"ID:{self.user_id}"
         return f"{emoji} {name} ({self.role})"
 
@@ -165,3 +177,20 @@ class Checklist:
             return True
         return all(item.checked for item in self.items)
 
+
+
+@dataclass
+class StatusTransition:
+    """Запись журнала переходов проекта между статусами"""
+    project_id: int
+    from_status_id: Optional[int]  # None - проект только что создан
+    to_status_id: int
+    actor_id: Optional[int]  # Telegram ID пользователя, сменившего статус
+    timestamp: float  # Unix-время перехода
+    
+    def to_dict(self):
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
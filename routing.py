@@ -0,0 +1,102 @@
+"""Таблицы обработчиков: выбор обработчика одним поиском в словаре.
+
+aiogram проверяет фильтры обработчиков по очереди во всех роутерах, поэтому
+стоимость маршрутизации растет с числом обработчиков. Обработчики событий с
+точным ключом (текст кнопки reply-клавиатуры, код действия inline-кнопки)
+регистрируются в HandlerTable, а в диспетчере стоит один фильтр, который
+находит обработчик по ключу. Найденный обработчик подставляется в
+data["handler"], поэтому inner-middleware (метрики, ограничение частоты)
+видят настоящий обработчик и его флаги.
+
+Повторная регистрация того же ключа - ошибка при импорте обработчиков, то есть
+при запуске бота, а не молчаливое "срабатывает первый по порядку роутеров".
+"""
+from typing import Any, Dict, Hashable, Optional, Union
+
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject
+from aiogram.types import Message, TelegramObject
+
+
+class HandlerTable:
+    """Обработчики по точному ключу: ключ -> обработчик"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._handlers: Dict[Hashable, HandlerObject] = {}
+
+    def __call__(self, key: Hashable, *filters, flags: Optional[Dict[str, Any]] = None):
+        """Декоратор: регистрирует обработчик ключа; filters - дополнительные фильтры aiogram"""
+        def decorator(callback):
+            existing = self._handlers.get(key)
+            if existing is not None:
+                raise ValueError(
+                    f"{self.name}: для {key!r} уже есть обработчик "
+                    f"{existing.callback.__module__}.{existing.callback.__name__}"
+                )
+            self._handlers[key] = HandlerObject(
+                callback=callback,
+                filters=[FilterObject(f) for f in filters] or None,
+                flags=dict(flags or {})
+            )
+            return callback
+        return decorator
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._handlers
+
+    def get(self, key: Hashable) -> Optional[HandlerObject]:
+        return self._handlers.get(key)
+
+    @staticmethod
+    async def match(
+        handler: HandlerObject,
+        event: TelegramObject,
+        kwargs: Dict[str, Any],
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Union[bool, Dict[str, Any]]:
+        """Результат фильтра диспетчера для найденного обработчика: проверяет его
+        дополнительные фильтры и возвращает данные для него (fields - аргументы из ключа)
+        """
+        fields = fields or {}
+        if handler.filters:
+            passed, data = await handler.check(event, **{**kwargs, **fields})
+            if not passed:
+                return False
+            return {**data, **fields, "handler": handler}
+        return {**fields, "handler": handler}
+
+
+async def dispatch(event: TelegramObject, handler: HandlerObject, **kwargs) -> Any:
+    """Обработчик диспетчера: вызывает обработчик, найденный фильтром таблицы"""
+    return await handler.call(event, handler=handler, **kwargs)
+
+
+# Кнопки reply-клавиатур: текст кнопки -> обработчик.
+# Кнопки с изменяемым текстом (например, "🔔 Уведомления: ...") остаются фильтрами роутеров.
+text_handler = HandlerTable("Кнопки")
+
+
+async def _resolve_text(message: Message, **kwargs) -> Union[bool, Dict[str, Any]]:
+    handler = text_handler.get(message.text) if message.text else None
+    if handler is None:
+        return False
+    return await text_handler.match(handler, message, kwargs)
+
+
+async def _dispatch_text(message: Message, handler: HandlerObject, **kwargs) -> Any:
+    """Обработчик диспетчера для кнопок. Кнопка, нажатая посреди диалога (в состоянии
+    FSM), завершает его: состояние и его данные сбрасываются, чтобы диалог не остался
+    висеть и следующий ввод не попал в его обработчик.
+    """
+    state = kwargs.get("state")
+    if state is not None and kwargs.get("raw_state") is not None:
+        await state.clear()
+        kwargs["raw_state"] = None
+    return await dispatch(message, handler, **kwargs)
+
+
+def setup_text_handlers(dp):
+    """Подключает таблицу кнопок к диспетчеру. Кнопки срабатывают раньше обработчиков
+    роутеров в любом состоянии FSM, начатый диалог при этом сбрасывается.
+    """
+    dp.message.register(_dispatch_text, _resolve_text)
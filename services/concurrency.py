@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from storage import StorageConflictError, StorageLockTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class UserEventIsolation(BaseEventIsolation):
+    """Изоляция событий FSM: апдейты разных пользователей обрабатываются параллельно
+    (не больше limit одновременно), а апдейты одного пользователя - строго по очереди.
+
+    Работает, когда апдейты запускаются отдельными задачами (handle_as_tasks).
+    Блокировку берет FSMContextMiddleware до чтения состояния, поэтому следующий
+    апдейт пользователя видит состояние FSM, которое оставил предыдущий.
+    asyncio.Lock отдает блокировку в порядке ожидания, поэтому апдейты
+    пользователя обрабатываются в порядке получения. Место в пуле занимается
+    только после того, как подошла очередь пользователя, поэтому ожидающие
+    апдейты одного пользователя не мешают остальным.
+    """
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        # ID пользователя -> [блокировка, число апдейтов, которые ее держат или ждут]
+        self._locks: Dict[int, list] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        # Ключ - пользователь, а не пара чат/пользователь: апдейты пользователя из
+        # лички и из inline-режима тоже идут по очереди
+        user_id = key.user_id
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0], self.semaphore:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[user_id]
+
+    async def close(self) -> None:
+        self._locks.clear()
+
+
+class StorageBusyMiddleware(BaseMiddleware):
+    """Inner-middleware сообщений и callback-запросов: если файл данных занят другим
+    процессом (StorageLockTimeout) или изменен им во время операции (StorageConflictError),
+    отвечает пользователю "попробуйте еще раз", а не оставляет его без ответа
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        try:
+            return await handler(event, data)
+        except (StorageLockTimeout, StorageConflictError) as e:
+            logger.warning(f"Данные заняты другим процессом: {e}")
+            text = "⏳ Данные сейчас обновляются, попробуйте еще раз"
+            if isinstance(event, CallbackQuery):
+                await event.answer(text, show_alert=True)
+            elif isinstance(event, Message):
+                await event.answer(text)
+            return None
+
+
+def setup_storage_errors(dp):
+    """Подключает ответ пользователю при занятых другим процессом файлах данных"""
+    busy = StorageBusyMiddleware()
+    dp.message.middleware(busy)
+    dp.callback_query.middleware(busy)
@@ -0,0 +1,159 @@
+import csv
+import json
+from dataclasses import replace
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import Project, StatusTransition
+from storage import (
+    get_all_characters,
+    get_all_developers,
+    get_all_statuses,
+    get_project_status_times,
+    is_archive_status,
+    iter_status_history,
+    query_projects
+)
+
+PROJECT_FIELDS = [
+    "id", "name", "character", "developer", "developer_username",
+    "status", "responsible", "archive", "created_at", "status_since",
+]
+
+HISTORY_FIELDS = [
+    "project_id", "project", "from_status", "to_status", "actor_id", "timestamp",
+]
+
+
+def _format_timestamp(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return ""
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+class _Lookups:
+    """Справочники для выгрузки: строятся один раз, а не get_*_by_id на каждую строку"""
+
+    def __init__(self):
+        self.characters = {c.id: c.name for c in get_all_characters()}
+        self.developers = {d.id: d for d in get_all_developers()}
+        self.statuses = {s.id: s for s in get_all_statuses()}
+        self.archive = {status_id for status_id in self.statuses if is_archive_status(status_id)}
+
+    def status_name(self, status_id: Optional[int]) -> str:
+        if status_id is None:
+            return ""
+        status = self.statuses.get(status_id)
+        return status.name if status else f"ID:{status_id}"
+
+
+def iter_project_rows() -> Iterator[Dict]:
+    """Строки выгрузки проектов с названиями персонажей, разработчиков и статусов.
+
+    Данные снимаются при вызове, строки формируются при обходе уже без обращения
+    к storage - обходить можно в другом потоке.
+    """
+    lookups = _Lookups()
+    times = get_project_status_times()
+    created = dict(times["created"])
+    status_since = dict(times["status_since"])
+    projects = [replace(project) for project in query_projects(scope="all")]
+    return _project_rows(projects, lookups, created, status_since)
+
+
+def _project_rows(projects: List[Project], lookups: _Lookups, created: Dict[int, float],
+                  status_since: Dict[int, float]) -> Iterator[Dict]:
+    for project in projects:
+        developer = lookups.developers.get(project.developer_id)
+        status = lookups.statuses.get(project.status_id)
+        yield {
+            "id": project.id,
+            "name": project.name,
+            "character": lookups.characters.get(project.character_id, f"ID:{project.character_id}"),
+            "developer": developer.name if developer else f"ID:{project.developer_id}",
+            "developer_username": developer.username if developer else "",
+            "status": lookups.status_name(project.status_id),
+            "responsible": status.responsible if status else "",
+            "archive": project.status_id in lookups.archive,
+            "created_at": _format_timestamp(created.get(project.id)),
+            "status_since": _format_timestamp(status_since.get(project.id)),
+        }
+
+
+def iter_history_rows() -> Iterator[Dict]:
+    """Строки выгрузки журнала переходов (журнал читается при вызове, см. iter_project_rows)"""
+    lookups = _Lookups()
+    project_names = {p.id: p.name for p in query_projects(scope="all")}
+    transitions = list(iter_status_history())
+    return _history_rows(transitions, lookups, project_names)
+
+
+def _history_rows(transitions: List[StatusTransition], lookups: _Lookups,
+                  project_names: Dict[int, str]) -> Iterator[Dict]:
+    for transition in transitions:
+        yield {
+            "project_id": transition.project_id,
+            "project": project_names.get(transition.project_id, ""),
+            "from_status": lookups.status_name(transition.from_status_id),
+            "to_status": lookups.status_name(transition.to_status_id),
+            "actor_id": transition.actor_id or "",
+            "timestamp": _format_timestamp(transition.timestamp),
+        }
+
+
+def write_csv(rows: Iterable[Dict], fields: List[str], output: IO[str]) -> int:
+    """Пишет строки в CSV по одной, возвращает их количество"""
+    writer = csv.DictWriter(output, fieldnames=fields)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_json(rows: Iterable[Dict], output: IO[str]) -> int:
+    """Пишет строки JSON-массивом по одной, не собирая массив в памяти"""
+    count = 0
+    output.write("[")
+    for row in rows:
+        output.write(",\n" if count else "\n")
+        output.write(json.dumps(row, ensure_ascii=False))
+        count += 1
+    output.write("\n]\n")
+    return count
+
+
+EXPORTS = {
+    "projects": (iter_project_rows, PROJECT_FIELDS),
+    "history": (iter_history_rows, HISTORY_FIELDS),
+}
+
+EXPORT_FORMATS = ("csv", "json")
+
+
+def prepare_export(kind: str) -> Tuple[Iterator[Dict], List[str]]:
+    """Снимок данных выгрузки kind: (строки, колонки). Вызывается в потоке цикла событий,
+    обход строк и запись файла (write_export) можно выполнять в другом потоке
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Неизвестная выгрузка: {kind}")
+    rows_factory, fields = EXPORTS[kind]
+    return rows_factory(), fields
+
+
+def write_export(rows: Iterable[Dict], fields: List[str], fmt: str, output: IO[str]) -> int:
+    """Пишет строки выгрузки в CSV или JSON (fmt), возвращает их количество"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    if fmt == "csv":
+        return write_csv(rows, fields, output)
+    return write_json(rows, output)
+
+
+def export_to_file(kind: str, fmt: str, output: IO[str]) -> int:
+    """Выгружает проекты или историю (kind) в CSV или JSON (fmt), возвращает число строк"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    rows, fields = prepare_export(kind)
+    return write_export(rows, fields, fmt, output)
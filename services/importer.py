@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+from typing import List
+
+# Колонки файла импорта (в CSV - заголовок, в JSON - ключи объектов)
+IMPORT_FIELDS = ["name", "character", "developer", "developer_username", "status"]
+
+# Максимальный размер файла импорта (байты): больший файл не скачивается
+MAX_IMPORT_FILE_SIZE = 5 * 1024 * 1024
+
+
+def parse_import_file(file_name: str, raw: bytes) -> List[dict]:
+    """Разбирает CSV- или JSON-файл импорта в список строк-словарей.
+
+    Формат определяется по расширению. При неверном формате выбрасывает ValueError.
+    """
+    text = raw.decode("utf-8-sig")
+    lower_name = (file_name or "").lower()
+    
+    if lower_name.endswith(".json"):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Неверный JSON: {e}")
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            raise ValueError("JSON должен быть списком объектов")
+        return data
+    
+    if lower_name.endswith(".csv"):
+        reader = csv.DictReader(io.StringIO(text))
+        try:
+            if not reader.fieldnames or "name" not in reader.fieldnames:
+                raise ValueError(f"В CSV нужен заголовок с колонками: {', '.join(IMPORT_FIELDS)}")
+            return list(reader)
+        except csv.Error as e:
+            raise ValueError(f"Неверный CSV (строка {reader.line_num}): {e}")
+    
+    raise ValueError("Поддерживаются только файлы .csv и .json")
@@ -0,0 +1,145 @@
+"""Выбор ведущего процесса через файл аренды (lease).
+
+Фоновые задачи, которые должны работать в одном экземпляре (рассылка
+уведомлений), запускаются только в процессе, владеющем арендой. Аренда -
+JSON-файл в папке данных с владельцем и временем окончания; владелец
+продлевает ее каждые ttl/3 секунд. Если ведущий процесс завершился, аренда
+освобождается сразу, а если он упал - истекает через ttl, и ее забирает
+другой процесс.
+
+Проверка с несколькими процессами:
+    python -m services.leader --ttl 3
+(запустите в нескольких терминалах и завершайте ведущий)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import storage
+from config import LEADER_LEASE_TTL
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировки чтение-запись аренды не атомарны
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LEASE_FILE = "leader.lease"
+
+
+class LeaderLease:
+    """Аренда роли ведущего процесса в файле path"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = LEADER_LEASE_TTL, name: Optional[str] = None):
+        self.path = path or os.path.join(storage.data_dir, LEASE_FILE)
+        self.ttl = ttl
+        self.owner = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _update(self, take: bool) -> bool:
+        """Под блокировкой читает аренду и, если она свободна, истекла или наша,
+        продлевает ее (take=True) или освобождает (take=False).
+        Возвращает True, если после вызова аренда принадлежит этому процессу.
+        """
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    current = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                current = {}
+
+            now = time.time()
+            ours = current.get("owner") == self.owner
+            free = not current or current.get("expires", 0) <= now
+            if not take:
+                if ours:
+                    self._write({"owner": None, "expires": 0})
+                return False
+            if not (ours or free):
+                return False
+            self._write({"owner": self.owner, "expires": now + self.ttl})
+            return True
+        finally:
+            os.close(fd)
+
+    def _write(self, data: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def try_acquire(self) -> bool:
+        """Берет или продлевает аренду; False, если ей владеет другой живой процесс"""
+        return self._update(take=True)
+
+    def release(self):
+        """Освобождает аренду, если она наша (при штатной остановке)"""
+        self._update(take=False)
+
+
+async def run_as_leader(job: Callable[[], Awaitable], lease: Optional[LeaderLease] = None):
+    """Запускает job только пока этот процесс - ведущий.
+
+    Процесс-последователь проверяет аренду каждые ttl/3 секунд и при ее
+    освобождении или истечении запускает job. Если продлить аренду не удалось
+    (ее забрал другой процесс), job останавливается.
+    """
+    lease = lease or LeaderLease()
+    interval = lease.ttl / 3
+    task: Optional[asyncio.Task] = None
+    try:
+        while True:
+            try:
+                leader = lease.try_acquire()
+            except OSError as e:
+                logger.error(f"Ошибка аренды {lease.path}: {e}")
+                leader = False
+
+            if leader and task is None:
+                logger.info(f"Процесс {lease.owner} стал ведущим, фоновые задачи запущены")
+                task = asyncio.create_task(job())
+            elif not leader and task is not None:
+                logger.warning(f"Процесс {lease.owner} потерял аренду, фоновые задачи остановлены")
+                task.cancel()
+                task = None
+            elif task is not None and task.done():
+                # Задача завершилась сама (например, с ошибкой) - перезапускаем
+                if not task.cancelled() and task.exception():
+                    logger.error(f"Фоновая задача ведущего завершилась с ошибкой: {task.exception()}")
+                task = asyncio.create_task(job())
+            await asyncio.sleep(interval)
+    finally:
+        if task is not None:
+            task.cancel()
+        lease.release()
+
+
+async def _demo_job(owner: str):
+    while True:
+        print(f"{time.strftime('%H:%M:%S')} {owner}: работаю как ведущий", flush=True)
+        await asyncio.sleep(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка выбора ведущего процесса")
+    parser.add_argument("--ttl", type=float, default=LEADER_LEASE_TTL, help="Срок аренды, секунды")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    lease = LeaderLease(ttl=args.ttl)
+    try:
+        asyncio.run(run_as_leader(lambda: _demo_job(lease.owner), lease))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
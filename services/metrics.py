@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from storage import io_scope, get_io_stats
+
+logger = logging.getLogger(__name__)
+
+# Счетчик вызовов Telegram API в текущем обработчике
+_api_calls: ContextVar[Optional[dict]] = ContextVar("metrics_api_calls", default=None)
+
+
+@dataclass
+class HandlerStats:
+    """Накопленная статистика одного обработчика"""
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    storage_reads: int = 0
+    storage_writes: int = 0
+    api_calls: int = 0
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class MetricsRegistry:
+    """Хранилище метрик обработчиков и вызовов Telegram API"""
+
+    def __init__(self):
+        self.handlers: Dict[Tuple[str, str], HandlerStats] = {}
+        self.api_methods: Counter = Counter()
+
+    def record(self, router: str, handler: str, elapsed: float, reads: int, writes: int,
+               api_calls: int, failed: bool = False):
+        """Добавляет результат одного вызова обработчика"""
+        stats = self.handlers.setdefault((router, handler), HandlerStats())
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        stats.storage_reads += reads
+        stats.storage_writes += writes
+        stats.api_calls += api_calls
+        if failed:
+            stats.errors += 1
+
+    def reset(self):
+        self.handlers.clear()
+        self.api_methods.clear()
+
+    def render_prometheus(self) -> str:
+        """Возвращает метрики в текстовом формате Prometheus"""
+        metrics = [
+            ("workbot_handler_calls_total", "counter", "Вызовы обработчика", lambda s: s.calls),
+            ("workbot_handler_errors_total", "counter", "Вызовы обработчика с ошибкой", lambda s: s.errors),
+            ("workbot_handler_seconds_total", "counter", "Суммарное время обработчика", lambda s: s.total_time),
+            ("workbot_handler_seconds_max", "gauge", "Максимальное время обработчика", lambda s: s.max_time),
+            ("workbot_handler_storage_reads_total", "counter", "Чтения файлов данных", lambda s: s.storage_reads),
+            ("workbot_handler_storage_writes_total", "counter", "Записи файлов данных", lambda s: s.storage_writes),
+            ("workbot_handler_api_calls_total", "counter", "Вызовы Telegram API из обработчика", lambda s: s.api_calls),
+        ]
+        lines = []
+        for name, metric_type, help_text, getter in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (router, handler), stats in sorted(self.handlers.items()):
+                lines.append(f'{name}{{router="{router}",handler="{handler}"}} {getter(stats)}')
+        lines.append("# HELP workbot_api_requests_total Вызовы Telegram API по методам")
+        lines.append("# TYPE workbot_api_requests_total counter")
+        for method, count in sorted(self.api_methods.items()):
+            lines.append(f'workbot_api_requests_total{{method="{method}"}} {count}')
+        lines.extend(_render_storage_stats())
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self, limit: int = 10) -> str:
+        """Краткая сводка по самым медленным обработчикам (по суммарному времени)"""
+        if not self.handlers:
+            return "Метрики обработчиков: пока нет вызовов"
+        rows = sorted(self.handlers.items(), key=lambda item: item[1].total_time, reverse=True)
+        lines = ["Метрики обработчиков (вызовы | ср. мс | макс. мс | чтений | записей | API):"]
+        for (router, handler), stats in rows[:limit]:
+            lines.append(
+                f"  {router}.{handler}: {stats.calls} | {stats.avg_time * 1000:.1f} | "
+                f"{stats.max_time * 1000:.1f} | {stats.storage_reads} | {stats.storage_writes} | {stats.api_calls}"
+            )
+        return "\n".join(lines)
+
+
+registry = MetricsRegistry()
+
+
+def _render_storage_stats() -> list:
+    """Статистика файлов данных из storage в формате Prometheus"""
+    files = get_io_stats()["files"]
+    metrics = [
+        ("workbot_storage_operations_total", "counter", "Операции с файлами данных",
+         lambda s: (("read", s["reads"]), ("write", s["writes"]))),
+        ("workbot_storage_bytes_total", "counter", "Прочитано/записано байт",
+         lambda s: (("read", s["bytes_read"]), ("write", s["bytes_written"]))),
+        ("workbot_storage_seconds_total", "counter", "Время операций с файлами",
+         lambda s: (("read", s["read_time"]), ("write", s["write_time"]))),
+    ]
+    lines = []
+    for name, metric_type, help_text, getter in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for file_name, stats in sorted(files.items()):
+            for op, value in getter(stats):
+                lines.append(f'{name}{{file="{file_name}",op="{op}"}} {value}')
+    lines.append("# HELP workbot_storage_slow_operations_total Медленные операции с файлами")
+    lines.append("# TYPE workbot_storage_slow_operations_total counter")
+    for file_name, stats in sorted(files.items()):
+        lines.append(f'workbot_storage_slow_operations_total{{file="{file_name}"}} {stats["slow"]}')
+    return lines
+
+
+def _handler_name(data: Dict[str, Any]) -> Tuple[str, str]:
+    """Определяет роутер (модуль) и имя функции обработчика"""
+    handler_object = data.get("handler")
+    callback = getattr(handler_object, "callback", None)
+    if callback is None:
+        return "unknown", "unknown"
+    module = getattr(callback, "__module__", "") or ""
+    router = module.rsplit(".", 1)[-1] or "unknown"
+    return router, getattr(callback, "__name__", repr(callback))
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Inner-middleware: время, чтения/записи файлов и вызовы API на каждый обработчик"""
+
+    def __init__(self, metrics: MetricsRegistry = registry):
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        router, name = _handler_name(data)
+        api_counter = {"calls": 0}
+        token = _api_calls.set(api_counter)
+        failed = False
+        started = time.perf_counter()
+        try:
+            with io_scope() as io_counters:
+                return await handler(event, data)
+        except SkipHandler:
+            # Обработчик отказался от события - не учитываем
+            name = None
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _api_calls.reset(token)
+            if name is not None:
+                self.metrics.record(
+                    router, name, time.perf_counter() - started,
+                    io_counters["reads"], io_counters["writes"], api_counter["calls"], failed
+                )
+
+
+class ApiCallsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: считает вызовы Telegram API"""
+
+    def __init__(self, metrics: MetricsRegistry = registry):
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        self.metrics.api_methods[method.__api_method__] += 1
+        counter = _api_calls.get()
+        if counter is not None:
+            counter["calls"] += 1
+        return await make_request(bot, method)
+
+
+def setup_metrics(dp, bot: Optional[Bot] = None, metrics: MetricsRegistry = registry):
+    """Подключает сбор метрик к диспетчеру и (если передан) к сессии бота"""
+    middleware = MetricsMiddleware(metrics)
+    dp.message.middleware(middleware)
+    dp.callback_query.middleware(middleware)
+    dp.inline_query.middleware(middleware)
+    if bot is not None:
+        bot.session.middleware(ApiCallsMiddleware(metrics))
+
+
+async def start_metrics_server(port: int, host: str = "0.0.0.0", metrics: MetricsRegistry = registry):
+    """Запускает HTTP-эндпоинт /metrics в формате Prometheus"""
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render_prometheus(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
+
+
+async def log_metrics_periodically(interval: int, metrics: MetricsRegistry = registry):
+    """Периодически пишет сводку метрик в лог"""
+    last_calls = 0
+    while True:
+        await asyncio.sleep(interval)
+        total_calls = sum(stats.calls for stats in metrics.handlers.values())
+        if total_calls == last_calls:
+            continue
+        last_calls = total_calls
+        logger.info(metrics.format_summary())
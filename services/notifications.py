@@ -6,7 +6,9 @@ from storage import (
     get_projects_by_role,
     get_character_by_id,
     get_developer_by_id,
-    get_status_by_id
+    get_status_by_id,
+    get_all_workspaces,
+    use_workspace
 )
 from config import BOT_TOKEN
 
@@ -64,59 +66,70 @@ async def send_notifications(bot: Bot):
             await asyncio.sleep(60)  # Ждем минуту перед повтором
 
 
+async def _notify_workspace_users(bot: Bot, workspace: str, last_notification_time: dict, current_time: float):
+    """Отправляет уведомления пользователям рабочего пространства workspace (текущего)"""
+    users = get_users_with_tasks()
+    
+    for user in users:
+        if not user.notifications_enabled:
+            continue
+        
+        # Проверяем, прошло ли достаточно времени с последнего уведомления
+        # Время ведется по паре (пространство, пользователь): пользователь нескольких
+        # пространств получает напоминание о задачах каждого из них
+        last_time = last_notification_time.get((workspace, user.user_id), 0)
+        interval_seconds = user.notification_interval * 60
+        
+        if current_time - last_time < interval_seconds:
+            continue
+        
+        projects = get_projects_by_role(user.role)
+        if not projects:
+            continue
+        
+        # Формируем сообщение
+        message_text = f"🔔 У вас есть задачи ({user.role})\n\n"
+        message_text += f"Всего задач: {len(projects)}\n\n"
+        
+        for i, project in enumerate(projects[:5], 1):
+            character = get_character_by_id(project.character_id)
+            status = get_status_by_id(project.status_id)
+            
+            character_name = character.name if character else f"ID:{project.character_id}"
+            status_name = status.name if status else f"ID:{project.status_id}"
+            
+            message_text += f"{i}. 📁 {project.name}\n"
+            message_text += f"   🎭 {character_name} | 📊 {status_name}\n\n"
+        
+        if len(projects) > 5:
+            message_text += f"... и еще {len(projects) - 5} задач"
+        
+        try:
+            await bot.send_message(
+                chat_id=user.user_id,
+                text=message_text
+            )
+            last_notification_time[(workspace, user.user_id)] = current_time
+            logger.info(f"Уведомление отправлено пользователю {user.user_id} (интервал: {user.notification_interval} мин)")
+        except Exception as e:
+            logger.error(f"Ошибка при отправке уведомления пользователю {user.user_id}: {e}")
+
+
 async def start_notification_service(bot: Bot):
     """Запускает сервис уведомлений"""
     logger.info("Сервис уведомлений запущен")
     
-    # Словарь для отслеживания последнего времени отправки для каждого пользователя
+    # Последнее время отправки по (рабочее пространство, пользователь)
     last_notification_time = {}
     
     while True:
         try:
-            users = get_users_with_tasks()
             current_time = asyncio.get_event_loop().time()
             
-            for user in users:
-                if not user.notifications_enabled:
-                    continue
-                
-                # Проверяем, прошло ли достаточно времени с последнего уведомления
-                last_time = last_notification_time.get(user.user_id, 0)
-                interval_seconds = user.notification_interval * 60
-                
-                if current_time - last_time < interval_seconds:
-                    continue
-                
-                projects = get_projects_by_role(user.role)
-                if not projects:
-                    continue
-                
-                # Формируем сообщение
-                message_text = f"🔔 У вас есть задачи ({user.role})\n\n"
-                message_text += f"Всего задач: {len(projects)}\n\n"
-                
-                for i, project in enumerate(projects[:5], 1):
-                    character = get_character_by_id(project.character_id)
-                    status = get_status_by_id(project.status_id)
-                    
-                    character_name = character.name if character else f"ID:{project.character_id}"
-                    status_name = status.name if status else f"ID:{project.status_id}"
-                    
-                    message_text += f"{i}. 📁 {project.name}\n"
-                    message_text += f"   🎭 {character_name} | 📊 {status_name}\n\n"
-                
-                if len(projects) > 5:
-                    message_text += f"... и еще {len(projects) - 5} задач"
-                
-                try:
-                    await bot.send_message(
-                        chat_id=user.user_id,
-                        text=message_text
-                    )
-                    last_notification_time[user.user_id] = current_time
-                    logger.info(f"Уведомление отправлено пользователю {user.user_id} (интервал: {user.notification_interval} мин)")
-                except Exception as e:
-                    logger.error(f"Ошибка при отправке уведомления пользователю {user.user_id}: {e}")
+            # Пользователи каждого рабочего пространства получают задачи своего пространства
+            for workspace in get_all_workspaces():
+                with use_workspace(workspace):
+                    await _notify_workspace_users(bot, workspace, last_notification_time, current_time)
             
             # Проверяем каждую минуту
             await asyncio.sleep(60)
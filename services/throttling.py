@@ -0,0 +1,130 @@
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+from callbacks import callback_handler, unpack_callback
+
+# Флаг обработчика: @callback_handler(..., flags={"rate_limit": True}) - одно и то же
+# действие (те же callback_data) не чаще раза в rate_limit секунд на пользователя
+# (число в флаге задает свой интервал)
+RATE_LIMIT_FLAG = "rate_limit"
+
+# Флаг обработчика: повторные нажатия не гасятся (переключатели, где второе нажатие
+# отменяет первое, например отметка пункта чек-листа)
+REPEATABLE_FLAG = "repeatable"
+
+# Сколько записей держать, прежде чем чистить устаревшие
+_CLEANUP_THRESHOLD = 1024
+
+
+def _cleanup(times: Dict[Any, float], now: float, window: float):
+    if len(times) > _CLEANUP_THRESHOLD:
+        for key in [key for key, at in times.items() if now - at >= window]:
+            del times[key]
+
+
+def _is_repeatable(callback_data: str) -> bool:
+    """Есть ли у обработчика действия флаг repeatable (обработчик еще не выбран диспетчером)"""
+    decoded = unpack_callback(callback_data)
+    handler = callback_handler.get(decoded[0]) if decoded is not None else None
+    return handler is not None and bool(handler.flags.get(REPEATABLE_FLAG))
+
+
+class DuplicateCallbackMiddleware(BaseMiddleware):
+    """Outer-middleware апдейтов: гасит повторные нажатия той же кнопки.
+
+    Нажатие с теми же callback_data от того же пользователя, пришедшее, пока
+    первое еще ждет очереди пользователя или обрабатывается, или в течение window
+    секунд после его окончания, не доходит до обработчика - на него сразу отвечаем,
+    чтобы у кнопки пропали "часики". Так двойное нажатие "След.Статус" не переводит
+    проект через статус. Подключается раньше FSM (см. setup_duplicate_callbacks),
+    поэтому ответ не ждет обработки предыдущих апдейтов пользователя.
+    Обработчики с флагом repeatable получают каждое нажатие.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._running: Set[Tuple[int, str]] = set()
+        # (пользователь, callback_data) -> время окончания последней обработки
+        self._finished: Dict[Tuple[int, str], float] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        callback = event.callback_query if isinstance(event, Update) else None
+        if callback is None or not callback.data or _is_repeatable(callback.data):
+            return await handler(event, data)
+
+        key = (callback.from_user.id, callback.data)
+        now = time.monotonic()
+        if key in self._running or now - self._finished.get(key, float("-inf")) < self.window:
+            await callback.answer()
+            return None
+
+        self._running.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._running.discard(key)
+            now = time.monotonic()
+            self._finished[key] = now
+            _cleanup(self._finished, now, self.window)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Inner-middleware: ограничивает частоту вызова обработчиков с флагом rate_limit"""
+
+    def __init__(self, rate_limit: float):
+        self.rate_limit = rate_limit
+        # (пользователь, обработчик) -> время последнего вызова
+        self._calls: Dict[Tuple[int, Any], float] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        flag = get_flag(data, RATE_LIMIT_FLAG)
+        user = data.get("event_from_user")
+        if not flag or user is None:
+            return await handler(event, data)
+
+        interval = self.rate_limit if flag is True else float(flag)
+        # Ключ - нажатая кнопка (действие и его поля, например проект), а не обработчик:
+        # быстрые нажатия по разным проектам не считаются повторами
+        action = event.data if isinstance(event, CallbackQuery) else data["handler"].callback
+        key = (user.id, action)
+        now = time.monotonic()
+        last = self._calls.get(key)
+        if last is not None and now - last < interval:
+            if isinstance(event, CallbackQuery):
+                await event.answer(f"⏳ Не так часто, подождите {math.ceil(interval - (now - last))} с")
+            return None
+
+        self._calls[key] = now
+        _cleanup(self._calls, now, interval)
+        return await handler(event, data)
+
+
+def setup_duplicate_callbacks(dp, window: float):
+    """Подключает подавление повторных нажатий. Вызывать до подключения FSM
+    (dp.fsm) к апдейтам: иначе повтор ждал бы очереди пользователя
+    """
+    if window > 0:
+        dp.update.outer_middleware(DuplicateCallbackMiddleware(window))
+
+
+def setup_throttling(dp, rate_limit: float):
+    """Подключает ограничение частоты тяжелых обработчиков"""
+    if rate_limit > 0:
+        throttling = ThrottlingMiddleware(rate_limit)
+        dp.message.middleware(throttling)
+        dp.callback_query.middleware(throttling)
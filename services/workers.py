@@ -0,0 +1,144 @@
+"""Обработка апдейтов в нескольких процессах.
+
+Ведущий (front) процесс получает апдейты из Telegram и раскладывает их по
+N процессам-обработчикам по ID пользователя (или чата): все апдейты одного
+пользователя попадают в один и тот же процесс, поэтому сохраняются их порядок
+и FSM-состояние (MemoryStorage у каждого обработчика свое). Файлы данных общие,
+одновременную запись из разных процессов разделяют блокировки storage.
+"""
+import asyncio
+import logging
+import multiprocessing
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+# Как долго Telegram держит запрос getUpdates, если новых апдейтов нет (секунды)
+POLLING_TIMEOUT = 30
+
+
+def shard_key(update: Update) -> int:
+    """Ключ распределения апдейта: ID пользователя, а если его нет - ID чата"""
+    event = update.event
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    if chat is None and getattr(event, "message", None) is not None:
+        chat = event.message.chat
+    return chat.id if chat is not None else 0
+
+
+def _worker_main(index: int, queue):
+    """Точка входа процесса-обработчика"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker{index} - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(_worker_loop(index, queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index: int, queue):
+    from config import BOT_TOKEN, METRICS_LOG_INTERVAL, UPDATE_CONCURRENCY
+    from main import create_dispatcher
+    from services.metrics import setup_metrics, log_metrics_periodically
+
+    bot = Bot(token=BOT_TOKEN)
+    dp = create_dispatcher()
+    setup_metrics(dp, bot)
+    metrics_task = None
+    if METRICS_LOG_INTERVAL > 0:
+        metrics_task = asyncio.create_task(log_metrics_periodically(METRICS_LOG_INTERVAL))
+
+    async def handle(update: Update):
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            logger.exception(f"Ошибка обработки апдейта {update.update_id}: {e}")
+
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    logger.info(f"Обработчик {index} запущен")
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, queue.get)
+            if raw is None:
+                break
+            update = Update.model_validate_json(raw)
+            if UPDATE_CONCURRENCY > 1:
+                # Очередность апдейтов одного пользователя обеспечивает UserEventIsolation диспетчера
+                task = asyncio.create_task(handle(update))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                await handle(update)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        if metrics_task is not None:
+            metrics_task.cancel()
+        await bot.session.close()
+        logger.info(f"Обработчик {index} остановлен")
+
+
+class WorkerPool:
+    """Процессы-обработчики и очереди апдейтов к ним"""
+
+    def __init__(self, workers: int):
+        context = multiprocessing.get_context("spawn")
+        self.queues = [context.Queue() for _ in range(workers)]
+        self.processes = [
+            context.Process(target=_worker_main, args=(index, queue), name=f"workbot-worker-{index}", daemon=True)
+            for index, queue in enumerate(self.queues)
+        ]
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def dispatch(self, update: Update):
+        """Отправляет апдейт процессу, который отвечает за его пользователя"""
+        queue = self.queues[shard_key(update) % len(self.queues)]
+        queue.put(update.model_dump_json(exclude_unset=True))
+
+    def stop(self, timeout: float = 10):
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+async def run_front(bot: Bot, workers: int, allowed_updates: Optional[List[str]] = None):
+    """Получает апдейты long polling'ом и раздает их процессам-обработчикам"""
+    pool = WorkerPool(workers)
+    pool.start()
+    logger.info(f"Запущено обработчиков: {workers}")
+
+    offset = None
+    backoff = 1
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=POLLING_TIMEOUT, allowed_updates=allowed_updates
+                )
+                backoff = 1
+            except Exception as e:
+                logger.error(f"Ошибка получения апдейтов: {e}, повтор через {backoff} с")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                pool.dispatch(update)
+    finally:
+        await asyncio.get_running_loop().run_in_executor(None, pool.stop)
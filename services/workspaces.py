@@ -0,0 +1,29 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from storage import get_user_workspace, use_workspace
+
+
+class WorkspaceMiddleware(BaseMiddleware):
+    """Outer-middleware апдейтов: выполняет обработку в рабочем пространстве пользователя"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+        workspace = get_user_workspace(user.id)
+        data["workspace"] = workspace
+        with use_workspace(workspace):
+            return await handler(event, data)
+
+
+def setup_workspaces(dp):
+    """Подключает выбор рабочего пространства к диспетчеру"""
+    dp.update.outer_middleware(WorkspaceMiddleware())
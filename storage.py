@@ -1,14 +1,488 @@
+import asyncio
+import heapq
 import json
+import logging
 import os
-from typing import List, Optional
-from models import ProjectStatus, Project, Character, Developer, User, Checklist, ChecklistItem, ResponsiblePerson, UserRole
+import shutil
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import replace
+from functools import wraps
+from typing import Dict, Iterator, List, Optional
+from config import STORAGE_SLOW_MS, STORAGE_LOCK_TIMEOUT, STORAGE_LOOP_LOCK_TIMEOUT, WORKSPACE_CACHE_SIZE, DATA_DIR, PROJECTS_SHARD_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки между процессами недоступны
+    fcntl = None
+from models import (
+    ProjectStatus, Project, Character, Developer, User, Role, Checklist, ChecklistItem, ResponsiblePerson, UserRole,
+    StatusTransition, ADMIN_ROLE, DEFAULT_USER_ROLE, NO_RESPONSIBLE
+)
+from indexes import StatusIndex, ProjectIndex, StatusHistoryIndex, TrigramIndex, Workflow, RoleIndex
+
+logger = logging.getLogger(__name__)
 
 STATUSES_FILE = "statuses.json"
 PROJECTS_FILE = "projects.json"
+PROJECTS_DIR = "projects"  # файлы-части проектов при PROJECTS_SHARD_SIZE > 0
 CHARACTERS_FILE = "characters.json"
 DEVELOPERS_FILE = "developers.json"
 USERS_FILE = "users.json"
+ROLES_FILE = "roles.json"
 CHECKLISTS_FILE = "checklists.json"
+CHECKLIST_PROGRESS_FILE = "checklist_progress.json"
+STATUS_HISTORY_FILE = "status_history.jsonl"
+WORKFLOW_FILE = "workflow.json"
+
+# Файлы, которые меняются вместе при изменении проектов (сам проект, журнал статусов,
+# статистика разработчиков, отметки чек-листов) - блокируются одним набором
+_PROJECT_FILES = (PROJECTS_FILE, STATUS_HISTORY_FILE, DEVELOPERS_FILE, CHECKLIST_PROGRESS_FILE)
+
+# Рабочие пространства (студии): данные каждого лежат в отдельной папке
+# workspaces/<имя>/ с тем же набором файлов. Пространство по умолчанию - корень данных.
+WORKSPACES_DIR = "workspaces"
+WORKSPACES_FILE = "workspaces.json"
+DEFAULT_WORKSPACE = ""
+
+
+# ========== Чтение и запись файлов, учет операций ==========
+
+# Счетчики чтений/записей файлов в текущем контексте (например, в одном обработчике).
+# Области могут быть вложенными: операция учитывается во всех открытых областях.
+_io_scopes: ContextVar[tuple] = ContextVar("storage_io_scopes", default=())
+
+# Операции дольше этого порога (мс) пишутся в лог со стеком вызова
+slow_operation_ms: float = STORAGE_SLOW_MS
+
+_file_stats = {}
+_caller_stats = Counter()
+
+
+
+class _WorkspaceCache:
+    """Кэши одного рабочего пространства.
+
+    json - разобранное содержимое файлов: путь -> (сигнатура файла, данные).
+    Файл перечитывается, только если изменился на диске (mtime, размер, inode).
+    indexes - индексы, построенные по файлам данных: имя файла -> (сигнатуры файлов, индекс).
+    """
+    __slots__ = ("json", "indexes")
+
+    def __init__(self):
+        self.json = {}
+        self.indexes = {}
+
+
+# Кэши рабочих пространств в порядке последнего использования. Загружаются
+# при первом обращении, самые давно не используемые вытесняются, поэтому память
+# зависит от числа активных пространств, а не от общего их числа.
+_workspace_caches: "OrderedDict[str, _WorkspaceCache]" = OrderedDict()
+workspace_cache_size: int = WORKSPACE_CACHE_SIZE
+
+# Корень данных и размер части проектов (см. DATA_DIR и PROJECTS_SHARD_SIZE в config.py)
+data_dir: str = DATA_DIR
+projects_shard_size: int = PROJECTS_SHARD_SIZE
+
+# Рабочее пространство текущего обработчика (задается middleware по пользователю)
+_current_workspace: ContextVar[str] = ContextVar("storage_workspace", default=DEFAULT_WORKSPACE)
+
+
+def _path(name: str) -> str:
+    """Путь к файлу данных в текущем рабочем пространстве"""
+    workspace = _current_workspace.get()
+    if workspace == DEFAULT_WORKSPACE:
+        return os.path.join(data_dir, name)
+    return os.path.join(data_dir, WORKSPACES_DIR, workspace, name)
+
+
+def _exists(name: str) -> bool:
+    return os.path.exists(_path(name))
+
+
+def _caches() -> _WorkspaceCache:
+    """Кэши текущего рабочего пространства (создаются при первом обращении)"""
+    workspace = _current_workspace.get()
+    cache = _workspace_caches.get(workspace)
+    if cache is None:
+        cache = _workspace_caches[workspace] = _WorkspaceCache()
+        while len(_workspace_caches) > max(workspace_cache_size, 1):
+            evicted, _ = _workspace_caches.popitem(last=False)
+            logger.debug("Кэш рабочего пространства '%s' вытеснен", evicted)
+    else:
+        _workspace_caches.move_to_end(workspace)
+    return cache
+
+
+def _indexes() -> dict:
+    return _caches().indexes
+
+
+def init_data_dir(seed_dir: Optional[str] = None):
+    """Создает папку данных. Если она пустая (например, только что смонтированный том),
+    копирует в нее файлы данных из seed_dir (по умолчанию - папка с кодом бота).
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    seed_dir = seed_dir or os.path.dirname(os.path.abspath(__file__))
+    if os.path.abspath(seed_dir) == os.path.abspath(data_dir) or os.listdir(data_dir):
+        return
+    
+    for name in (STATUSES_FILE, PROJECTS_FILE, CHARACTERS_FILE, DEVELOPERS_FILE, USERS_FILE,
+                 CHECKLISTS_FILE, CHECKLIST_PROGRESS_FILE, STATUS_HISTORY_FILE, WORKFLOW_FILE, ROLES_FILE):
+        source = os.path.join(seed_dir, name)
+        if os.path.exists(source):
+            shutil.copy2(source, os.path.join(data_dir, name))
+            logger.info("Файл %s скопирован в папку данных %s", name, data_dir)
+
+
+@contextmanager
+def use_workspace(workspace: str):
+    """Выполняет блок with в указанном рабочем пространстве"""
+    token = _current_workspace.set(workspace)
+    try:
+        yield
+    finally:
+        _current_workspace.reset(token)
+
+
+def get_current_workspace() -> str:
+    return _current_workspace.get()
+
+
+@contextmanager
+def io_scope():
+    """Считает чтения и записи файлов данных внутри блока with"""
+    counters = {"reads": 0, "writes": 0}
+    token = _io_scopes.set(_io_scopes.get() + (counters,))
+    try:
+        yield counters
+    finally:
+        _io_scopes.reset(token)
+
+
+def _find_caller():
+    """Для текущей операции возвращает (функция load_*/save_*, внешняя функция storage, вызывающий код)"""
+    # 0 - _find_caller, 1 - _account_io, 2 - _read_json/_write_json, 3 - load_*/save_*
+    frame = sys._getframe(3)
+    function = frame.f_code.co_name
+    via = function
+    while frame is not None and frame.f_code.co_filename == __file__:
+        if frame.f_code.co_name != "wrapper":  # обертка _writes
+            via = frame.f_code.co_name
+        frame = frame.f_back
+    if frame is None:
+        return function, via, "?"
+    module = frame.f_globals.get("__name__", "?")
+    return function, via, f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+
+
+def _get_file_stats(path: str) -> dict:
+    name = os.path.basename(path)
+    if os.path.basename(os.path.dirname(path)) == PROJECTS_DIR:
+        name = f"{PROJECTS_DIR}/{name}"
+    return _file_stats.setdefault(name, {
+        "reads": 0, "writes": 0, "bytes_read": 0, "bytes_written": 0,
+        "read_time": 0.0, "write_time": 0.0, "slow": 0, "cache_hits": 0
+    })
+
+
+def _account_io(op: str, path: str, size: int, elapsed: float):
+    """Учитывает операцию чтения/записи: счетчики, байты, время, вызывающий код"""
+    kind = "reads" if op == "read" else "writes"
+    for counters in _io_scopes.get():
+        counters[kind] += 1
+    
+    stats = _get_file_stats(path)
+    stats[kind] += 1
+    stats["bytes_read" if op == "read" else "bytes_written"] += size
+    stats["read_time" if op == "read" else "write_time"] += elapsed
+    
+    function, via, caller = _find_caller()
+    _caller_stats[(op, function, via, caller)] += 1
+    
+    if slow_operation_ms and elapsed * 1000 >= slow_operation_ms:
+        stats["slow"] += 1
+        stack = "".join(traceback.format_list(traceback.extract_stack(limit=10)[:-2]))
+        logger.warning(
+            f"Медленная операция storage: {op} {path} ({size} байт) за {elapsed * 1000:.1f} мс, "
+            f"вызов {function} (через {via}) из {caller}\n{stack}"
+        )
+
+
+def _stat_signature(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _file_signature(name: str):
+    """Сигнатура файла данных для проверки актуальности кэша (None, если файла нет)"""
+    return _stat_signature(_path(name))
+
+
+# ========== Блокировки файлов между процессами ==========
+
+class StorageConflictError(RuntimeError):
+    """Файл данных изменен другим процессом между чтением и записью"""
+
+
+class StorageLockTimeout(TimeoutError):
+    """Блокировку файла данных держит другой процесс дольше допустимого ожидания"""
+
+
+# Блокировки, которые держит текущий поток: путь lock-файла -> [дескриптор, режим, глубина].
+# Повторный захват того же файла (вложенные вызовы storage) только увеличивает глубину.
+# У каждого потока свой словарь (выгрузки выполняются в asyncio.to_thread): иначе поток
+# счел бы своей блокировку, которую держит другой поток, и не стал бы ее ждать.
+_lock_state = threading.local()
+
+lock_timeout: float = STORAGE_LOCK_TIMEOUT
+loop_lock_timeout: float = STORAGE_LOOP_LOCK_TIMEOUT
+
+
+def _lock_wait_limit() -> float:
+    """Сколько ждать блокировку: в потоке цикла событий - не дольше loop_lock_timeout"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return lock_timeout
+    return min(lock_timeout, loop_lock_timeout)
+
+
+def _lock_path(name: str) -> str:
+    return _path(name) + ".lock"
+
+
+def _held_locks() -> Dict[str, list]:
+    held_locks = getattr(_lock_state, "locks", None)
+    if held_locks is None:
+        held_locks = _lock_state.locks = {}
+    return held_locks
+
+
+def _acquire_lock(lock_path: str, exclusive: bool):
+    held = _held_locks().get(lock_path)
+    if held is not None:
+        if exclusive and held[1] != fcntl.LOCK_EX:
+            raise RuntimeError(f"Нельзя повысить блокировку {lock_path} до записи внутри чтения")
+        held[2] += 1
+        return
+    
+    mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    wait_limit = _lock_wait_limit()
+    deadline = time.monotonic() + wait_limit
+    while True:
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+            break
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                raise StorageLockTimeout(f"Не удалось получить блокировку {lock_path} за {wait_limit} с")
+            time.sleep(0.01)
+    _held_locks()[lock_path] = [fd, mode, 1]
+
+
+def _release_lock(lock_path: str):
+    held_locks = _held_locks()
+    held = held_locks[lock_path]
+    held[2] -= 1
+    if held[2] == 0:
+        del held_locks[lock_path]
+        fcntl.flock(held[0], fcntl.LOCK_UN)
+        os.close(held[0])
+
+
+@contextmanager
+def file_lock(*names: str, exclusive: bool = True):
+    """Блокирует файлы данных текущего пространства от других процессов (fcntl.flock).
+
+    exclusive=True - запись (одновременно только один процесс), False - чтение
+    (читающих может быть несколько). Файлы захватываются в одном порядке, чтобы
+    процессы, блокирующие пересекающиеся наборы файлов, не ждали друг друга вечно.
+    Каждый файл блокируется отдельно: операции над разными файлами не мешают друг другу.
+    """
+    if fcntl is None:
+        yield
+        return
+    
+    lock_paths = sorted({_lock_path(name) for name in names})
+    acquired = []
+    try:
+        for lock_path in lock_paths:
+            _acquire_lock(lock_path, exclusive)
+            acquired.append(lock_path)
+        yield
+    finally:
+        for lock_path in reversed(acquired):
+            _release_lock(lock_path)
+
+
+def _writes(*names: str):
+    """Декоратор: функция читает и переписывает указанные файлы под блокировкой на запись,
+    поэтому чтение-изменение-запись не теряет изменений других процессов
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with file_lock(*names):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ========== Файлы данных ==========
+
+def _read_json(name: str):
+    """Читает JSON-файл данных (из кэша, если файл не менялся).
+
+    Возвращаемые данные разделяются между вызовами - их нельзя изменять.
+    """
+    path = _path(name)
+    signature = _stat_signature(path)
+    cached = _caches().json.get(path)
+    if cached is not None and signature is not None and cached[0] == signature:
+        _get_file_stats(path)["cache_hits"] += 1
+        return cached[1]
+    
+    started = time.perf_counter()
+    with file_lock(name, exclusive=False):
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            raw = f.read()
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    data = json.loads(raw)
+    _account_io("read", path, len(raw), time.perf_counter() - started)
+    _caches().json[path] = (signature, data)
+    return data
+
+
+def _write_json(name: str, data):
+    """Записывает JSON-файл данных и обновляет кэш.
+
+    Файл заменяется целиком (запись во временный файл и переименование), поэтому
+    читатели никогда не видят его наполовину записанным, а каждая версия файла
+    получает новую сигнатуру. Если файл изменился после того, как этот процесс
+    его прочитал, записи не происходит (StorageConflictError) - иначе изменения
+    другого процесса были бы молча потеряны.
+    """
+    path = _path(name)
+    cached = _caches().json.get(path)
+    if cached is not None and cached[0] != _stat_signature(path):
+        _caches().json.pop(path, None)
+        raise StorageConflictError(f"Файл {path} изменен другим процессом после чтения")
+    
+    started = time.perf_counter()
+    raw = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(raw)
+        f.flush()
+        st = os.fstat(f.fileno())
+    os.replace(tmp_path, path)
+    _account_io("write", path, len(raw), time.perf_counter() - started)
+    _caches().json[path] = ((st.st_mtime_ns, st.st_size, st.st_ino), data)
+
+
+def _read_json_lines(name: str) -> list:
+    """Читает файл-журнал, где каждая строка - отдельный JSON-объект"""
+    path = _path(name)
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        raw = f.read()
+    records = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    _account_io("read", path, len(raw), time.perf_counter() - started)
+    return records
+
+
+def _append_json_lines(name: str, records: List[dict]):
+    """Дописывает записи в конец файла-журнала, не перечитывая и не переписывая его"""
+    path = _path(name)
+    started = time.perf_counter()
+    raw = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode('utf-8')
+    with open(path, 'ab') as f:
+        f.write(raw)
+    _account_io("write", path, len(raw), time.perf_counter() - started)
+
+
+def get_data_version(*names: str) -> tuple:
+    """Версия данных проектов текущего рабочего пространства: меняется при любом изменении
+    проектов, статусов, персонажей или разработчиков. Подходит как ключ для кэшей,
+    построенных по этим данным. Если переданы имена файлов, версия учитывает только их.
+    """
+    if names:
+        return (_current_workspace.get(),) + tuple(_file_signature(name) for name in names)
+    return (_current_workspace.get(),) + tuple(
+        _file_signature(path)
+        for path in (STATUSES_FILE, CHARACTERS_FILE, DEVELOPERS_FILE)
+    ) + (_projects_signature(),)
+
+
+def invalidate_cache():
+    """Сбрасывает кэш файлов и индексов всех рабочих пространств (например, после ручной правки файлов)"""
+    _workspace_caches.clear()
+
+
+def get_io_stats() -> dict:
+    """Возвращает статистику операций с файлами данных.
+
+    files - счетчики по файлам (чтения, записи, байты, время в секундах, медленные операции),
+    callers - число операций по (операция, функция load_*/save_*, внешняя функция storage,
+    вызывающий код), по убыванию.
+    """
+    return {
+        "files": {name: dict(stats) for name, stats in _file_stats.items()},
+        "callers": [
+            {"op": op, "function": function, "via": via, "caller": caller, "count": count}
+            for (op, function, via, caller), count in _caller_stats.most_common()
+        ],
+    }
+
+
+def reset_io_stats():
+    """Сбрасывает статистику операций с файлами"""
+    _file_stats.clear()
+    _caller_stats.clear()
+
+
+def _get_status_index() -> StatusIndex:
+    """Индекс статусов и схемы переходов, перестраивается только при изменении
+    statuses.json или workflow.json
+    """
+    signature = (_file_signature(STATUSES_FILE), _file_signature(WORKFLOW_FILE))
+    cached = _indexes().get(STATUSES_FILE)
+    if cached is not None and signature[0] is not None and cached[0] == signature:
+        return cached[1]
+    
+    statuses = load_statuses()
+    try:
+        index = StatusIndex(statuses, load_workflow())
+    except ValueError as e:
+        logger.error("Схема переходов в %s некорректна (%s), используется схема по умолчанию", WORKFLOW_FILE, e)
+        index = StatusIndex(statuses)
+    _indexes()[STATUSES_FILE] = ((_file_signature(STATUSES_FILE), _file_signature(WORKFLOW_FILE)), index)
+    return index
+
+
+def _get_project_index() -> ProjectIndex:
+    """Индекс проектов, перестраивается только при изменении проектов или статусов"""
+    status_index = _get_status_index()
+    signature = (_projects_signature(), _indexes()[STATUSES_FILE][0])
+    cached = _indexes().get(PROJECTS_FILE)
+    if cached is not None and cached[0] == signature and cached[1].statuses is status_index:
+        return cached[1]
+    
+    index = ProjectIndex(load_projects(), status_index)
+    _indexes()[PROJECTS_FILE] = ((_projects_signature(), signature[1]), index)
+    return index
 
 
 def get_default_statuses() -> List[ProjectStatus]:
@@ -33,16 +507,15 @@ def get_default_statuses() -> List[ProjectStatus]:
 
 def load_statuses() -> List[ProjectStatus]:
     """Загружает статусы из файла"""
-    if not os.path.exists(STATUSES_FILE):
+    if not _exists(STATUSES_FILE):
         # Создаем файл с дефолтными статусами
         default_statuses = get_default_statuses()
         save_statuses(default_statuses)
         return default_statuses
     
     try:
-        with open(STATUSES_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return [ProjectStatus.from_dict(item) for item in data]
+        data = _read_json(STATUSES_FILE)
+        return [ProjectStatus.from_dict(item) for item in data]
     except (json.JSONDecodeError, KeyError, ValueError):
         # Если файл поврежден, создаем заново
         default_statuses = get_default_statuses()
@@ -52,20 +525,16 @@ def load_statuses() -> List[ProjectStatus]:
 
 def save_statuses(statuses: List[ProjectStatus]):
     """Сохраняет статусы в файл"""
-    with open(STATUSES_FILE, 'w', encoding='utf-8') as f:
-        data = [status.to_dict() for status in statuses]
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    data = [status.to_dict() for status in statuses]
+    _write_json(STATUSES_FILE, data)
 
 
 def get_status_by_id(status_id: int) -> Optional[ProjectStatus]:
     """Получает статус по ID"""
-    statuses = load_statuses()
-    for status in statuses:
-        if status.id == status_id:
-            return status
-    return None
+    return _get_status_index().get(status_id)
 
 
+@_writes(STATUSES_FILE)
 def add_status(name: str, responsible: ResponsiblePerson) -> ProjectStatus:
     """Добавляет новый статус"""
     statuses = load_statuses()
@@ -81,6 +550,7 @@ def add_status(name: str, responsible: ResponsiblePerson) -> ProjectStatus:
     return new_status
 
 
+@_writes(STATUSES_FILE)
 def delete_status(status_id: int) -> bool:
     """Удаляет статус по ID"""
     statuses = load_statuses()
@@ -99,100 +569,247 @@ def get_all_statuses() -> List[ProjectStatus]:
 
 
 def get_first_status() -> Optional[ProjectStatus]:
-    """Возвращает первый статус (самый ранний по ID)"""
-    statuses = load_statuses()
-    if not statuses:
+    """Возвращает статус новых проектов: начальный статус схемы переходов,
+    а если он не задан - самый ранний по ID
+    """
+    status_index = _get_status_index()
+    if status_index.workflow.initial is not None:
+        return status_index.get(status_index.workflow.initial)
+    if not status_index.statuses:
+        return None
+    return status_index.statuses[min(status_index.statuses)]
+
+
+# ========== Схема переходов между статусами ==========
+
+def load_workflow() -> Optional[dict]:
+    """Загружает схему переходов из workflow.json (None, если файла нет)"""
+    if not _exists(WORKFLOW_FILE):
         return None
-    return min(statuses, key=lambda s: s.id)
+    
+    try:
+        return _read_json(WORKFLOW_FILE)
+    except json.JSONDecodeError:
+        logger.error("Файл %s поврежден, используется схема переходов по умолчанию", WORKFLOW_FILE)
+        return None
+
+
+@_writes(WORKFLOW_FILE)
+def save_workflow(data: dict):
+    """Сохраняет схему переходов; некорректная схема не сохраняется (ValueError)"""
+    Workflow({s.id: s for s in load_statuses()}, data)
+    _write_json(WORKFLOW_FILE, data)
+
+
+def get_workflow() -> Workflow:
+    """Текущая схема переходов (из workflow.json или по умолчанию)"""
+    return _get_status_index().workflow
+
+
+def get_next_status_ids(current_status_id: int) -> List[int]:
+    """Статусы, в которые можно перевести проект вперед (первый - по умолчанию)"""
+    return list(get_workflow().next_options(current_status_id))
+
+
+def get_prev_status_ids(current_status_id: int) -> List[int]:
+    """Статусы, из которых проект мог прийти в текущий (куда можно вернуть)"""
+    return list(get_workflow().prev_options(current_status_id))
+
+
+def can_move_status(from_status_id: int, to_status_id: int) -> bool:
+    """Разрешен ли переход между статусами по схеме"""
+    return get_workflow().can_move(from_status_id, to_status_id)
 
 
 # ========== Функции для работы с проектами ==========
 
-def load_projects() -> List[Project]:
-    """Загружает проекты из файла"""
-    if not os.path.exists(PROJECTS_FILE):
+def _is_sharded() -> bool:
+    """Хранятся ли проекты по частям (включено и старый projects.json уже разбит)"""
+    return projects_shard_size > 0 and not _exists(PROJECTS_FILE)
+
+
+def _shard_name(bucket: int) -> str:
+    return os.path.join(PROJECTS_DIR, f"{bucket}.json")
+
+
+def _shard_buckets() -> List[int]:
+    """Номера существующих частей проектов по возрастанию"""
+    try:
+        names = os.listdir(_path(PROJECTS_DIR))
+    except FileNotFoundError:
         return []
+    return sorted(int(name[:-5]) for name in names if name.endswith(".json") and name[:-5].isdigit())
+
+
+def _projects_signature():
+    """Сигнатура данных проектов: файла projects.json или всех частей"""
+    if not _is_sharded():
+        return _file_signature(PROJECTS_FILE)
+    return tuple((bucket, _file_signature(_shard_name(bucket))) for bucket in _shard_buckets())
+
+
+def _read_project_records() -> list:
+    """Записи проектов из projects.json или из частей по порядку"""
+    if not _is_sharded():
+        return _read_json(PROJECTS_FILE) if _exists(PROJECTS_FILE) else []
+    records = []
+    for bucket in _shard_buckets():
+        records.extend(_read_json(_shard_name(bucket)))
+    return records
+
+
+def _write_project_shards(projects: List[Project], buckets=None):
+    """Записывает части проектов (только указанные номера, если buckets задан)"""
+    by_bucket: Dict[int, list] = {}
+    for project in projects:
+        bucket = project.id // projects_shard_size
+        if buckets is None or bucket in buckets:
+            by_bucket.setdefault(bucket, []).append(project.to_dict())
     
+    os.makedirs(_path(PROJECTS_DIR), exist_ok=True)
+    existing = set(_shard_buckets())
+    for bucket in (existing | set(by_bucket)) if buckets is None else buckets:
+        if by_bucket.get(bucket):
+            _write_json(_shard_name(bucket), by_bucket[bucket])
+        elif bucket in existing:
+            os.remove(_path(_shard_name(bucket)))
+
+
+def _is_legacy_project_record(item: dict) -> bool:
+    """Запись проекта старого формата: персонаж и разработчик - строки, а не ID"""
+    return 'character' in item and isinstance(item['character'], str)
+
+
+def load_projects() -> List[Project]:
+    """Загружает проекты из файла (или из частей, если проекты разбиты)"""
     try:
-        with open(PROJECTS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            projects = []
-            needs_migration = False
-            
-            for item in data:
-                # Миграция: конвертируем старый формат в новый
-                if 'character' in item and isinstance(item['character'], str):
-                    # Старый формат: character и developer - строки
-                    # Нужно найти или создать соответствующие ID
-                    character_name = item['character']
-                    developer_name = item['developer']
-                    
-                    # Ищем персонажа по имени
-                    characters = get_all_characters()
-                    character_id = None
-                    for char in characters:
-                        if char.name == character_name:
-                            character_id = char.id
-                            break
-                    
-                    # Если персонаж не найден, создаем его
-                    if character_id is None:
-                        new_char = add_character(character_name)
-                        character_id = new_char.id
-                    
-                    # Ищем разработчика по имени
-                    developers = get_all_developers()
-                    developer_id = None
-                    for dev in developers:
-                        if dev.name == developer_name or dev.username == developer_name:
-                            developer_id = dev.id
-                            break
-                    
-                    # Если разработчик не найден, создаем его
-                    if developer_id is None:
-                        # Используем имя как username, если username не указан
-                        username = developer_name.replace(' ', '_').lower()
-                        try:
-                            new_dev = add_developer(developer_name, username)
-                            developer_id = new_dev.id
-                        except ValueError:
-                            # Если уже существует, ищем снова
-                            developers = get_all_developers()
-                            for dev in developers:
-                                if dev.username == username:
-                                    developer_id = dev.id
-                                    break
-                    
-                    # Обновляем данные на новый формат
-                    item['character_id'] = character_id
-                    item['developer_id'] = developer_id
-                    # Удаляем старые поля
-                    item.pop('character', None)
-                    item.pop('developer', None)
-                    needs_migration = True
-                
-                # Создаем проект из обновленных данных
-                projects.append(Project.from_dict(item))
-            
-            # Сохраняем мигрированные данные
-            if needs_migration:
-                save_projects(projects)
-            
-            return projects
+        data = _read_project_records()
+        if any(_is_legacy_project_record(item) for item in data):
+            # Миграция берет блокировки персонажей и разработчиков вместе с блокировками
+            # проектов в общем порядке - внутри другой операции записи это нарушило бы порядок
+            if _held_locks():
+                raise StorageConflictError("Проекты в старом формате: миграция будет выполнена при следующем чтении")
+            migrate_legacy_projects()
+            data = _read_project_records()
+        
+        return [Project.from_dict(item) for item in data]
     except (json.JSONDecodeError, KeyError, ValueError) as e:
         # Если ошибка при загрузке, возвращаем пустой список
-        print(f"Ошибка при загрузке проектов: {e}")
+        logger.exception("Ошибка при загрузке проектов: %s", e)
         return []
 
 
+@_writes(CHARACTERS_FILE, DEVELOPERS_FILE, *_PROJECT_FILES)
+def migrate_legacy_projects() -> int:
+    """Переводит проекты старого формата на ID персонажей и разработчиков, создавая
+    недостающих. Возвращает количество переведенных проектов.
+    """
+    data = [dict(item) for item in _read_project_records()]
+    migrated = 0
+    
+    for item in data:
+        if not _is_legacy_project_record(item):
+            continue
+        # Старый формат: character и developer - строки
+        # Нужно найти или создать соответствующие ID
+        character_name = item['character']
+        developer_name = item['developer']
+        
+        # Ищем персонажа по имени
+        characters = get_all_characters()
+        character_id = None
+        for char in characters:
+            if char.name == character_name:
+                character_id = char.id
+                break
+        
+        # Если персонаж не найден, создаем его
+        if character_id is None:
+            new_char = add_character(character_name)
+            character_id = new_char.id
+        
+        # Ищем разработчика по имени
+        developers = get_all_developers()
+        developer_id = None
+        for dev in developers:
+            if dev.name == developer_name or dev.username == developer_name:
+                developer_id = dev.id
+                break
+        
+        # Если разработчик не найден, создаем его
+        if developer_id is None:
+            # Используем имя как username, если username не указан
+            username = developer_name.replace(' ', '_').lower()
+            try:
+                new_dev = add_developer(developer_name, username)
+                developer_id = new_dev.id
+            except ValueError:
+                # Если уже существует, ищем снова
+                developers = get_all_developers()
+                for dev in developers:
+                    if dev.username == username:
+                        developer_id = dev.id
+                        break
+        
+        # Обновляем данные на новый формат
+        item['character_id'] = character_id
+        item['developer_id'] = developer_id
+        # Удаляем старые поля
+        item.pop('character', None)
+        item.pop('developer', None)
+        migrated += 1
+    
+    if migrated:
+        save_projects([Project.from_dict(item) for item in data])
+    return migrated
+
+
 def save_projects(projects: List[Project]):
-    """Сохраняет проекты в файл"""
-    with open(PROJECTS_FILE, 'w', encoding='utf-8') as f:
-        data = [project.to_dict() for project in projects]
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Сохраняет проекты в файл (индекс проектов будет перестроен при следующем обращении).
+
+    При PROJECTS_SHARD_SIZE > 0 проекты записываются по частям, а старый
+    projects.json переименовывается в projects.json.migrated.
+    """
+    if projects_shard_size > 0:
+        _write_project_shards(projects)
+        if _exists(PROJECTS_FILE):
+            os.replace(_path(PROJECTS_FILE), _path(PROJECTS_FILE + ".migrated"))
+        return
+    data = [project.to_dict() for project in projects]
+    _write_json(PROJECTS_FILE, data)
+
+
+def _commit_projects(projects: List[Project], changed: List[Project] = (), removed: List[int] = ()):
+    """Сохраняет проекты и точечно обновляет индекс вместо полной перестройки.
+
+    changed - добавленные или измененные проекты, removed - ID удаленных.
+    """
+    index = _get_project_index()
+    if _is_sharded():
+        # Переписываем только части, в которых лежат измененные проекты
+        buckets = {project.id // projects_shard_size for project in changed}
+        buckets |= {project_id // projects_shard_size for project_id in removed}
+        _write_project_shards(projects, buckets)
+    else:
+        save_projects(projects)
+    for project_id in removed:
+        index.remove(project_id)
+    for project in changed:
+        index.replace(project)
+    status_signature = _indexes()[STATUSES_FILE][0]
+    _indexes()[PROJECTS_FILE] = ((_projects_signature(), status_signature), index)
+
+
+def get_project_counts() -> dict:
+    """Счетчики проектов по статусам, персонажам, разработчикам, ответственным и областям.
 
+    Поддерживаются индексом при каждом изменении, поэтому не требуют перебора проектов.
+    """
+    return _get_project_index().counts()
 
-def add_project(name: str, character_id: int, developer_id: int, status_id: int) -> Project:
+
+@_writes(*_PROJECT_FILES)
+def add_project(name: str, character_id: int, developer_id: int, status_id: int, actor_id: Optional[int] = None) -> Project:
     """Добавляет новый проект"""
     projects = load_projects()
     
@@ -208,7 +825,8 @@ def add_project(name: str, character_id: int, developer_id: int, status_id: int)
         status_id=status_id
     )
     projects.append(new_project)
-    save_projects(projects)
+    _commit_projects(projects, changed=[new_project])
+    _log_status_transition(new_id, None, status_id, actor_id)
     
     # Пересчитываем статистику разработчика
     recalculate_developer_stats(developer_id)
@@ -218,14 +836,13 @@ def add_project(name: str, character_id: int, developer_id: int, status_id: int)
 
 def get_project_by_id(project_id: int) -> Optional[Project]:
     """Получает проект по ID"""
-    projects = load_projects()
-    for project in projects:
-        if project.id == project_id:
-            return project
-    return None
+    project = _get_project_index().projects.get(project_id)
+    return replace(project) if project else None
 
 
-def update_project(project_id: int, name: str = None, character_id: int = None, developer_id: int = None, status_id: int = None) -> bool:
+@_writes(*_PROJECT_FILES)
+def update_project(project_id: int, name: str = None, character_id: int = None, developer_id: int = None, status_id: int = None,
+                   actor_id: Optional[int] = None) -> bool:
     """Обновляет данные проекта"""
     projects = load_projects()
     old_developer_id = None
@@ -233,6 +850,7 @@ def update_project(project_id: int, name: str = None, character_id: int = None,
     for project in projects:
         if project.id == project_id:
             old_developer_id = project.developer_id
+            old_status_id = project.status_id
             
             if name is not None:
                 project.name = name
@@ -243,7 +861,9 @@ def update_project(project_id: int, name: str = None, character_id: int = None,
             if status_id is not None:
                 project.status_id = status_id
             
-            save_projects(projects)
+            _commit_projects(projects, changed=[project])
+            if project.status_id != old_status_id:
+                _log_status_transition(project_id, old_status_id, project.status_id, actor_id)
             
             # Обновляем статистику разработчиков, если изменился разработчик
             if developer_id is not None and developer_id != old_developer_id:
@@ -266,80 +886,114 @@ def get_all_projects() -> List[Project]:
 
 def is_archive_status(status_id: int) -> bool:
     """Проверяет, является ли статус архивным (Живой, Бан, Опубликовано, Заблокировано)"""
-    status = get_status_by_id(status_id)
-    if not status:
-        return False
-    
-    status_name_lower = status.name.lower()
-    # Проверяем различные варианты названий архивных статусов
-    archive_keywords = ["живой", "бан", "опубликовано", "заблокировано", "опубликован", "заблокирован"]
-    
-    # Проверяем точное совпадение или наличие ключевых слов
-    if status.name in ["Живой", "Бан"]:
-        return True
+    return _get_status_index().is_archive(status_id)
+
+
+def query_projects(
+    status_id: Optional[int] = None,
+    character_id: Optional[int] = None,
+    developer_id: Optional[int] = None,
+    responsible: Optional[str] = None,
+    scope: str = "active",
+    name_contains: Optional[str] = None,
+    sort: str = "id",
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[Project]:
+    """Выборка проектов по нескольким критериям сразу, через индексы.
+
+    scope - область: active (не в архиве), archive, published, banned или all.
+    sort - id, -id, name, -name или status.
+    Возвращаемые проекты разделяются с индексом - изменять их нельзя,
+    для изменений используйте update_project/update_project_status.
+    """
+    return _get_project_index().query(
+        status_id=status_id,
+        character_id=character_id,
+        developer_id=developer_id,
+        responsible=responsible,
+        scope=scope,
+        name_contains=name_contains,
+        sort=sort,
+        limit=limit,
+        offset=offset
+    )
+
+
+def _get_name_index(path: str, load, text) -> TrigramIndex:
+    """Поисковый индекс по именам персонажей или разработчиков, перестраивается при изменении файла"""
+    signature = _file_signature(path)
+    cached = _indexes().get(path)
+    if cached is not None and signature is not None and cached[0] == signature:
+        return cached[1]
     
-    # Проверяем наличие ключевых слов в названии
-    for keyword in archive_keywords:
-        if keyword in status_name_lower:
-            return True
+    index = TrigramIndex((item.id, text(item)) for item in load())
+    _indexes()[path] = (_file_signature(path), index)
+    return index
+
+
+def search_projects(query: str, limit: int = 20, scope: str = "all") -> List[Project]:
+    """Нечеткий поиск проектов по названию, персонажу и разработчику.
+
+    Регистр, эмодзи, знаки препинания и разница е/ё не учитываются, допускаются опечатки.
+    Совпадение по названию проекта весит больше, чем по персонажу или разработчику;
+    при равной оценке активные проекты идут раньше архивных.
+    Возвращаемые проекты разделяются с индексом - изменять их нельзя.
+    """
+    index = _get_project_index()
+    scores = dict(index.search_index().search(query))
     
-    return False
+    # Совпадение по персонажу/разработчику распространяется на их проекты с меньшим весом
+    related = [
+        (_get_name_index(CHARACTERS_FILE, load_characters, lambda c: c.name), index.by_character),
+        (_get_name_index(DEVELOPERS_FILE, load_developers, lambda d: f"{d.name} {d.username}"), index.by_developer),
+    ]
+    for name_index, buckets in related:
+        for entity_id, score in name_index.search(query).items():
+            for project_id in buckets.get(entity_id, ()):
+                scores[project_id] = max(scores.get(project_id, 0.0), score * 0.8)
+    
+    projects = (
+        index.projects[project_id] for project_id in scores
+        if index.statuses.in_scope(index.projects[project_id].status_id, scope)
+    )
+    return heapq.nsmallest(
+        limit, projects,
+        key=lambda p: (-scores[p.id], index.statuses.is_archive(p.status_id), p.id)
+    )
 
 
 def get_active_projects() -> List[Project]:
     """Возвращает только активные проекты (не в архиве)"""
-    all_projects = load_projects()
-    return [p for p in all_projects if not is_archive_status(p.status_id)]
+    return query_projects(scope="active")
 
 
 def get_archive_projects() -> List[Project]:
     """Возвращает только архивные проекты (Живой или Бан)"""
-    all_projects = load_projects()
-    return [p for p in all_projects if is_archive_status(p.status_id)]
+    return query_projects(scope="archive")
 
 
 def get_published_projects() -> List[Project]:
     """Возвращает опубликованные проекты (статус Живой или Опубликовано)"""
-    all_projects = load_projects()
-    published_statuses = [
-        s.id for s in get_all_statuses() 
-        if s.name == "Живой" or "опубликовано" in s.name.lower() or "опубликован" in s.name.lower()
-    ]
-    return [p for p in all_projects if p.status_id in published_statuses]
+    return query_projects(scope="published")
 
 
 def get_banned_projects() -> List[Project]:
     """Возвращает заблокированные проекты (статус Бан или Заблокировано)"""
-    all_projects = load_projects()
-    banned_statuses = [
-        s.id for s in get_all_statuses() 
-        if s.name == "Бан" or "заблокировано" in s.name.lower() or "заблокирован" in s.name.lower()
-    ]
-    return [p for p in all_projects if p.status_id in banned_statuses]
+    return query_projects(scope="banned")
 
 
 def get_projects_by_role(role: str) -> List[Project]:
-    """Возвращает проекты, назначенные на определенную роль (Игнат или Лёша)"""
-    if role not in ["Игнат", "Лёша"]:
+    """Возвращает проекты, назначенные на определенную роль команды"""
+    if not is_team_role(role):
         return []
     
-    projects = load_projects()
-    statuses = load_statuses()
-    
-    # Создаем словарь статусов для быстрого поиска
-    status_dict = {s.id: s for s in statuses}
-    
-    # Фильтруем проекты по ответственному в статусе (исключаем архивные)
-    filtered_projects = []
-    for project in projects:
-        status = status_dict.get(project.status_id)
-        if status and status.responsible == role and not is_archive_status(project.status_id):
-            filtered_projects.append(project)
-    
-    return filtered_projects
+    # Проекты в статусах, где ответственный - эта роль (исключаем архивные)
+    return query_projects(responsible=role, scope="active")
 
 
-def update_project_status(project_id: int, new_status_id: int) -> bool:
+@_writes(*_PROJECT_FILES)
+def update_project_status(project_id: int, new_status_id: int, actor_id: Optional[int] = None) -> bool:
     """Обновляет статус проекта"""
     projects = load_projects()
     old_status_id = None
@@ -350,12 +1004,15 @@ def update_project_status(project_id: int, new_status_id: int) -> bool:
             old_status_id = project.status_id
             developer_id = project.developer_id
             project.status_id = new_status_id
-            save_projects(projects)
+            _commit_projects(projects, changed=[project])
             break
     
     if old_status_id is None:
         return False
     
+    if old_status_id != new_status_id:
+        _log_status_transition(project_id, old_status_id, new_status_id, actor_id)
+    
     # Обновляем статистику разработчика
     if developer_id:
         recalculate_developer_stats(developer_id)
@@ -363,6 +1020,7 @@ def update_project_status(project_id: int, new_status_id: int) -> bool:
     return True
 
 
+@_writes(*_PROJECT_FILES)
 def delete_project(project_id: int) -> bool:
     """Удаляет проект по ID"""
     projects = load_projects()
@@ -380,7 +1038,8 @@ def delete_project(project_id: int) -> bool:
     
     # Удаляем проект
     projects = [p for p in projects if p.id != project_id]
-    save_projects(projects)
+    _commit_projects(projects, removed=[project_id])
+    _drop_checklist_progress(lambda key: key[0] == project_id)
     
     # Обновляем статистику разработчика
     if developer_id:
@@ -389,72 +1048,160 @@ def delete_project(project_id: int) -> bool:
     return True
 
 
-def get_next_status_id(current_status_id: int) -> Optional[int]:
-    """Возвращает ID следующего статуса"""
-    statuses = get_all_statuses()
-    if not statuses:
-        return None
+# ========== Журнал переходов статусов ==========
+#
+# status_history.jsonl - журнал только на дописывание: одна строка на переход
+# (проект, из статуса, в статус, кто, когда). Индекс журнала с агрегатами
+# строится один раз и дальше обновляется каждой новой записью.
+
+def load_status_history() -> List[StatusTransition]:
+    """Загружает весь журнал переходов"""
+    if not _exists(STATUS_HISTORY_FILE):
+        return []
     
-    # Сортируем статусы по ID
-    sorted_statuses = sorted(statuses, key=lambda s: s.id)
+    try:
+        return [StatusTransition.from_dict(item) for item in _read_json_lines(STATUS_HISTORY_FILE)]
+    except Exception as e:
+        logger.error("Ошибка загрузки истории статусов: %s", e)
+        return []
+
+
+def save_status_transitions(transitions: List[StatusTransition]):
+    """Дописывает переходы в журнал одной записью"""
+    _append_json_lines(STATUS_HISTORY_FILE, [transition.to_dict() for transition in transitions])
+
+
+def _get_history_index() -> StatusHistoryIndex:
+    """Индекс журнала переходов, перестраивается только при изменении журнала извне или статусов"""
+    status_index = _get_status_index()
+    signature = (_file_signature(STATUS_HISTORY_FILE), _indexes()[STATUSES_FILE][0])
+    cached = _indexes().get(STATUS_HISTORY_FILE)
+    if cached is not None and cached[0] == signature and cached[1].statuses is status_index:
+        return cached[1]
     
-    # Находим текущий статус
-    for i, status in enumerate(sorted_statuses):
-        if status.id == current_status_id:
-            # Возвращаем следующий статус, если он есть
-            if i + 1 < len(sorted_statuses):
-                return sorted_statuses[i + 1].id
-            # Если это последний, возвращаем первый (циклично)
-            return sorted_statuses[0].id
+    index = StatusHistoryIndex(load_status_history(), status_index)
+    _indexes()[STATUS_HISTORY_FILE] = ((_file_signature(STATUS_HISTORY_FILE), signature[1]), index)
+    return index
+
+
+def _log_status_transition(project_id: int, from_status_id: Optional[int], to_status_id: int, actor_id: Optional[int]):
+    """Записывает переход в журнал и добавляет его в индекс"""
+    _log_status_transitions([(project_id, from_status_id, to_status_id)], actor_id)
+
+
+def _log_status_transitions(changes: List[tuple], actor_id: Optional[int]):
+    """Записывает несколько переходов (project_id, из статуса, в статус) одной дозаписью журнала"""
+    if not changes:
+        return
     
-    # Если текущий статус не найден, возвращаем первый
-    return sorted_statuses[0].id
+    timestamp = time.time()
+    transitions = [
+        StatusTransition(
+            project_id=project_id,
+            from_status_id=from_status_id,
+            to_status_id=to_status_id,
+            actor_id=actor_id,
+            timestamp=timestamp
+        )
+        for project_id, from_status_id, to_status_id in changes
+    ]
+    index = _get_history_index()
+    save_status_transitions(transitions)
+    for transition in transitions:
+        index.add(transition)
+    status_signature = _indexes()[STATUSES_FILE][0]
+    _indexes()[STATUS_HISTORY_FILE] = ((_file_signature(STATUS_HISTORY_FILE), status_signature), index)
 
 
-def get_prev_status_id(current_status_id: int) -> Optional[int]:
-    """Возвращает ID предыдущего статуса"""
-    statuses = get_all_statuses()
-    if not statuses:
-        return None
+def iter_status_history() -> Iterator[StatusTransition]:
+    """Построчно читает журнал переходов с диска (для выгрузок, без загрузки в память)"""
+    if not _exists(STATUS_HISTORY_FILE):
+        return
     
-    # Сортируем статусы по ID
-    sorted_statuses = sorted(statuses, key=lambda s: s.id)
+    started = time.perf_counter()
+    size = 0
+    with open(_path(STATUS_HISTORY_FILE), 'rb') as f:
+        for line in f:
+            size += len(line)
+            if line.strip():
+                yield StatusTransition.from_dict(json.loads(line))
+    _account_io("read", _path(STATUS_HISTORY_FILE), size, time.perf_counter() - started)
+
+
+def get_project_status_times() -> dict:
+    """Время создания проектов и входа в текущий статус по журналу (Unix-время).
+
+    created - project_id -> время первой записи, status_since - project_id -> время
+    последнего перехода. Словари разделяются с индексом - изменять их нельзя.
+    """
+    history = _get_history_index()
+    return {"created": history.started_at, "status_since": history.entered_at}
+
+
+def get_project_history(project_id: int) -> List[StatusTransition]:
+    """История переходов проекта в порядке записи"""
+    return _get_history_index().project_history(project_id)
+
+
+def get_status_history_report(weeks: int = 8) -> dict:
+    """Сводка по журналу переходов.
+
+    avg_time_in_status - статус -> (среднее время в секундах, число пребываний),
+    weekly_throughput - [(понедельник недели, сколько проектов ушло в архив)],
+    developer_cycle_time - разработчик -> (среднее время цикла в секундах, число проектов).
+    """
+    history = _get_history_index()
+    projects = _get_project_index().projects
     
-    # Находим текущий статус
-    for i, status in enumerate(sorted_statuses):
-        if status.id == current_status_id:
-            # Возвращаем предыдущий статус, если он есть
-            if i > 0:
-                return sorted_statuses[i - 1].id
-            # Если это первый, возвращаем последний (циклично)
-            return sorted_statuses[-1].id
+    cycle_by_developer = {}
+    for project_id, seconds in history.cycle_seconds.items():
+        project = projects.get(project_id)
+        if project is not None:
+            cycle_by_developer.setdefault(project.developer_id, []).append(seconds)
     
-    # Если текущий статус не найден, возвращаем первый
-    return sorted_statuses[0].id
+    return {
+        "avg_time_in_status": history.average_time_in_status(),
+        "weekly_throughput": history.weekly_throughput(weeks),
+        "developer_cycle_time": {
+            developer_id: (sum(values) / len(values), len(values))
+            for developer_id, values in cycle_by_developer.items()
+        },
+    }
+
+
+def get_next_status_id(current_status_id: int) -> Optional[int]:
+    """Возвращает ID следующего статуса по схеме переходов (None для конечных статусов)"""
+    options = get_workflow().next_options(current_status_id)
+    return options[0] if options else None
+
+
+def get_prev_status_id(current_status_id: int) -> Optional[int]:
+    """Возвращает ID предыдущего статуса по схеме переходов (None для начальных статусов)"""
+    options = get_workflow().prev_options(current_status_id)
+    return options[0] if options else None
 
 
 # ========== Функции для работы с персонажами ==========
 
 def load_characters() -> List[Character]:
     """Загружает персонажей из файла"""
-    if not os.path.exists(CHARACTERS_FILE):
+    if not _exists(CHARACTERS_FILE):
         return []
     
     try:
-        with open(CHARACTERS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return [Character.from_dict(item) for item in data]
+        data = _read_json(CHARACTERS_FILE)
+        return [Character.from_dict(item) for item in data]
     except (json.JSONDecodeError, KeyError, ValueError):
         return []
 
 
 def save_characters(characters: List[Character]):
     """Сохраняет персонажей в файл"""
-    with open(CHARACTERS_FILE, 'w', encoding='utf-8') as f:
-        data = [character.to_dict() for character in characters]
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    data = [character.to_dict() for character in characters]
+    _write_json(CHARACTERS_FILE, data)
 
 
+@_writes(CHARACTERS_FILE)
 def add_character(name: str) -> Character:
     """Добавляет нового персонажа"""
     characters = load_characters()
@@ -470,16 +1217,36 @@ def add_character(name: str) -> Character:
     return new_character
 
 
-def delete_character(character_id: int) -> bool:
-    """Удаляет персонажа по ID"""
+def get_character_project_ids(character_id: int) -> List[int]:
+    """ID проектов (включая архивные), где используется персонаж"""
+    return sorted(_get_project_index().by_character.get(character_id, ()))
+
+
+@_writes(*_PROJECT_FILES, CHARACTERS_FILE)
+def delete_character(character_id: int, reassign_to: Optional[int] = None, cascade: bool = False) -> bool:
+    """Удаляет персонажа по ID.
+
+    Если персонаж используется в проектах, нужно либо передать их другому
+    персонажу (reassign_to), либо удалить вместе с ним (cascade),
+    иначе выбрасывается ValueError.
+    """
     characters = load_characters()
-    original_count = len(characters)
-    characters = [c for c in characters if c.id != character_id]
+    if not any(c.id == character_id for c in characters):
+        return False
     
-    if len(characters) < original_count:
-        save_characters(characters)
-        return True
-    return False
+    project_ids = get_character_project_ids(character_id)
+    if project_ids:
+        if reassign_to is not None:
+            if reassign_to == character_id or not any(c.id == reassign_to for c in characters):
+                raise ValueError("Персонаж для передачи проектов не найден")
+            batch_update_projects(project_ids, character_id=reassign_to)
+        elif cascade:
+            batch_delete_projects(project_ids)
+        else:
+            raise ValueError(f"Персонаж используется в проектах: {len(project_ids)}")
+    
+    save_characters([c for c in characters if c.id != character_id])
+    return True
 
 
 def get_character_by_id(character_id: int) -> Optional[Character]:
@@ -500,24 +1267,23 @@ def get_all_characters() -> List[Character]:
 
 def load_developers() -> List[Developer]:
     """Загружает разработчиков из файла"""
-    if not os.path.exists(DEVELOPERS_FILE):
+    if not _exists(DEVELOPERS_FILE):
         return []
     
     try:
-        with open(DEVELOPERS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return [Developer.from_dict(item) for item in data]
+        data = _read_json(DEVELOPERS_FILE)
+        return [Developer.from_dict(item) for item in data]
     except (json.JSONDecodeError, KeyError, ValueError):
         return []
 
 
 def save_developers(developers: List[Developer]):
     """Сохраняет разработчиков в файл"""
-    with open(DEVELOPERS_FILE, 'w', encoding='utf-8') as f:
-        data = [developer.to_dict() for developer in developers]
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    data = [developer.to_dict() for developer in developers]
+    _write_json(DEVELOPERS_FILE, data)
 
 
+@_writes(DEVELOPERS_FILE)
 def add_developer(name: str, username: str) -> Developer:
     """Добавляет нового разработчика"""
     developers = load_developers()
@@ -545,16 +1311,36 @@ def add_developer(name: str, username: str) -> Developer:
     return new_developer
 
 
-def delete_developer(developer_id: int) -> bool:
-    """Удаляет разработчика по ID"""
+def get_developer_project_ids(developer_id: int) -> List[int]:
+    """ID проектов (включая архивные), назначенных на разработчика"""
+    return sorted(_get_project_index().by_developer.get(developer_id, ()))
+
+
+@_writes(*_PROJECT_FILES)
+def delete_developer(developer_id: int, reassign_to: Optional[int] = None, cascade: bool = False) -> bool:
+    """Удаляет разработчика по ID.
+
+    Если на разработчика назначены проекты, нужно либо передать их другому
+    разработчику (reassign_to), либо удалить вместе с ним (cascade),
+    иначе выбрасывается ValueError.
+    """
     developers = load_developers()
-    original_count = len(developers)
-    developers = [d for d in developers if d.id != developer_id]
+    if not any(d.id == developer_id for d in developers):
+        return False
     
-    if len(developers) < original_count:
-        save_developers(developers)
-        return True
-    return False
+    project_ids = get_developer_project_ids(developer_id)
+    if project_ids:
+        if reassign_to is not None:
+            if reassign_to == developer_id or not any(d.id == reassign_to for d in developers):
+                raise ValueError("Разработчик для передачи проектов не найден")
+            batch_update_projects(project_ids, developer_id=reassign_to)
+        elif cascade:
+            batch_delete_projects(project_ids)
+        else:
+            raise ValueError(f"Разработчик используется в проектах: {len(project_ids)}")
+    
+    save_developers([d for d in load_developers() if d.id != developer_id])
+    return True
 
 
 def get_developer_by_id(developer_id: int) -> Optional[Developer]:
@@ -566,6 +1352,7 @@ def get_developer_by_id(developer_id: int) -> Optional[Developer]:
     return None
 
 
+@_writes(DEVELOPERS_FILE)
 def update_developer(developer: Developer):
     """Обновляет данные разработчика"""
     developers = load_developers()
@@ -579,14 +1366,15 @@ def update_developer(developer: Developer):
     save_developers(developers)
 
 
+@_writes(DEVELOPERS_FILE)
 def recalculate_developer_stats(developer_id: int):
     """Пересчитывает статистику разработчика на основе текущих проектов"""
     developer = get_developer_by_id(developer_id)
     if not developer:
         return
     
-    projects = load_projects()
-    developer_projects = [p for p in projects if p.developer_id == developer_id]
+    index = _get_project_index()
+    developer_projects = index.query(developer_id=developer_id, scope="all")
     
     # Подсчитываем статистику
     total_projects = len(developer_projects)
@@ -594,13 +1382,10 @@ def recalculate_developer_stats(developer_id: int):
     banned_count = 0
     
     for project in developer_projects:
-        status = get_status_by_id(project.status_id)
-        if status:
-            status_name_lower = status.name.lower()
-            if status.name == "Живой" or "опубликовано" in status_name_lower or "опубликован" in status_name_lower:
-                published_count += 1
-            elif status.name == "Бан" or "заблокировано" in status_name_lower or "заблокирован" in status_name_lower:
-                banned_count += 1
+        if project.status_id in index.statuses.published:
+            published_count += 1
+        elif project.status_id in index.statuses.banned:
+            banned_count += 1
     
     # Обновляем статистику
     developer.total_projects = total_projects
@@ -610,11 +1395,42 @@ def recalculate_developer_stats(developer_id: int):
     update_developer(developer)
 
 
+def _recalculate_developers_stats(developer_ids):
+    """Пересчитывает статистику нескольких разработчиков с одной записью файла"""
+    developers = load_developers()
+    if _apply_developers_stats(developers, developer_ids):
+        save_developers(developers)
+
+
+def _apply_developers_stats(developers: List[Developer], developer_ids) -> bool:
+    """Обновляет статистику разработчиков в списке по индексу проектов (без записи).
+
+    Возвращает True, если что-то изменилось.
+    """
+    developer_ids = set(developer_ids)
+    index = _get_project_index()
+    changed = False
+    
+    for developer in developers:
+        if developer.id not in developer_ids:
+            continue
+        developer_projects = index.query(developer_id=developer.id, scope="all")
+        stats = (
+            len(developer_projects),
+            sum(1 for p in developer_projects if p.status_id in index.statuses.published),
+            sum(1 for p in developer_projects if p.status_id in index.statuses.banned)
+        )
+        if stats != (developer.total_projects, developer.released_projects, developer.banned_projects):
+            developer.total_projects, developer.released_projects, developer.banned_projects = stats
+            changed = True
+    
+    return changed
+
+
+@_writes(DEVELOPERS_FILE)
 def recalculate_all_developers_stats():
     """Пересчитывает статистику всех разработчиков"""
-    developers = get_all_developers()
-    for developer in developers:
-        recalculate_developer_stats(developer.id)
+    _recalculate_developers_stats(d.id for d in get_all_developers())
 
 
 def get_all_developers() -> List[Developer]:
@@ -622,37 +1438,243 @@ def get_all_developers() -> List[Developer]:
     return load_developers()
 
 
+# ========== Рабочие пространства ==========
+
+def load_workspaces() -> Dict[str, List[int]]:
+    """Загружает состав рабочих пространств: имя -> ID пользователей.
+
+    Файл лежит в корне данных; пользователи, которых нет ни в одном
+    пространстве, работают в пространстве по умолчанию.
+    """
+    with use_workspace(DEFAULT_WORKSPACE):
+        if not _exists(WORKSPACES_FILE):
+            return {}
+        try:
+            return {name: list(members) for name, members in _read_json(WORKSPACES_FILE).items()}
+        except (json.JSONDecodeError, AttributeError):
+            logger.error("Файл %s поврежден, используется только пространство по умолчанию", WORKSPACES_FILE)
+            return {}
+
+
+def save_workspaces(workspaces: Dict[str, List[int]]):
+    """Сохраняет состав рабочих пространств"""
+    with use_workspace(DEFAULT_WORKSPACE):
+        _write_json(WORKSPACES_FILE, workspaces)
+
+
+def _get_workspace_members() -> Dict[int, str]:
+    """Индекс пользователь -> рабочее пространство, перестраивается при изменении workspaces.json"""
+    with use_workspace(DEFAULT_WORKSPACE):
+        signature = _file_signature(WORKSPACES_FILE)
+        cached = _indexes().get(WORKSPACES_FILE)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        
+        members = {
+            user_id: name
+            for name, user_ids in load_workspaces().items()
+            for user_id in user_ids
+        }
+        _indexes()[WORKSPACES_FILE] = (signature, members)
+        return members
+
+
+def get_user_workspace(user_id: int) -> str:
+    """Рабочее пространство пользователя (пространство по умолчанию, если он никуда не добавлен)"""
+    return _get_workspace_members().get(user_id, DEFAULT_WORKSPACE)
+
+
+def get_all_workspaces() -> List[str]:
+    """Все рабочие пространства, начиная с пространства по умолчанию"""
+    return [DEFAULT_WORKSPACE] + sorted(load_workspaces())
+
+
+def _validate_workspace_name(name: str):
+    if not name or not all(c.isalnum() or c in "-_" for c in name) or name.startswith("-"):
+        raise ValueError("Имя пространства может содержать только буквы, цифры, '-' и '_'")
+
+
+def add_workspace_member(workspace: str, user_id: int):
+    """Переносит пользователя в рабочее пространство (создает его, если нужно).
+
+    Для пространства по умолчанию (пустое имя) пользователь просто убирается из остальных.
+    """
+    if workspace != DEFAULT_WORKSPACE:
+        _validate_workspace_name(workspace)
+        os.makedirs(os.path.join(data_dir, WORKSPACES_DIR, workspace), exist_ok=True)
+    
+    with use_workspace(DEFAULT_WORKSPACE), file_lock(WORKSPACES_FILE):
+        workspaces = load_workspaces()
+        for members in workspaces.values():
+            if user_id in members:
+                members.remove(user_id)
+        if workspace != DEFAULT_WORKSPACE:
+            workspaces.setdefault(workspace, []).append(user_id)
+        save_workspaces(workspaces)
+
+
+# ========== Роли команды ==========
+
+def get_default_roles() -> List[Role]:
+    """Возвращает роли по умолчанию"""
+    return [
+        Role(name="Игнат"),
+        Role(name="Лёша", can_manage=True),
+    ]
+
+
+def load_roles() -> List[Role]:
+    """Загружает роли из файла.
+
+    Если файла нет, он создается из ролей по умолчанию и ролей, которые уже
+    встречаются у статусов и пользователей.
+    """
+    if _exists(ROLES_FILE):
+        try:
+            data = _read_json(ROLES_FILE)
+            return [Role.from_dict(item) for item in data]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            logger.error("Файл %s поврежден, роли будут созданы заново", ROLES_FILE)
+    
+    roles = get_default_roles()
+    known = {role.name for role in roles} | {ADMIN_ROLE, DEFAULT_USER_ROLE, NO_RESPONSIBLE}
+    used = [s.responsible for s in load_statuses()] + [u.role for u in load_users()]
+    for name in used:
+        if name not in known:
+            roles.append(Role(name=name))
+            known.add(name)
+    save_roles(roles)
+    return roles
+
+
+def save_roles(roles: List[Role]):
+    """Сохраняет роли в файл"""
+    data = [role.to_dict() for role in roles]
+    _write_json(ROLES_FILE, data)
+
+
+def _get_role_index() -> RoleIndex:
+    """Индекс ролей и пользователей, перестраивается только при изменении roles.json или users.json"""
+    if not _exists(ROLES_FILE):
+        load_roles()
+    signature = (_file_signature(ROLES_FILE), _file_signature(USERS_FILE))
+    cached = _indexes().get(ROLES_FILE)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    index = RoleIndex(load_roles(), load_users())
+    _indexes()[ROLES_FILE] = ((_file_signature(ROLES_FILE), _file_signature(USERS_FILE)), index)
+    return index
+
+
+def get_all_roles() -> List[Role]:
+    """Возвращает все роли команды"""
+    return list(_get_role_index().roles.values())
+
+
+def is_team_role(role: Optional[str]) -> bool:
+    """Является ли роль ролью команды (на нее можно назначать статусы и задачи)"""
+    return _get_role_index().is_team_role(role)
+
+
+def role_can_manage(role: Optional[str]) -> bool:
+    """Есть ли у роли доступ к управлению статусами и персонажами"""
+    return _get_role_index().can_manage(role)
+
+
+def has_manage_access(user_id: int) -> bool:
+    """Может ли пользователь управлять статусами и персонажами (роль с доступом или админ)"""
+    user = get_user_by_id(user_id)
+    return is_admin(user_id) or (user is not None and role_can_manage(user.role))
+
+
+def get_role_users(role: str) -> List[User]:
+    """Пользователи с указанной ролью"""
+    return [replace(user) for user in _get_role_index().role_users(role)]
+
+
+def get_role_status_ids(role: str) -> List[int]:
+    """Статусы, за которые отвечает роль"""
+    return sorted(_get_status_index().by_responsible.get(role, ()))
+
+
+# Название роли попадает в callback_data кнопок ("1uR:<ID пользователя>:<роль>"),
+# а Telegram ограничивает ее 64 байтами: 16 байт оставляем на код и ID
+MAX_ROLE_NAME_BYTES = 48
+
+
+@_writes(ROLES_FILE)
+def add_role(name: str, can_manage: bool = False) -> Role:
+    """Добавляет роль команды (ValueError, если имя занято, зарезервировано или слишком длинное)"""
+    name = name.strip()
+    if not name or "_" in name:
+        raise ValueError("Название роли не может быть пустым или содержать '_'")
+    if len(name.encode("utf-8")) > MAX_ROLE_NAME_BYTES:
+        raise ValueError(
+            f"Название роли слишком длинное: не больше {MAX_ROLE_NAME_BYTES} байт "
+            f"(около {MAX_ROLE_NAME_BYTES // 2} букв кириллицей)"
+        )
+    if name in (ADMIN_ROLE, DEFAULT_USER_ROLE, NO_RESPONSIBLE) or is_team_role(name):
+        raise ValueError(f"Роль '{name}' уже существует")
+    
+    roles = load_roles()
+    role = Role(name=name, can_manage=can_manage)
+    roles.append(role)
+    save_roles(roles)
+    return role
+
+
+@_writes(ROLES_FILE, USERS_FILE)
+def delete_role(name: str) -> bool:
+    """Удаляет роль команды. Пользователи с этой ролью становятся обычными пользователями.
+
+    Если за роль назначены статусы, роль не удаляется (ValueError).
+    """
+    if not is_team_role(name):
+        return False
+    status_ids = get_role_status_ids(name)
+    if status_ids:
+        raise ValueError(f"Роль '{name}' отвечает за статусы: {', '.join(map(str, status_ids))}")
+    
+    save_roles([role for role in load_roles() if role.name != name])
+    
+    role_users = {user.user_id for user in get_role_users(name)}
+    if role_users:
+        users = load_users()
+        for user in users:
+            if user.user_id in role_users:
+                user.role = DEFAULT_USER_ROLE
+        save_users(users)
+    return True
+
+
 # ========== Функции для работы с пользователями ==========
 
 def load_users() -> List[User]:
     """Загружает пользователей из файла"""
-    if not os.path.exists(USERS_FILE):
+    if not _exists(USERS_FILE):
         return []
     
     try:
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return [User.from_dict(item) for item in data]
+        data = _read_json(USERS_FILE)
+        return [User.from_dict(item) for item in data]
     except (json.JSONDecodeError, KeyError, ValueError):
         return []
 
 
 def save_users(users: List[User]):
     """Сохраняет пользователей в файл"""
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        data = [user.to_dict() for user in users]
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    data = [user.to_dict() for user in users]
+    _write_json(USERS_FILE, data)
 
 
 def get_user_by_id(user_id: int) -> Optional[User]:
     """Получает пользователя по ID"""
-    users = load_users()
-    for user in users:
-        if user.user_id == user_id:
-            return user
-    return None
+    user = _get_role_index().users.get(user_id)
+    return replace(user) if user else None
 
 
+@_writes(USERS_FILE)
 def get_or_create_user(user_id: int, username: Optional[str] = None, first_name: Optional[str] = None) -> User:
     """Получает пользователя или создает нового"""
     user = get_user_by_id(user_id)
@@ -671,13 +1693,14 @@ def get_or_create_user(user_id: int, username: Optional[str] = None, first_name:
         user_id=user_id,
         username=username,
         first_name=first_name,
-        role="user"
+        role=DEFAULT_USER_ROLE
     )
     users.append(new_user)
     save_users(users)
     return new_user
 
 
+@_writes(USERS_FILE)
 def update_user(user: User):
     """Обновляет данные пользователя"""
     users = load_users()
@@ -691,8 +1714,11 @@ def update_user(user: User):
     save_users(users)
 
 
+@_writes(USERS_FILE)
 def set_user_role(user_id: int, role: UserRole) -> bool:
-    """Устанавливает роль пользователю"""
+    """Устанавливает роль пользователю (admin, user или роль команды)"""
+    if role not in (ADMIN_ROLE, DEFAULT_USER_ROLE) and not is_team_role(role):
+        return False
     user = get_user_by_id(user_id)
     if not user:
         return False
@@ -713,9 +1739,10 @@ def is_admin(user_id: int) -> bool:
     if user_id == ADMIN_ID:
         return True
     user = get_user_by_id(user_id)
-    return user is not None and user.role == "admin"
+    return user is not None and user.role == ADMIN_ROLE
 
 
+@_writes(USERS_FILE)
 def update_user_notifications(user_id: int, enabled: bool = None, interval: int = None) -> bool:
     """Обновляет настройки уведомлений пользователя"""
     user = get_user_by_id(user_id)
@@ -732,15 +1759,14 @@ def update_user_notifications(user_id: int, enabled: bool = None, interval: int
 
 
 def get_users_with_tasks() -> List[User]:
-    """Возвращает пользователей с ролями Игнат или Лёша, у которых есть задачи"""
-    users = get_all_users()
+    """Возвращает пользователей с ролями команды, у которых есть задачи"""
+    role_index = _get_role_index()
     users_with_tasks = []
+    tasks_by_role = get_project_counts()["by_responsible"]
     
-    for user in users:
-        if user.role in ["Игнат", "Лёша"]:
-            projects = get_projects_by_role(user.role)
-            if projects:
-                users_with_tasks.append(user)
+    for role in tasks_by_role:
+        if role_index.is_team_role(role):
+            users_with_tasks.extend(replace(user) for user in role_index.role_users(role))
     
     return users_with_tasks
 
@@ -749,22 +1775,20 @@ def get_users_with_tasks() -> List[User]:
 
 def load_checklists() -> List[Checklist]:
     """Загружает чек-листы из файла"""
-    if not os.path.exists(CHECKLISTS_FILE):
+    if not _exists(CHECKLISTS_FILE):
         return []
     
     try:
-        with open(CHECKLISTS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return [Checklist.from_dict(item) for item in data]
+        data = _read_json(CHECKLISTS_FILE)
+        return [Checklist.from_dict(item) for item in data]
     except (json.JSONDecodeError, KeyError, ValueError):
         return []
 
 
 def save_checklists(checklists: List[Checklist]):
     """Сохраняет чек-листы в файл"""
-    with open(CHECKLISTS_FILE, 'w', encoding='utf-8') as f:
-        data = [checklist.to_dict() for checklist in checklists]
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    data = [checklist.to_dict() for checklist in checklists]
+    _write_json(CHECKLISTS_FILE, data)
 
 
 def get_checklist_by_status_id(status_id: int) -> Optional[Checklist]:
@@ -776,6 +1800,7 @@ def get_checklist_by_status_id(status_id: int) -> Optional[Checklist]:
     return None
 
 
+@_writes(CHECKLISTS_FILE)
 def create_checklist(status_id: int) -> Checklist:
     """Создает новый чек-лист для статуса"""
     checklists = load_checklists()
@@ -791,6 +1816,7 @@ def create_checklist(status_id: int) -> Checklist:
     return new_checklist
 
 
+@_writes(CHECKLISTS_FILE)
 def add_checklist_item(status_id: int, item_text: str) -> ChecklistItem:
     """Добавляет пункт в чек-лист статуса"""
     checklist = get_checklist_by_status_id(status_id)
@@ -816,6 +1842,7 @@ def add_checklist_item(status_id: int, item_text: str) -> ChecklistItem:
     return new_item
 
 
+@_writes(CHECKLISTS_FILE, CHECKLIST_PROGRESS_FILE)
 def delete_checklist_item(status_id: int, item_id: int) -> bool:
     """Удаляет пункт из чек-листа"""
     checklist = get_checklist_by_status_id(status_id)
@@ -832,48 +1859,357 @@ def delete_checklist_item(status_id: int, item_id: int) -> bool:
                 checklists[i] = checklist
                 break
         save_checklists(checklists)
+        # ID пункта может быть выдан заново - старые отметки не должны к нему относиться
+        _clear_checklist_progress_bit(status_id, item_id)
         return True
     return False
 
 
-def toggle_checklist_item(status_id: int, item_id: int) -> bool:
-    """Переключает состояние пункта чек-листа"""
-    checklist = get_checklist_by_status_id(status_id)
-    if not checklist:
-        return False
+# ========== Прогресс чек-листов по проектам ==========
+#
+# Шаблоны чек-листов (checklists.json) общие для статуса и меняются только админом.
+# Отметки хранятся отдельно для каждой пары (проект, статус) в checklist_progress.json
+# как битовая маска: бит N установлен, если отмечен пункт с ID N.
+
+def _progress_key(project_id: int, status_id: int) -> str:
+    return f"{project_id}:{status_id}"
+
+
+def _parse_progress_key(key: str) -> tuple:
+    project_id, status_id = key.split(":")
+    return int(project_id), int(status_id)
+
+
+def load_checklist_progress() -> Dict[str, int]:
+    """Загружает отметки чек-листов: "project_id:status_id" -> битовая маска пунктов"""
+    if not _exists(CHECKLIST_PROGRESS_FILE):
+        return {}
     
-    for item in checklist.items:
-        if item.id == item_id:
-            item.checked = not item.checked
-            
-            checklists = load_checklists()
-            for i, c in enumerate(checklists):
-                if c.status_id == status_id:
-                    checklists[i] = checklist
-                    break
-            save_checklists(checklists)
-            return True
-    return False
+    try:
+        return _read_json(CHECKLIST_PROGRESS_FILE)
+    except Exception as e:
+        logger.error("Ошибка загрузки прогресса чек-листов: %s", e)
+        return {}
+
+
+def save_checklist_progress(progress: Dict[str, int]):
+    """Сохраняет отметки чек-листов (пустые маски не храним)"""
+    _write_json(CHECKLIST_PROGRESS_FILE, {key: mask for key, mask in progress.items() if mask})
+
 
+def get_checklist_progress(project_id: int, status_id: int) -> int:
+    """Битовая маска отмеченных пунктов чек-листа проекта в статусе"""
+    return load_checklist_progress().get(_progress_key(project_id, status_id), 0)
 
-def reset_checklist(status_id: int):
-    """Сбрасывает все галочки в чек-листе"""
+
+def get_project_checklist(project_id: int, status_id: int) -> Optional[Checklist]:
+    """Чек-лист статуса с отметками конкретного проекта"""
     checklist = get_checklist_by_status_id(status_id)
     if not checklist:
-        return
+        return None
     
+    mask = get_checklist_progress(project_id, status_id)
     for item in checklist.items:
-        item.checked = False
+        item.checked = bool(mask >> item.id & 1)
+    return checklist
+
+
+@_writes(CHECKLIST_PROGRESS_FILE)
+def toggle_checklist_item(status_id: int, item_id: int, project_id: int) -> bool:
+    """Переключает отметку пункта чек-листа у проекта"""
+    checklist = get_checklist_by_status_id(status_id)
+    if not checklist or not any(item.id == item_id for item in checklist.items):
+        return False
     
-    checklists = load_checklists()
-    for i, c in enumerate(checklists):
-        if c.status_id == status_id:
-            checklists[i] = checklist
-            break
-    save_checklists(checklists)
+    progress = dict(load_checklist_progress())
+    key = _progress_key(project_id, status_id)
+    progress[key] = progress.get(key, 0) ^ (1 << item_id)
+    save_checklist_progress(progress)
+    return True
+
+
+@_writes(CHECKLIST_PROGRESS_FILE)
+def reset_checklist(status_id: int, project_id: int):
+    """Сбрасывает отметки чек-листа статуса у проекта (у остальных проектов не трогает)"""
+    key = _progress_key(project_id, status_id)
+    progress = load_checklist_progress()
+    if key in progress:
+        progress = dict(progress)
+        del progress[key]
+        save_checklist_progress(progress)
+
+
+def _drop_checklist_progress(predicate):
+    """Удаляет отметки, ключ (project_id, status_id) которых подходит под условие"""
+    progress = load_checklist_progress()
+    kept = {key: mask for key, mask in progress.items() if not predicate(_parse_progress_key(key))}
+    if len(kept) != len(progress):
+        save_checklist_progress(kept)
+
+
+def _clear_checklist_progress_bit(status_id: int, item_id: int):
+    """Снимает отметку пункта у всех проектов в статусе"""
+    progress = load_checklist_progress()
+    bit = 1 << item_id
+    updated = {
+        key: (mask & ~bit if _parse_progress_key(key)[1] == status_id else mask)
+        for key, mask in progress.items()
+    }
+    if updated != progress:
+        save_checklist_progress(updated)
 
 
 def get_all_checklists() -> List[Checklist]:
     """Возвращает все чек-листы"""
     return load_checklists()
 
+
+
+# ========== Массовые операции ==========
+
+@_writes(*_PROJECT_FILES, CHARACTERS_FILE)
+def import_projects(rows: List[dict], actor_id: Optional[int] = None) -> dict:
+    """Импортирует проекты одним пакетом.
+
+    Каждая строка - словарь с ключами name, character, developer, developer_username
+    и status (название или ID, по умолчанию первый статус). Персонажи ищутся по
+    имени, разработчики - по username (или имени); отсутствующие создаются.
+    Сначала проверяются все строки: при ошибках выбрасывается ValueError со списком
+    проблем и ничего не записывается. Затем каждый файл пишется один раз
+    и статистика разработчиков пересчитывается один раз.
+    Возвращает количество созданных проектов, персонажей и разработчиков.
+    """
+    statuses = load_statuses()
+    statuses_by_key = {}
+    for status in statuses:
+        statuses_by_key[str(status.id)] = status
+        statuses_by_key.setdefault(status.name.strip().lower(), status)
+    default_status = get_first_status()
+    
+    characters = load_characters()
+    characters_by_name = {c.name.strip().lower(): c for c in characters}
+    next_character_id = max([c.id for c in characters], default=0) + 1
+    
+    developers = load_developers()
+    developers_by_username = {d.username.strip().lower(): d for d in developers if d.username}
+    developers_by_name = {d.name.strip().lower(): d for d in developers}
+    next_developer_id = max([d.id for d in developers], default=0) + 1
+    
+    projects = load_projects()
+    next_project_id = max([p.id for p in projects], default=0) + 1
+    
+    new_characters = []
+    new_developers = []
+    new_projects = []
+    errors = []
+    
+    for number, row in enumerate(rows, 1):
+        name = str(row.get("name") or "").strip()
+        character_name = str(row.get("character") or "").strip()
+        developer_name = str(row.get("developer") or "").strip()
+        username = str(row.get("developer_username") or "").strip().lstrip("@")
+        status_key = str(row.get("status") or "").strip()
+        
+        if not name:
+            errors.append(f"Строка {number}: не указано название проекта")
+            continue
+        if not character_name:
+            errors.append(f"Строка {number}: не указан персонаж")
+            continue
+        
+        if status_key:
+            status = statuses_by_key.get(status_key) or statuses_by_key.get(status_key.lower())
+            if not status:
+                errors.append(f"Строка {number}: неизвестный статус '{status_key}'")
+                continue
+        elif default_status:
+            status = default_status
+        else:
+            errors.append(f"Строка {number}: нет статусов для проекта")
+            continue
+        
+        developer = None
+        if username:
+            developer = developers_by_username.get(username.lower())
+        elif developer_name:
+            developer = developers_by_name.get(developer_name.lower())
+        if developer is None:
+            if not username:
+                errors.append(f"Строка {number}: для нового разработчика нужен developer_username")
+                continue
+            developer = Developer(id=next_developer_id, name=developer_name or username, username=username)
+            next_developer_id += 1
+            new_developers.append(developer)
+            developers_by_username[username.lower()] = developer
+            developers_by_name.setdefault(developer.name.lower(), developer)
+        
+        character = characters_by_name.get(character_name.lower())
+        if character is None:
+            character = Character(id=next_character_id, name=character_name)
+            next_character_id += 1
+            new_characters.append(character)
+            characters_by_name[character_name.lower()] = character
+        
+        new_projects.append(Project(
+            id=next_project_id,
+            name=name,
+            character_id=character.id,
+            developer_id=developer.id,
+            status_id=status.id
+        ))
+        next_project_id += 1
+    
+    if errors:
+        raise ValueError("\n".join(errors))
+    
+    if new_characters:
+        save_characters(characters + new_characters)
+    if new_projects:
+        _commit_projects(projects + new_projects, changed=new_projects)
+        _log_status_transitions([(p.id, None, p.status_id) for p in new_projects], actor_id)
+    
+    # Новые разработчики и пересчитанная статистика записываются одним сохранением
+    developers = developers + new_developers
+    stats_changed = _apply_developers_stats(developers, {p.developer_id for p in new_projects})
+    if new_developers or stats_changed:
+        save_developers(developers)
+    
+    return {
+        "projects": len(new_projects),
+        "characters": len(new_characters),
+        "developers": len(new_developers),
+    }
+
+
+@_writes(*_PROJECT_FILES)
+def batch_update_projects(project_ids, status_id: Optional[int] = None, developer_id: Optional[int] = None,
+                          actor_id: Optional[int] = None, character_id: Optional[int] = None) -> int:
+    """Меняет статус, разработчика и/или персонажа у группы проектов.
+
+    Статус меняется только там, где переход разрешен схемой, а при переходе вперед -
+    еще и чек-лист текущего статуса выполнен (как при переводе одного проекта);
+    такие проекты не меняются вовсе. У переведенных проектов сбрасываются отметки
+    чек-листа прежнего статуса.
+    Файл проектов пишется один раз, переходы дописываются в журнал одной записью,
+    статистика затронутых разработчиков пересчитывается одним сохранением.
+    Возвращает количество измененных проектов.
+    """
+    ids = set(project_ids)
+    projects = load_projects()
+    changed = []
+    transitions = []
+    affected_developers = set()
+    workflow = get_workflow()
+    progress = load_checklist_progress()
+    checklists = {checklist.status_id: checklist for checklist in load_checklists()}
+    
+    for project in projects:
+        if project.id not in ids:
+            continue
+        if status_id is not None and status_id != project.status_id:
+            if not workflow.can_move(project.status_id, status_id):
+                continue
+            checklist = checklists.get(project.status_id)
+            if checklist and workflow.is_forward(project.status_id, status_id):
+                mask = progress.get(_progress_key(project.id, project.status_id), 0)
+                if not all(mask >> item.id & 1 for item in checklist.items):
+                    continue
+        old_values = (project.status_id, project.developer_id, project.character_id)
+        old_status_id, old_developer_id, _ = old_values
+        if status_id is not None:
+            project.status_id = status_id
+        if developer_id is not None:
+            project.developer_id = developer_id
+        if character_id is not None:
+            project.character_id = character_id
+        if (project.status_id, project.developer_id, project.character_id) == old_values:
+            continue
+        changed.append(project)
+        affected_developers.update((old_developer_id, project.developer_id))
+        if project.status_id != old_status_id:
+            transitions.append((project.id, old_status_id, project.status_id))
+    
+    if changed:
+        _commit_projects(projects, changed=changed)
+        _log_status_transitions(transitions, actor_id)
+        _recalculate_developers_stats(affected_developers)
+        moved = {(project_id, old_status_id) for project_id, old_status_id, _ in transitions}
+        if moved:
+            _drop_checklist_progress(lambda key: key in moved)
+    return len(changed)
+
+
+@_writes(*_PROJECT_FILES)
+def batch_delete_projects(project_ids) -> int:
+    """Удаляет группу проектов одной записью файла. Возвращает количество удаленных"""
+    ids = set(project_ids)
+    projects = load_projects()
+    removed = [p for p in projects if p.id in ids]
+    if not removed:
+        return 0
+    
+    _commit_projects([p for p in projects if p.id not in ids], removed=[p.id for p in removed])
+    _drop_checklist_progress(lambda key: key[0] in ids)
+    _recalculate_developers_stats({p.developer_id for p in removed})
+    return len(removed)
+
+
+def check_integrity() -> dict:
+    """Проверка ссылок и счетчиков за один проход по данным.
+
+    Возвращает списки проблем: проекты с несуществующим персонажем, разработчиком
+    или статусом (ID проектов), разработчики с устаревшей статистикой (ID),
+    отметки чек-листов удаленных проектов (количество).
+    """
+    index = _get_project_index()
+    character_ids = {c.id for c in load_characters()}
+    developers = load_developers()
+    developer_ids = {d.id for d in developers}
+    
+    missing_character = []
+    missing_developer = []
+    missing_status = []
+    for project in index.projects.values():
+        if project.character_id not in character_ids:
+            missing_character.append(project.id)
+        if project.developer_id not in developer_ids:
+            missing_developer.append(project.id)
+        if index.statuses.get(project.status_id) is None:
+            missing_status.append(project.id)
+    
+    stale_stats = []
+    for developer in developers:
+        project_ids = index.by_developer.get(developer.id, set())
+        statuses = [index.projects[pid].status_id for pid in project_ids]
+        expected = (
+            len(project_ids),
+            sum(1 for s in statuses if s in index.statuses.published),
+            sum(1 for s in statuses if s in index.statuses.banned)
+        )
+        if expected != (developer.total_projects, developer.released_projects, developer.banned_projects):
+            stale_stats.append(developer.id)
+    
+    orphan_progress = sum(
+        1 for key in load_checklist_progress()
+        if _parse_progress_key(key)[0] not in index.projects
+    )
+    
+    return {
+        "missing_character": sorted(missing_character),
+        "missing_developer": sorted(missing_developer),
+        "missing_status": sorted(missing_status),
+        "stale_developer_stats": stale_stats,
+        "orphan_checklist_progress": orphan_progress,
+    }
+
+
+@_writes(*_PROJECT_FILES)
+def repair_integrity() -> dict:
+    """Исправляет то, что можно исправить без решения человека:
+    пересчитывает статистику разработчиков и удаляет отметки чек-листов удаленных проектов.
+    Битые ссылки проектов не трогает. Возвращает результат check_integrity() после исправления.
+    """
+    _recalculate_developers_stats(d.id for d in load_developers())
+    project_ids = set(_get_project_index().projects)
+    _drop_checklist_progress(lambda key: key[0] not in project_ids)
+    return check_integrity()